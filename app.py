@@ -5,12 +5,15 @@ Palestine News Research Web Application
 Beautiful web interface for researching the Palestine news dataset
 """
 
+import base64
 import io
 import json
 import re
 import time
 import threading
 import uuid
+import zipfile
+from bisect import bisect_right
 from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 import os
@@ -19,7 +22,7 @@ from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.shared import OxmlElement, qn
-from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context, session, redirect, url_for, has_request_context
 from pathlib import Path
 from urllib.parse import urlparse, unquote, quote
 from typing import Optional, Tuple, Callable
@@ -27,6 +30,13 @@ from typing import Optional, Tuple, Callable
 from PIL import Image
 from bs4 import BeautifulSoup
 
+from article_store import dataset_version, load_store
+from artifacts import ArtifactManager
+from export_search import EXPORT_FORMATS, encode_chunks, parquet_available, store_chunks
+from image_store import ImageStore
+from search_cache import SearchResultCache
+from wordcloud_service import WORDCLOUD_FIELDS, WordcloudCache, wordcloud_available
+
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this-in-production'  # For session support
 
@@ -132,6 +142,7 @@ TRANSLATIONS = {
         'error_occurred_file': 'حدث خطأ أثناء إنشاء الملف',
         'close': 'إغلاق',
         'connection_error': 'حدث خطأ في الاتصال بالخادم',
+        'reconnecting': 'انقطع الاتصال، جاري إعادة الاتصال...',
         'downloading_images': 'جاري تنزيل الصور ... يرجى الانتظار.',
         'image_gallery': 'معرض الصور الإخباري',
         'gallery_description': 'استعرض المقالات التي تحتوي على صور واكتشف أبرز اللقطات اليومية',
@@ -168,7 +179,8 @@ TRANSLATIONS = {
         'skipped_existing': 'تم تخطي',
         'existing_images': 'صور موجودة مسبقًا.',
         'errors_during': 'أخطاء أثناء التحميل:',
-        'folder': 'المجلد:'
+        'folder': 'المجلد:',
+        'download_as_zip': 'تنزيل الصور كملف ZIP بعد الانتهاء'
     },
     'en': {
         'app_name': 'Palestine News Archive',
@@ -270,6 +282,7 @@ TRANSLATIONS = {
         'error_occurred_file': 'An error occurred while creating the file',
         'close': 'Close',
         'connection_error': 'A connection error occurred with the server',
+        'reconnecting': 'Connection lost, reconnecting...',
         'downloading_images': 'Downloading images... Please wait.',
         'image_gallery': 'News Image Gallery',
         'gallery_description': 'Browse articles with images and discover the most important daily shots',
@@ -306,12 +319,16 @@ TRANSLATIONS = {
         'skipped_existing': 'Skipped',
         'existing_images': 'existing images.',
         'errors_during': 'Errors during download:',
-        'folder': 'Folder:'
+        'folder': 'Folder:',
+        'download_as_zip': 'Download the images as a ZIP file when finished'
     }
 }
 
 # Get current language from session or default to Arabic
 def get_language():
+    # Background export threads run outside any request
+    if not has_request_context():
+        return 'ar'
     return session.get('language', 'ar')
 
 # Add template function for translations
@@ -343,112 +360,432 @@ def number_format(value):
 
 IMAGES_CACHE_DIR = Path("images_cache")
 TEMP_DIR = Path("temp")
-TEMP_DIR.mkdir(exist_ok=True)
+
+# Generated exports: unique directory per file, removed after ARTIFACT_TTL_SECONDS
+# or when temp/ grows beyond ARTIFACT_MAX_BYTES
+ARTIFACT_TTL_SECONDS = 2 * 3600
+ARTIFACT_MAX_BYTES = 1024 * 1024 * 1024
+# (the cleanup thread starts with the first export of each process; gunicorn.conf.py
+# also starts it in every worker, since threads do not survive the fork of preload_app)
+artifacts = ArtifactManager(TEMP_DIR, ttl_seconds=ARTIFACT_TTL_SECONDS, max_bytes=ARTIFACT_MAX_BYTES)
+
+# Shared content-addressed cache: each unique image is downloaded and stored once
+image_store = ImageStore(IMAGES_CACHE_DIR)
+# The deprecated synchronous /api/tools/download-images makes at most this many
+# image requests per call; larger downloads go through the background job
+SYNC_DOWNLOAD_MAX_FETCHES = 20
+
+# Word cloud images, rendered in the background and cached per dataset version
+WORDCLOUD_CACHE_DIR = Path("wordcloud_cache")
+wordcloud_cache = WordcloudCache(WORDCLOUD_CACHE_DIR)
+
+# How often (seconds) requests check whether articles_combined.json has changed
+DATASET_CHECK_INTERVAL = 10
+TIMELINE_MAX_POINTS = 365  # default cap on the points returned by /api/timeline
+KEYWORD_MATRIX_MAX_KEYWORDS = 50
+# Cached /api/search results (matching rows and totals), per dataset version
+SEARCH_CACHE_MAX_ENTRIES = 256
+SEARCH_CACHE_MAX_ROWS = 1000000
 
 # Progress tracking for document creation
 progress_tracker = {}
 progress_lock = threading.Lock()
 
+# Cancellation flags for background jobs, keyed by job_id
+job_cancel_events = {}
+
+JOB_TERMINAL_STATUSES = ('completed', 'error', 'cancelled')
+# Finished jobs stay queryable (result, download) as long as their files are kept
+JOB_TTL_SECONDS = ARTIFACT_TTL_SECONDS
+# A running job whose progress stream closed is cancelled if no client reconnects
+# within this time (EventSource reconnects after a few seconds on network errors)
+JOB_ABANDON_GRACE_SECONDS = 120
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+class JobCancelled(Exception):
+    """Raised inside a background job when its cancel flag is set"""
+
+
+def prune_finished_jobs():
+    """Forget jobs that finished more than JOB_TTL_SECONDS ago (called with progress_lock held)"""
+    expired_before = time.time() - JOB_TTL_SECONDS
+    for job_id in [job_id for job_id, progress in progress_tracker.items()
+                   if progress.get('finished_at') and progress['finished_at'] < expired_before]:
+        progress_tracker.pop(job_id, None)
+        job_cancel_events.pop(job_id, None)
+
+
+def create_job():
+    """Register a new background job and return (job_id, cancel_event)"""
+    job_id = str(uuid.uuid4())
+    cancel_event = threading.Event()
+    with progress_lock:
+        prune_finished_jobs()
+        progress_tracker[job_id] = {
+            'percentage': 0,
+            'message': 'بدء العملية...',
+            'status': 'processing',
+            'filepath': None,
+            'filename': None,
+            'error': None,
+            'stats': None
+        }
+        job_cancel_events[job_id] = cancel_event
+    return job_id, cancel_event
+
+
+def check_cancelled(cancel_event: Optional[threading.Event]):
+    """Raise JobCancelled if the job's cancel flag has been set"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise JobCancelled()
+
+
+def download_bytes(url, headers=None, timeout=15, cancel_event: Optional[threading.Event] = None,
+                   chunk_size=64 * 1024) -> bytes:
+    """GET a URL, streaming the body so a cancelled job aborts the transfer between chunks"""
+    check_cancelled(cancel_event)
+    with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        chunks = []
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            check_cancelled(cancel_event)
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def update_job(job_id, **fields):
+    """Update the tracked state of a job if it is still registered"""
+    with progress_lock:
+        if job_id in progress_tracker:
+            if fields.get('status') in JOB_TERMINAL_STATUSES:
+                fields['finished_at'] = time.time()
+            progress_tracker[job_id].update(fields)
+
+
+def cancel_job(job_id):
+    """Ask a running job to stop; returns False for unknown or finished jobs"""
+    with progress_lock:
+        progress = progress_tracker.get(job_id)
+        cancel_event = job_cancel_events.get(job_id)
+        if not progress or not cancel_event or progress['status'] in JOB_TERMINAL_STATUSES:
+            return False
+        progress['message'] = 'جاري الإلغاء...'
+    cancel_event.set()
+    return True
+
+
+def watch_job(job_id):
+    """Count an open progress stream of a job"""
+    with progress_lock:
+        progress = progress_tracker.get(job_id)
+        if progress is not None:
+            progress['watchers'] = progress.get('watchers', 0) + 1
+            progress.pop('detached_at', None)
+
+
+def unwatch_job(job_id):
+    """A progress stream closed; schedule a cancel check if nobody watches the running job any more"""
+    with progress_lock:
+        progress = progress_tracker.get(job_id)
+        if progress is None:
+            return
+        progress['watchers'] = max(progress.get('watchers', 1) - 1, 0)
+        if progress['watchers'] or progress['status'] in JOB_TERMINAL_STATUSES:
+            return
+        detached_at = progress['detached_at'] = time.monotonic()
+    timer = threading.Timer(JOB_ABANDON_GRACE_SECONDS, cancel_if_abandoned, (job_id, detached_at))
+    timer.daemon = True
+    timer.start()
+
+
+def cancel_if_abandoned(job_id, detached_at):
+    """Cancel a job still running without a progress stream since detached_at"""
+    with progress_lock:
+        progress = progress_tracker.get(job_id)
+        abandoned = progress is not None and progress.get('detached_at') == detached_at
+    if abandoned and cancel_job(job_id):
+        print(f"Cancelled job {job_id}: no client for {JOB_ABANDON_GRACE_SECONDS}s")
+
+
+def start_export_job(build):
+    """Run build(progress_callback, cancel_event) -> (filepath, filename) in a background thread"""
+    job_id, cancel_event = create_job()
+
+    def create_document_thread():
+        def progress_callback(percentage, message, status):
+            # The job only counts as completed once its file is registered below
+            if status == 'completed':
+                status = 'processing'
+            update_job(job_id, percentage=percentage, message=message, status=status)
+
+        try:
+            filepath, filename = build(progress_callback, cancel_event)
+            if filepath:
+                artifacts.hold(filepath)  # not evicted for size before it is downloaded
+                update_job(job_id, filepath=str(Path(filepath).resolve()), filename=filename,
+                           status='completed', percentage=100, message='اكتمل إنشاء الملف بنجاح!')
+            else:
+                update_job(job_id, status='error', error='لم يتم العثور على مقالات')
+        except JobCancelled:
+            update_job(job_id, status='cancelled', message='تم إلغاء العملية')
+        except Exception as e:
+            update_job(job_id, status='error', error=str(e), message=f'حدث خطأ: {str(e)}')
+
+    thread = threading.Thread(target=create_document_thread)
+    thread.daemon = True
+    thread.start()
+
+    return job_id
+
+
+def stream_job_progress(job_id, download_url):
+    """SSE response streaming progress updates of a background job"""
+    def generate():
+        # A closed stream alone (reconnect, proxy timeout) does not cancel the job;
+        # only one left without a stream for JOB_ABANDON_GRACE_SECONDS is
+        watch_job(job_id)
+        try:
+            yield from poll()
+        finally:
+            unwatch_job(job_id)
+
+    def poll():
+        last_data = None
+        while True:
+            with progress_lock:
+                progress = progress_tracker.get(job_id)
+                # A client reconnecting to an expired (or another worker's) job gets a final error
+                progress = dict(progress) if progress is not None else {
+                    'status': 'error', 'error': 'العملية غير موجودة أو انتهت صلاحيتها'}
+
+            status = progress.get('status', 'processing')
+            data = {
+                'percentage': progress.get('percentage', 0),
+                'message': progress.get('message', ''),
+                'status': status
+            }
+
+            if progress.get('stats'):
+                data['stats'] = progress['stats']
+
+            if progress.get('result'):
+                data['result'] = progress['result']
+
+            if status == 'completed' and progress.get('filepath') and progress.get('filename'):
+                data['filepath'] = progress['filepath']
+                data['filename'] = progress['filename']
+                data['download_url'] = download_url
+
+            if status == 'error' and progress.get('error'):
+                data['error'] = progress['error']
+
+            # Only send update if something changed
+            if data != last_data:
+                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                last_data = data
+
+            if status in JOB_TERMINAL_STATUSES:
+                break  # the job itself is pruned JOB_TTL_SECONDS after it finished
+
+            time.sleep(0.5)  # Update every 500ms
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Connection': 'keep-alive'
+        }
+    )
+
+
+def send_artifact(filepath, filename, mimetype=None):
+    """Send an exported file, keeping it safe from size-based eviction until the response is closed"""
+    artifacts.hold(filepath)
+    try:
+        response = send_file(
+            filepath,
+            as_attachment=True,
+            download_name=filename,
+            mimetype=mimetype
+        )
+    except BaseException:
+        artifacts.release(filepath)
+        raise
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"; filename*=UTF-8\'\'{quote(filename)}'
+    # A passed-through body is handed to the server as-is and the close hooks
+    # would never run; let the response iterate the file itself instead
+    response.direct_passthrough = False
+    response.call_on_close(lambda: artifacts.release(filepath))
+    return response
+
+
+def send_job_file(job_id, mimetype=DOCX_MIMETYPE):
+    """Send the file produced by a completed background job"""
+    with progress_lock:
+        progress = progress_tracker.get(job_id, {})
+        filepath = progress.get('filepath')
+        filename = progress.get('filename')
+
+    if not filepath or not filename:
+        return jsonify({'error': 'File not found or job not completed'}), 404
+
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Generated file not found'}), 404
+
+    try:
+        return send_artifact(filepath, filename, mimetype)
+    except Exception as e:
+        print(f"Error sending file: {e}")
+        return jsonify({'error': f'Failed to send file: {str(e)}'}), 500
+
 class NewsAnalyzer:
     def __init__(self, json_file_path):
         """Initialize the analyzer with the combined articles dataset"""
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            self.articles = json.load(f)
-        print(f"Loaded {len(self.articles)} articles for web analysis")
+        self.json_file_path = json_file_path
+        self.store = load_store(json_file_path, write_snapshot=True)
+        print(f"Loaded {len(self.store)} articles for web analysis")
         self.content_cache = {}  # Cache for fetched article content
-    
+
+        # Hot reload state
+        self.loaded_at = time.time()
+        self.reload_count = 0
+        self.last_reload_error = None
+        self._failed_version = None
+        self._last_check = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+
+        self.search_cache = SearchResultCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_ROWS)
+
+    def check_for_update(self):
+        """Start a background reload if the dataset file changed (checked at most every few seconds)"""
+        now = time.monotonic()
+        if now - self._last_check < DATASET_CHECK_INTERVAL:
+            return False
+        self._last_check = now
+        version = dataset_version(self.json_file_path)
+        if version is None or version in (self.store.version, self._failed_version):
+            return False
+        return self.reload_in_background()
+
+    def reload_in_background(self):
+        """Reload the dataset in a background thread; returns False if a reload is already running"""
+        with self._reload_lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(target=self.reload, name='dataset-reload', daemon=True)
+            self._reload_thread.start()
+            return True
+
+    def reload(self):
+        """Build a new store from the dataset file and swap it in.
+
+        Requests keep using the store they started with; the content cache and
+        the image store are left untouched.
+        """
+        started = time.time()
+        version = dataset_version(self.json_file_path)
+        try:
+            store = load_store(self.json_file_path, write_snapshot=True)
+        except Exception as e:
+            self._failed_version = version
+            self.last_reload_error = str(e)
+            print(f"Dataset reload failed: {e}")
+            return False
+
+        previous = self.store
+        self.store = store
+        self.loaded_at = time.time()
+        self.reload_count += 1
+        self.last_reload_error = None
+        self._failed_version = None
+        print(f"Reloaded dataset: {len(previous)} -> {len(store)} articles "
+              f"(version {store.version}, {time.time() - started:.2f}s)")
+        return True
+
+    def dataset_info(self):
+        """Version and reload status of the loaded dataset"""
+        store = self.store
+        return {
+            'version': store.version,
+            'articles': len(store),
+            'loaded_at': datetime.fromtimestamp(self.loaded_at).isoformat(timespec='seconds'),
+            'file_version': dataset_version(self.json_file_path),
+            'reloading': self._reload_thread is not None and self._reload_thread.is_alive(),
+            'reload_count': self.reload_count,
+            'last_error': self.last_reload_error
+        }
+
     def search_articles(self, query, search_type='all', content_type='all', date_from=None, date_to=None):
         """Search articles with multiple filters"""
-        results = []
-        query_lower = query.lower() if query else ""
-        
-        for article in self.articles:
-            # Text search
-            if query:
-                title = article.get('title', '').lower()
-                excerpt = article.get('excerpt', '').lower()
-                
-                if search_type == 'title' and query_lower not in title:
-                    continue
-                elif search_type == 'excerpt' and query_lower not in excerpt:
-                    continue
-                elif search_type == 'all' and query_lower not in title and query_lower not in excerpt:
-                    continue
-            
-            # Content type filter
-            if content_type != 'all' and article.get('type') != content_type:
-                continue
-            
-            # Date range filter
-            if date_from and article.get('date', '') < date_from:
-                continue
-            if date_to and article.get('date', '') > date_to:
-                continue
-            
-            results.append(article)
-        
-        return results
-    
+        store = self.store
+        return store.articles(list(store.search_rows(query, search_type, content_type, date_from, date_to)))
+
+    def get_article(self, article_id):
+        """Return a single article by id, or None"""
+        store = self.store
+        row = store.row_for_id(article_id)
+        return store.article(row) if row is not None else None
+
+    def get_articles_by_date(self, date):
+        """Return the articles published on a given date"""
+        store = self.store
+        return store.articles(store.rows_on_date(date))
+
     def get_statistics(self):
         """Get comprehensive statistics"""
-        dates = [article.get('date') for article in self.articles if article.get('date')]
-        types = [article.get('type') for article in self.articles]
-        
-        return {
-            'total_articles': len(self.articles),
-            'date_range': {
-                'start': min(dates) if dates else None,
-                'end': max(dates) if dates else None
-            },
-            'article_types': dict(Counter(types)),
-            'articles_with_images': len([a for a in self.articles if a.get('image_url')])
-        }
-    
-    def get_timeline_data(self):
-        """Get timeline data for charts"""
-        monthly_counts = defaultdict(int)
-        for article in self.articles:
-            date = article.get('date', '')
-            if date:
-                month = date[:7]  # YYYY-MM
-                monthly_counts[month] += 1
-        
-        return sorted(monthly_counts.items())
-    
+        return self.store.statistics()
+
+    def get_timeline_data(self, granularity=None, content_type='all', query='', date_from=None, date_to=None):
+        """Get timeline data for charts (monthly [month, count] pairs unless a granularity is given)"""
+        if not granularity:
+            return self.store.monthly_counts()
+        return self.store.timeline(granularity, content_type, query, date_from, date_to)
+
     def get_keyword_analysis(self, keywords):
         """Analyze keyword frequency"""
-        keyword_counts = {}
-        for keyword in keywords:
-            count = sum(1 for article in self.articles 
-                       if keyword in article.get('title', '') or keyword in article.get('excerpt', ''))
-            keyword_counts[keyword] = count
-        return keyword_counts
+        return {keyword: self.store.count_containing(keyword) for keyword in keywords}
+
+    def get_keyword_matrix(self, keywords, content_type='all', date_from=None, date_to=None):
+        """Keyword x month counts and keyword x keyword co-occurrence (same matching as get_keyword_analysis)"""
+        return self.store.keyword_matrix(keywords, content_type, date_from, date_to)
+
+    def get_trends(self, date_from=None, date_to=None, baseline_days=28, limit=20, min_count=3):
+        """Title terms whose frequency spiked in [date_from, date_to] compared with the preceding baseline_days.
+
+        The window defaults to the last 7 days of the dataset. Counts come from
+        the precomputed per-day/per-month term tables, so any window is a merge
+        of a few rows.
+        """
+        store = self.store
+        terms = store.terms
+        dates = [date for date in store.dates.categories if date]
+        if not dates:
+            return {'window': None, 'baseline': None, 'trends': []}
+        end = datetime.strptime(date_to or dates[-1], '%Y-%m-%d')
+        start = datetime.strptime(date_from, '%Y-%m-%d') if date_from else end - timedelta(days=6)
+        if start > end:
+            raise ValueError('date_from is after date_to')
+        baseline_end = start - timedelta(days=1)
+        baseline_start = start - timedelta(days=baseline_days)
+        window = (start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        baseline = (baseline_start.strftime('%Y-%m-%d'), baseline_end.strftime('%Y-%m-%d'))
+        first, last = terms.date_code_range(*window)
+        return {
+            'window': {'from': window[0], 'to': window[1], 'dates': list(store.dates.categories[first:last])},
+            'baseline': {'from': baseline[0], 'to': baseline[1]},
+            'trends': terms.trending(*window, *baseline, limit=limit, min_count=min_count)
+        }
 
     def get_articles_with_images(self, date=None):
-        """Return articles that include images, optionally filtered by date"""
-        articles_with_images = [
-            article for article in self.articles
-            if article.get('image_url')
-        ]
-
-        if date:
-            articles_with_images = [
-                article for article in articles_with_images
-                if article.get('date') == date
-            ]
+        """Return articles that include images, optionally filtered by date (newest first)"""
+        store = self.store
+        return store.articles(store.image_rows(date))
 
-        # Sort by date (newest first), then by id descending as tie-breaker
-        articles_with_images.sort(
-            key=lambda article: (
-                article.get('date') or '0000-00-00',
-                article.get('id') or 0
-            ),
-            reverse=True
-        )
-
-        return articles_with_images
-    
-    def fetch_article_content(self, article_url):
+    def fetch_article_content(self, article_url, cancel_event: Optional[threading.Event] = None):
         """Fetch full article content from Al Jazeera website"""
         # Check cache first
         if article_url in self.content_cache:
@@ -465,10 +802,9 @@ class NewsAnalyzer:
                 'Upgrade-Insecure-Requests': '1',
             }
             
-            response = requests.get(article_url, headers=headers, timeout=10)
-            response.raise_for_status()
+            content = download_bytes(article_url, headers=headers, timeout=10, cancel_event=cancel_event)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(content, 'html.parser')
             
             # Try to find the main article content
             content_selectors = [
@@ -511,6 +847,8 @@ class NewsAnalyzer:
             else:
                 return "عذراً، لم يتم العثور على محتوى المقال الكامل."
                 
+        except JobCancelled:
+            raise
         except requests.RequestException as e:
             print(f"Error fetching article content: {e}")
             return "عذراً، حدث خطأ في تحميل محتوى المقال."
@@ -518,7 +856,8 @@ class NewsAnalyzer:
             print(f"Error parsing article content: {e}")
             return "عذراً، حدث خطأ في معالجة محتوى المقال."
     
-    def create_word_document(self, articles, date, include_content=False, progress_callback: Optional[Callable] = None):
+    def create_word_document(self, articles, date, include_content=False, progress_callback: Optional[Callable] = None,
+                             cancel_event: Optional[threading.Event] = None):
         """Create a Word document with articles from a specific date"""
         doc = Document()
         
@@ -553,6 +892,7 @@ class NewsAnalyzer:
         
         # Add articles
         for i, article in enumerate(articles, 1):
+            check_cancelled(cancel_event)
             update_progress(0, f"معالجة المقال {i} من {len(articles)}: {article.get('title', 'بدون عنوان')[:50]}...", "processing")
             
             # Article number and title
@@ -581,7 +921,7 @@ class NewsAnalyzer:
                 content_heading.alignment = WD_ALIGN_PARAGRAPH.RIGHT
                 
                 try:
-                    full_content = self.fetch_article_content(article['link'])
+                    full_content = self.fetch_article_content(article['link'], cancel_event)
                     if full_content and not full_content.startswith('عذراً'):
                         # Split content into paragraphs
                         paragraphs = full_content.split('\n')
@@ -592,6 +932,8 @@ class NewsAnalyzer:
                     else:
                         no_content = doc.add_paragraph('لم يتم العثور على المحتوى الكامل')
                         no_content.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+                except JobCancelled:
+                    raise
                 except Exception as e:
                     error_para = doc.add_paragraph(f'خطأ في تحميل المحتوى: {str(e)}')
                     error_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
@@ -611,6 +953,7 @@ class NewsAnalyzer:
                 doc.add_paragraph('-' * 50)
                 doc.add_paragraph()  # Empty line
         
+        check_cancelled(cancel_event)
         update_progress(1, "جاري حفظ الملف...", "processing")
         
         # Add footer
@@ -637,6 +980,12 @@ class NewsAnalyzer:
 # Initialize analyzer
 analyzer = NewsAnalyzer('articles_combined.json')
 
+
+@app.before_request
+def check_dataset_update():
+    """Pick up a new articles_combined.json without restarting the server"""
+    analyzer.check_for_update()
+
 @app.route('/set_language/<lang>')
 def set_language(lang):
     """Set language preference"""
@@ -677,6 +1026,18 @@ def tools():
     lang = get_language()
     return render_template('tools.html', lang=lang)
 
+def encode_cursor(store, row):
+    """Opaque pagination cursor: the id of the last article of a page"""
+    return base64.urlsafe_b64encode(str(store.ids[row]).encode('ascii')).decode('ascii').rstrip('=')
+
+def decode_cursor(store, cursor):
+    """Row a cursor continues after; ValueError if it is malformed or its article is gone"""
+    article_id = int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii'))
+    row = store.row_for_id(article_id)
+    if row is None:
+        raise ValueError(f"no article with id {article_id}")
+    return row
+
 @app.route('/api/search')
 def api_search():
     """API endpoint for searching articles"""
@@ -688,20 +1049,54 @@ def api_search():
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 20))
     
-    results = analyzer.search_articles(query, search_type, content_type, date_from, date_to)
+    cursor = request.args.get('cursor', '')
+    
+    # Show one article per near-duplicate cluster
+    collapse = request.args.get('collapse', '').lower() in ('1', 'true', 'yes')
+    filters = (query, search_type, content_type, date_from, date_to)
+    
+    store = analyzer.store
+    after_row = None
+    if cursor:
+        try:
+            after_row = decode_cursor(store, cursor)
+        except ValueError:
+            return jsonify({'error': 'invalid or expired cursor'}), 400
     
-    # Pagination
-    total = len(results)
+    # Results and totals of repeated searches come from the result cache
+    result = analyzer.search_cache.lookup(store, *filters)
+    total, matched = result.total(collapse), result.matched
     start = (page - 1) * per_page
-    end = start + per_page
-    paginated_results = results[start:end]
+    if result.rows is not None:
+        # Pages are slices of the cached rows (ascending, so a cursor is a bisect)
+        result_rows, cluster_sizes = result.view(store, collapse)
+        if cursor:
+            start = bisect_right(result_rows, after_row)
+        rows = list(result_rows[start:start + per_page])
+        has_more = start + per_page < len(result_rows)
+    elif cursor:
+        # Too big to cache: keyset page resuming the search right after the cursor's article
+        rows, cluster_sizes, has_more = store.search_page(*filters, after_row=after_row, limit=per_page,
+                                                          collapse=collapse)
+    else:
+        # Too big to cache: the search stops after this page instead of collecting every result
+        rows, cluster_sizes, has_more = store.search_page(*filters, limit=start + per_page, collapse=collapse)
+        rows = rows[start:]
+    
+    # Only the requested page is turned into dicts
+    paginated_results = store.articles(rows)
+    if collapse:
+        for article in paginated_results:
+            article['near_duplicates'] = cluster_sizes[article['cluster_id']] - 1
     
     return jsonify({
         'articles': paginated_results,
         'total': total,
+        'collapsed': matched - total,
         'page': page,
         'per_page': per_page,
-        'total_pages': (total + per_page - 1) // per_page
+        'total_pages': (total + per_page - 1) // per_page,
+        'next_cursor': encode_cursor(store, rows[-1]) if has_more and rows else None
     })
 
 @app.route('/api/statistics')
@@ -709,10 +1104,71 @@ def api_statistics():
     """API endpoint for statistics"""
     return jsonify(analyzer.get_statistics())
 
+def downsample_lttb(values, threshold):
+    """Indexes of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    values are y values at evenly spaced x positions (the timeline periods).
+    The first and last points are always kept; each bucket in between keeps
+    the point forming the largest triangle with the previous kept point and
+    the average of the next bucket, which preserves peaks and troughs.
+    """
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+    kept = [0]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_start = min(end, next_end - 1)
+        average_x = (next_start + next_end - 1) / 2
+        average_y = sum(values[next_start:next_end]) / (next_end - next_start)
+        previous_y = values[previous]
+        best, best_area = start, -1
+        for index in range(start, end):
+            area = abs((previous - average_x) * (values[index] - previous_y)
+                       - (previous - index) * (average_y - previous_y))
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        previous = best
+    kept.append(count - 1)
+    return kept
+
 @app.route('/api/timeline')
 def api_timeline():
-    """API endpoint for timeline data"""
-    return jsonify(analyzer.get_timeline_data())
+    """API endpoint for timeline data.
+
+    Without parameters: monthly [month, count] pairs. With granularity
+    (day/week/month) and optional content_type, q, date_from and date_to:
+    counts per period, downsampled to at most max_points points.
+    """
+    granularity = request.args.get('granularity', '')
+    if not granularity:
+        return jsonify(analyzer.get_timeline_data())
+
+    content_type = request.args.get('content_type', 'all')
+    query = request.args.get('q', '').strip()
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    try:
+        max_points = max(3, int(request.args.get('max_points', TIMELINE_MAX_POINTS)))
+        points = analyzer.get_timeline_data(granularity, content_type, query, date_from, date_to)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameters: {e}'}), 400
+
+    kept = downsample_lttb([count for _, count in points], max_points)
+    return jsonify({
+        'granularity': granularity,
+        'content_type': content_type,
+        'q': query,
+        'points': [points[index] for index in kept],
+        'total_points': len(points),
+        'downsampled': len(kept) < len(points),
+        'total_articles': sum(count for _, count in points)
+    })
 
 @app.route('/api/keywords')
 def api_keywords():
@@ -723,37 +1179,129 @@ def api_keywords():
         return jsonify(analyzer.get_keyword_analysis(keywords))
     return jsonify({})
 
+@app.route('/api/keywords/matrix')
+def api_keywords_matrix():
+    """API endpoint for keyword x month counts and keyword co-occurrence in one call"""
+    keywords = request.args.get('keywords', '').split(',')
+    keywords = list(dict.fromkeys(k.strip() for k in keywords if k.strip()))[:KEYWORD_MATRIX_MAX_KEYWORDS]
+    if not keywords:
+        return jsonify({'error': 'keywords parameter is required'}), 400
+    return jsonify(analyzer.get_keyword_matrix(
+        keywords,
+        request.args.get('content_type', 'all'),
+        request.args.get('date_from', ''),
+        request.args.get('date_to', '')
+    ))
+
+@app.route('/api/wordcloud')
+def api_wordcloud():
+    """API endpoint for a cached word cloud image (202 while it is being rendered)"""
+    if not wordcloud_available():
+        return jsonify({'error': 'word clouds need the wordcloud, arabic_reshaper and python-bidi packages'}), 503
+    field = request.args.get('field', 'title')
+    if field not in WORDCLOUD_FIELDS:
+        return jsonify({'error': f"field must be one of {', '.join(WORDCLOUD_FIELDS)}"}), 400
+    try:
+        top_n = min(int(request.args.get('max_words', 100)), 500)
+    except ValueError:
+        return jsonify({'error': 'max_words must be an integer'}), 400
+    status, result = wordcloud_cache.get(
+        analyzer.store,
+        field,
+        request.args.get('content_type', 'all'),
+        request.args.get('date_from', ''),
+        request.args.get('date_to', ''),
+        top_n
+    )
+    if status == 'ready':
+        return send_file(str(result.resolve()), mimetype='image/png', max_age=3600)
+    if status == 'error':
+        return jsonify({'status': 'error', 'error': result}), 500
+    return jsonify({'status': 'pending'}), 202
+
+@app.route('/api/trends')
+def api_trends():
+    """API endpoint for trending title terms in a date window vs. the preceding baseline"""
+    try:
+        trends = analyzer.get_trends(
+            request.args.get('date_from') or None,
+            request.args.get('date_to') or None,
+            baseline_days=max(1, int(request.args.get('baseline_days', 28))),
+            limit=min(max(1, int(request.args.get('limit', 20))), 100),
+            min_count=max(1, int(request.args.get('min_count', 3)))
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameters: {e}'}), 400
+    return jsonify(trends)
+
+@app.route('/api/search/export')
+def api_search_export():
+    """API endpoint streaming all search results as a CSV, JSONL or Parquet download"""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export needs the pyarrow package'}), 503
+
+    store = analyzer.store  # one dataset version for the whole download, even if a reload swaps it
+    rows = store.search_rows(
+        request.args.get('q', ''),
+        request.args.get('type', 'all'),
+        request.args.get('content_type', 'all'),
+        request.args.get('date_from', ''),
+        request.args.get('date_to', '')
+    )
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"search_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+    return Response(
+        stream_with_context(encode_chunks(store_chunks(store, rows), fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @app.route('/api/headlines')
 def api_headlines():
     """API endpoint for headlines by date"""
     date = request.args.get('date', '')
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 50))
+    cursor = request.args.get('cursor', '')
     
-    # Filter articles by date
-    filtered_articles = []
-    for article in analyzer.articles:
-        if article.get('date') == date:
-            filtered_articles.append({
-                'id': article.get('id'),
-                'title': article.get('title'),
-                'link': article.get('link'),
-                'type': article.get('type'),
-                'date': article.get('date')
-            })
+    # Filter articles by date (one bisect of the date index)
+    store = analyzer.store
+    rows = store.rows_on_date(date)
+    total = len(rows)
     
-    # Pagination
-    total = len(filtered_articles)
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_results = filtered_articles[start:end]
+    # Pagination, by cursor (keyset) or page number
+    if cursor:
+        try:
+            after_row = decode_cursor(store, cursor)
+        except ValueError:
+            return jsonify({'error': 'invalid or expired cursor'}), 400
+        page_rows = store.rows_on_date(date, after_row, per_page + 1)
+    else:
+        start = (page - 1) * per_page
+        page_rows = rows[start:start + per_page + 1]
+    has_more = len(page_rows) > per_page
+    page_rows = page_rows[:per_page]
+    paginated_results = [
+        {
+            'id': store.ids[row],
+            'title': store.title[row],
+            'link': store.link[row],
+            'type': store.types[row],
+            'date': store.dates[row]
+        }
+        for row in page_rows
+    ]
     
     return jsonify({
         'articles': paginated_results,
         'total': total,
         'page': page,
         'per_page': per_page,
-        'total_pages': (total + per_page - 1) // per_page
+        'total_pages': (total + per_page - 1) // per_page,
+        'next_cursor': encode_cursor(store, page_rows[-1]) if has_more else None
     })
 
 
@@ -766,13 +1314,25 @@ def api_images():
 
     # Limit per_page to avoid overly large responses
     per_page = min(max(per_page, 1), 60)
+    cursor = request.args.get('cursor', '')
 
-    articles_with_images = analyzer.get_articles_with_images(date or None)
+    store = analyzer.store
+    rows = store.image_rows(date or None)
+    total = len(rows)
 
-    total = len(articles_with_images)
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_articles = articles_with_images[start:end]
+    # Pagination, by cursor (keyset over the newest-first image index) or page number
+    if cursor:
+        try:
+            after_row = decode_cursor(store, cursor)
+        except ValueError:
+            return jsonify({'error': 'invalid or expired cursor'}), 400
+        page_rows = store.image_rows(date or None, after_row, per_page + 1)
+    else:
+        start = (page - 1) * per_page
+        page_rows = rows[start:start + per_page + 1]
+    has_more = len(page_rows) > per_page
+    page_rows = page_rows[:per_page]
+    paginated_articles = store.articles(page_rows)
 
     response_articles = [
         {
@@ -792,77 +1352,193 @@ def api_images():
         'total': total,
         'page': page,
         'per_page': per_page,
-        'total_pages': (total + per_page - 1) // per_page
+        'total_pages': (total + per_page - 1) // per_page,
+        'next_cursor': encode_cursor(store, page_rows[-1]) if has_more else None
     })
 
 
-@app.route('/api/tools/download-images', methods=['POST'])
-def api_download_images():
+def download_images_options():
+    """(date, limit, force, archive) of an image download request body"""
     data = request.get_json() or {}
-    date = data.get('date')
     limit = data.get('limit')
-    force = data.get('force', False)
-
     try:
         limit = int(limit) if limit is not None else None
     except (ValueError, TypeError):
         limit = None
+    return data.get('date'), limit, data.get('force', False), data.get('archive', False)
 
-    result = download_images(date=date or None, limit=limit, force=bool(force))
 
-    return jsonify({
+@app.route('/api/tools/download-images', methods=['POST'])
+def api_download_images():
+    """Deprecated: download a small batch of article images inside the request.
+
+    Kept for existing clients with the same response body. It makes at most
+    SYNC_DOWNLOAD_MAX_FETCHES image requests (truncated tells whether images
+    were left over); use /api/tools/download-images/start for anything larger.
+    """
+    date, limit, force, _ = download_images_options()
+    result = download_images(date=date or None, limit=limit, force=bool(force),
+                             max_fetches=SYNC_DOWNLOAD_MAX_FETCHES)
+    response = jsonify({
         'success': True,
         'requested': result['requested'],
         'downloaded': result['downloaded'],
         'skipped': result['skipped'],
         'errors': result['errors'],
+        'truncated': result['truncated'],
         'output_dir': str(IMAGES_CACHE_DIR.resolve())
     })
+    response.headers['Deprecation'] = 'true'
+    response.headers['Link'] = '</api/tools/download-images/start>; rel="successor-version"'
+    return response
+
+
+@app.route('/api/tools/download-images/start', methods=['POST'])
+def api_download_images_start():
+    """Start an image download job and return job_id"""
+    date, limit, force, archive = download_images_options()
+    job_id, cancel_event = create_job()
+
+    def download_images_thread():
+        def progress_callback(percentage, message, status, stats=None):
+            update_job(job_id, percentage=percentage, message=message, status=status, stats=stats)
+
+        try:
+            result = download_images(date=date or None, limit=limit, force=bool(force),
+                                     progress_callback=progress_callback, cancel_event=cancel_event)
+            fields = {
+                'status': 'completed',
+                'percentage': 100,
+                'message': (f"اكتمل التنزيل: {result['downloaded']} صورة جديدة، "
+                            f"{result['skipped']} موجودة مسبقًا، {result['errors']} أخطاء"),
+                'result': {
+                    'requested': result['requested'],
+                    'downloaded': result['downloaded'],
+                    'skipped': result['skipped'],
+                    'errors': result['errors'],
+                    'output_dir': str(IMAGES_CACHE_DIR.resolve())
+                }
+            }
+            if archive and result['files']:
+                update_job(job_id, message='جاري إنشاء ملف ZIP...')
+                filepath, filename = create_images_archive(result['files'], date, cancel_event)
+                artifacts.hold(filepath)
+                fields['filepath'] = str(filepath.resolve())
+                fields['filename'] = filename
+            update_job(job_id, **fields)
+        except JobCancelled:
+            update_job(job_id, status='cancelled', message='تم إلغاء العملية')
+        except Exception as e:
+            update_job(job_id, status='error', error=str(e), message=f'حدث خطأ: {str(e)}')
 
+    thread = threading.Thread(target=download_images_thread)
+    thread.daemon = True
+    thread.start()
 
-def build_image_path(article, output_dir: Path) -> Path:
-    image_url = article.get('image_url', '')
-    parsed = urlparse(image_url)
-    basename = Path(unquote(parsed.path)).name or f"article_{article.get('id', 'unknown')}"
-    stem, ext = os.path.splitext(basename)
-    if not ext:
-        ext = '.jpg'
+    return jsonify({'job_id': job_id}), 202
 
-    article_date = (article.get('date') or 'unknown_date').replace('/', '-').strip()
-    target_dir = output_dir / article_date
-    target_dir.mkdir(parents=True, exist_ok=True)
 
-    filename = f"{article.get('id', 'article')}_{stem}{ext}"
-    return target_dir / filename
+@app.route('/api/tools/download-images/progress/<job_id>')
+def api_download_images_progress(job_id):
+    """SSE endpoint for streaming per-image download progress"""
+    return stream_job_progress(job_id, f'/api/tools/download-images/download/{job_id}')
+
+
+@app.route('/api/tools/download-images/result/<job_id>')
+def api_download_images_result(job_id):
+    """Summary of a finished image download job"""
+    with progress_lock:
+        progress = progress_tracker.get(job_id)
+        if not progress:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({
+            'status': progress['status'],
+            'stats': progress.get('stats'),
+            'result': progress.get('result')
+        })
 
 
-def ensure_image_file(article) -> Optional[Path]:
+@app.route('/api/tools/download-images/download/<job_id>')
+def api_download_images_download(job_id):
+    """Download the ZIP archive produced by an image download job"""
+    return send_job_file(job_id, mimetype='application/zip')
+
+
+@app.route('/api/tools/download-images/cancel/<job_id>', methods=['POST'])
+def api_download_images_cancel(job_id):
+    """Cancel a running image download job"""
+    if not cancel_job(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify({'job_id': job_id, 'status': 'cancelling'})
+
+
+@app.route('/api/tools/artifacts')
+def api_artifacts_stats():
+    """Disk usage and cleanup metrics of generated export files"""
+    return jsonify(artifacts.stats())
+
+
+@app.route('/api/tools/artifacts/sweep', methods=['POST'])
+def api_artifacts_sweep():
+    """Run artifact garbage collection immediately"""
+    return jsonify(artifacts.sweep())
+
+
+@app.route('/api/admin/dataset')
+def api_dataset_info():
+    """Version and reload status of the loaded dataset"""
+    return jsonify(analyzer.dataset_info())
+
+
+@app.route('/api/admin/search-cache')
+def api_search_cache_stats():
+    """Size, hit ratio and invalidations of the /api/search result cache"""
+    return jsonify(analyzer.search_cache.stats())
+
+
+@app.route('/api/admin/reload', methods=['POST'])
+def api_dataset_reload():
+    """Reload articles_combined.json in the background and swap it in when ready"""
+    started = analyzer.reload_in_background()
+    return jsonify({'started': started, **analyzer.dataset_info()}), 202 if started else 409
+
+
+def ensure_image_file(article, cancel_event: Optional[threading.Event] = None) -> Optional[Path]:
     """Ensure the article image exists locally and return its path."""
     image_url = article.get('image_url')
     if not image_url:
         return None
 
-    destination = build_image_path(article, IMAGES_CACHE_DIR)
-
-    if destination.exists():
-        return destination
-
     try:
-        response = requests.get(image_url, timeout=15)
-        response.raise_for_status()
-        destination.parent.mkdir(parents=True, exist_ok=True)
-        destination.write_bytes(response.content)
+        destination, _ = image_store.fetch(
+            image_url, fetcher=lambda url: download_bytes(url, timeout=15, cancel_event=cancel_event)
+        )
         return destination
     except requests.RequestException as exc:
         print(f"Failed to download image {image_url}: {exc}")
         return None
 
 
-def prepare_image_stream(image_path: Path, max_width: int = 1200, max_height: int = 1200,
+def read_image_bytes(article, cancel_event: Optional[threading.Event] = None) -> Optional[bytes]:
+    """Bytes of the article image, downloaded first if needed (None if it is unavailable)"""
+    for _ in range(2):
+        image_path = ensure_image_file(article, cancel_event)
+        if image_path is None:
+            return None
+        try:
+            return image_path.read_bytes()
+        except FileNotFoundError:
+            # The blob was deleted behind the index: forget it so the next fetch downloads it again
+            if not image_store.forget_missing(article.get('image_url')):
+                return None
+    return None
+
+
+def prepare_image_stream(image_bytes: bytes, max_width: int = 1200, max_height: int = 1200,
                          quality: int = 80) -> Optional[io.BytesIO]:
     """Resize/compress image and return BytesIO stream ready for docx embedding."""
     try:
-        with Image.open(image_path) as img:
+        with Image.open(io.BytesIO(image_bytes)) as img:
             img = img.convert('RGB')
             img.thumbnail((max_width, max_height), Image.LANCZOS)
             output = io.BytesIO()
@@ -870,11 +1546,11 @@ def prepare_image_stream(image_path: Path, max_width: int = 1200, max_height: in
             output.seek(0)
             return output
     except Exception as exc:
-        print(f"Failed to process image {image_path}: {exc}")
+        print(f"Failed to process image: {exc}")
         return None
 
 
-def fetch_article_content_formatted(article) -> str:
+def fetch_article_content_formatted(article, cancel_event: Optional[threading.Event] = None) -> str:
     """Fetch and format full article content; fallback to excerpt if download fails."""
     link = article.get('link')
     if not link:
@@ -888,10 +1564,9 @@ def fetch_article_content_formatted(article) -> str:
     }
 
     try:
-        response = requests.get(link, headers=headers, timeout=15)
-        response.raise_for_status()
+        content = download_bytes(link, headers=headers, timeout=15, cancel_event=cancel_event)
 
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(content, 'html.parser')
 
         selectors = [
             '.wysiwyg--all-content',
@@ -940,6 +1615,8 @@ def fetch_article_content_formatted(article) -> str:
             paragraphs = [text]
 
         return '\n\n'.join(paragraphs)
+    except JobCancelled:
+        raise
     except requests.RequestException as exc:
         print(f"Network error while fetching article content {link}: {exc}")
         return ''
@@ -948,47 +1625,123 @@ def fetch_article_content_formatted(article) -> str:
         return ''
 
 
-def download_images(date=None, limit=None, force=False):
+def download_images(date=None, limit=None, force=False, progress_callback: Optional[Callable] = None,
+                    cancel_event: Optional[threading.Event] = None, max_fetches: Optional[int] = None):
+    """Download article images into the image store, reporting per-image progress and throughput.
+
+    With max_fetches the loop stops (truncated) before making more image requests than that.
+    """
     articles = analyzer.get_articles_with_images(date)
+    total = len(articles)
 
     downloaded = 0
     skipped = 0
     errors = 0
+    bytes_fetched = 0
+    processed = 0
+    files = []
+    started = time.monotonic()
+
+    def report(message):
+        if not progress_callback:
+            return
+        elapsed = max(time.monotonic() - started, 1e-6)
+        stats = {
+            'processed': processed,
+            'total': total,
+            'downloaded': downloaded,
+            'skipped': skipped,
+            'errors': errors,
+            'bytes': bytes_fetched,
+            'elapsed_seconds': round(elapsed, 1),
+            'images_per_second': round(processed / elapsed, 2),
+            'bytes_per_second': int(bytes_fetched / elapsed)
+        }
+        percentage = int(processed * 100 / total) if total else 100
+        progress_callback(percentage, message, 'processing', stats)
+
+    report(f"بدء تنزيل الصور ({total} صورة)")
+
+    fetches = 0
+    truncated = False
+
+    def fetcher(url):
+        nonlocal fetches
+        fetches += 1
+        return download_bytes(url, timeout=15, cancel_event=cancel_event)
 
     for article in articles:
+        check_cancelled(cancel_event)
         if limit and downloaded >= limit:
             break
+        if max_fetches is not None and fetches >= max_fetches:
+            truncated = True
+            break
 
-        destination = build_image_path(article, IMAGES_CACHE_DIR)
         image_url = article.get('image_url')
 
-        if destination.exists() and not force:
-            skipped += 1
-            continue
-
         try:
-            response = requests.get(image_url, timeout=15)
-            response.raise_for_status()
-            destination.write_bytes(response.content)
-            downloaded += 1
+            destination, outcome = image_store.fetch(image_url, force=force, fetcher=fetcher)
         except requests.RequestException as exc:
             errors += 1
+            processed += 1
             print(f"Error downloading image {image_url}: {exc}")
+            report(f"تعذر تنزيل صورة المقال {article.get('id')}")
+            continue
+
+        processed += 1
+        files.append((article, destination))
+        if outcome == 'cached':
+            skipped += 1
+        else:
+            bytes_fetched += destination.stat().st_size
+            if outcome == 'downloaded':
+                downloaded += 1
+            else:
+                skipped += 1
+        report(f"الصورة {processed} من {total}")
 
     return {
-        'requested': len(articles),
+        'requested': total,
         'downloaded': downloaded,
         'skipped': skipped,
-        'errors': errors
+        'errors': errors,
+        'bytes': bytes_fetched,
+        'truncated': truncated,
+        'files': files
     }
 
 
-def create_headline_only_document(date, progress_callback: Optional[Callable] = None):
+def create_images_archive(files, date=None, cancel_event: Optional[threading.Event] = None) -> Tuple[Path, str]:
+    """Pack downloaded images into a ZIP file laid out as <date>/<article id>_<blob>"""
+    filename = f"palestine_news_images_{(date or 'all').replace('-', '_')}.zip"
+
+    def write_archive(path):
+        written = set()
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for article, image_path in files:
+                check_cancelled(cancel_event)
+                arcname = f"{article.get('date') or 'unknown_date'}/{article.get('id', 'article')}_{image_path.name}"
+                if arcname in written:
+                    continue
+                try:
+                    archive.write(image_path, arcname)
+                except FileNotFoundError:
+                    # Deleted since it was indexed: fetch it again
+                    image_bytes = read_image_bytes(article, cancel_event)
+                    if image_bytes is None:
+                        print(f"Skipping missing image {article.get('image_url')}")
+                        continue
+                    archive.writestr(arcname, image_bytes)
+                written.add(arcname)
+
+    return artifacts.write(filename, write_archive), filename
+
+
+def create_headline_only_document(date, progress_callback: Optional[Callable] = None,
+                                  cancel_event: Optional[threading.Event] = None):
     """Create document with headlines and full content (same format as with images, but without images)"""
-    articles = [
-        article for article in analyzer.articles
-        if article.get('date') == date
-    ]
+    articles = analyzer.get_articles_by_date(date)
 
     if not articles:
         if progress_callback:
@@ -1015,6 +1768,7 @@ def create_headline_only_document(date, progress_callback: Optional[Callable] =
     title.alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
     for idx, article in enumerate(articles, start=1):
+        check_cancelled(cancel_event)
         update_progress(0, f"معالجة المقال {idx} من {len(articles)}: {article.get('title', 'بدون عنوان')[:50]}...", "processing")
         
         heading = doc.add_heading(article.get('title', 'بدون عنوان'), level=1)
@@ -1031,7 +1785,7 @@ def create_headline_only_document(date, progress_callback: Optional[Callable] =
         # Fetch and add content (using the same formatted function as with images)
         content_text = ''
         update_progress(0, f"جاري جلب محتوى المقال {idx}...", "processing")
-        content_text = fetch_article_content_formatted(article)
+        content_text = fetch_article_content_formatted(article, cancel_event)
         if not content_text and article.get('excerpt'):
             content_text = article.get('excerpt')
 
@@ -1052,23 +1806,20 @@ def create_headline_only_document(date, progress_callback: Optional[Callable] =
             doc.add_paragraph('-' * 50).alignment = WD_ALIGN_PARAGRAPH.CENTER
             doc.add_paragraph()
  
+    check_cancelled(cancel_event)
     update_progress(1, "جاري حفظ الملف...", "processing")
     footer = doc.add_paragraph(f'تم إنشاء هذا التقرير في: {datetime.now().strftime("%Y-%m-%d %H:%M")}')
     footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
     filename = f"palestine_news_full_content_{date.replace('-', '_')}.docx"
-    filepath = TEMP_DIR / filename
-    doc.save(filepath)
+    filepath = artifacts.write(filename, doc.save)
 
     update_progress(1, "اكتمل إنشاء الملف بنجاح!", "completed")
     return filepath, filename
 
 
 def create_document_with_images(date: str, include_content: bool = True) -> Tuple[Optional[Path], Optional[str]]:
-    articles = [
-        article for article in analyzer.articles
-        if article.get('date') == date
-    ]
+    articles = analyzer.get_articles_by_date(date)
 
     if not articles:
         return None, None
@@ -1080,26 +1831,21 @@ def create_document_with_images(date: str, include_content: bool = True) -> Tupl
     title = doc.add_heading(f'أخبار فلسطين - {analyzer.format_date_arabic(date)}', 0)
     title.alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
-    # Track image files to clean up after document creation
-    used_image_paths = []
-
     for idx, article in enumerate(articles, start=1):
         heading = doc.add_heading(article.get('title', 'بدون عنوان'), level=1)
         heading.alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
-        image_path = ensure_image_file(article)
-        if image_path and image_path.exists():
+        image_bytes = read_image_bytes(article)
+        if image_bytes:
             try:
-                resized_stream = prepare_image_stream(image_path)
+                resized_stream = prepare_image_stream(image_bytes)
                 if resized_stream:
                     doc.add_picture(resized_stream, width=Inches(5.5))
                 else:
-                    doc.add_picture(str(image_path), width=Inches(5.5))
+                    doc.add_picture(io.BytesIO(image_bytes), width=Inches(5.5))
                 doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                # Track this image for cleanup
-                used_image_paths.append(image_path)
             except Exception as exc:
-                print(f"Failed to insert image {image_path}: {exc}")
+                print(f"Failed to insert image {article.get('image_url')}: {exc}")
 
         if article.get('link'):
             cleaned_url = unquote(article['link'])
@@ -1136,34 +1882,24 @@ def create_document_with_images(date: str, include_content: bool = True) -> Tupl
  
     # Use simpler filename format (matching other exports)
     filename = f"palestine_news_with_images_{date.replace('-', '_')}.docx"
-    filepath = TEMP_DIR / filename
-    doc.save(filepath)
-
-    # Clean up cached images after embedding (Option 2)
-    for image_path in used_image_paths:
-        try:
-            if image_path.exists():
-                image_path.unlink()
-                print(f"Cleaned up cached image: {image_path}")
-        except Exception as exc:
-            print(f"Failed to delete cached image {image_path}: {exc}")
+    filepath = artifacts.write(filename, doc.save)
 
+    # Images stay in the shared content-addressed cache: other articles and
+    # later exports reuse the same blobs.
     return filepath, filename
 
 
-def create_document_with_images_progress(date: str, include_content: bool = True, progress_callback: Optional[Callable] = None) -> Tuple[Optional[Path], Optional[str]]:
+def create_document_with_images_progress(date: str, include_content: bool = True, progress_callback: Optional[Callable] = None,
+                                         cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[Path], Optional[str]]:
     """Create document with images, reporting progress via callback"""
-    articles = [
-        article for article in analyzer.articles
-        if article.get('date') == date
-    ]
+    articles = analyzer.get_articles_by_date(date)
 
     if not articles:
         if progress_callback:
             progress_callback(0, "لم يتم العثور على مقالات", "error")
         return None, None
 
-    total_steps = len(articles) * 3 + 3  # per article: image, content, formatting (3 steps) + init (1) + save (1) + cleanup (1)
+    total_steps = len(articles) * 3 + 3  # per article: image, content, formatting (3 steps) + init (1) + save (1) + finish (1)
     current_step = 0
 
     def update_progress(step_increment, message, status="processing"):
@@ -1182,29 +1918,26 @@ def create_document_with_images_progress(date: str, include_content: bool = True
     title = doc.add_heading(f'أخبار فلسطين - {analyzer.format_date_arabic(date)}', 0)
     title.alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
-    # Track image files to clean up after document creation
-    used_image_paths = []
-
     for idx, article in enumerate(articles, start=1):
+        check_cancelled(cancel_event)
         update_progress(0, f"معالجة المقال {idx} من {len(articles)}: {article.get('title', 'بدون عنوان')[:50]}...", "processing")
         
         heading = doc.add_heading(article.get('title', 'بدون عنوان'), level=1)
         heading.alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
         # Download and process image
-        image_path = ensure_image_file(article)
-        if image_path and image_path.exists():
+        image_bytes = read_image_bytes(article, cancel_event)
+        if image_bytes:
             try:
                 update_progress(0, f"إضافة صورة للمقال {idx}...", "processing")
-                resized_stream = prepare_image_stream(image_path)
+                resized_stream = prepare_image_stream(image_bytes)
                 if resized_stream:
                     doc.add_picture(resized_stream, width=Inches(5.5))
                 else:
-                    doc.add_picture(str(image_path), width=Inches(5.5))
+                    doc.add_picture(io.BytesIO(image_bytes), width=Inches(5.5))
                 doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                used_image_paths.append(image_path)
             except Exception as exc:
-                print(f"Failed to insert image {image_path}: {exc}")
+                print(f"Failed to insert image {article.get('image_url')}: {exc}")
         update_progress(1, f"تمت إضافة صورة المقال {idx}", "processing")
 
         # Add link
@@ -1219,7 +1952,7 @@ def create_document_with_images_progress(date: str, include_content: bool = True
         content_text = ''
         if include_content:
             update_progress(0, f"جاري جلب محتوى المقال {idx}...", "processing")
-            content_text = fetch_article_content_formatted(article)
+            content_text = fetch_article_content_formatted(article, cancel_event)
             if not content_text and article.get('excerpt'):
                 content_text = article.get('excerpt')
         else:
@@ -1243,24 +1976,15 @@ def create_document_with_images_progress(date: str, include_content: bool = True
         
         update_progress(1, f"اكتمل المقال {idx}", "processing")
  
+    check_cancelled(cancel_event)
     update_progress(1, "جاري حفظ الملف...", "processing")
     footer = doc.add_paragraph(f'تم إنشاء هذا التقرير في: {datetime.now().strftime("%Y-%m-%d %H:%M")}')
     footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
  
     # Use simpler filename format (matching other exports)
     filename = f"palestine_news_with_images_{date.replace('-', '_')}.docx"
-    filepath = TEMP_DIR / filename
-    doc.save(filepath)
+    filepath = artifacts.write(filename, doc.save)
 
-    # Clean up cached images after embedding (Option 2)
-    update_progress(0, "جاري تنظيف الصور المؤقتة...", "processing")
-    for image_path in used_image_paths:
-        try:
-            if image_path.exists():
-                image_path.unlink()
-        except Exception as exc:
-            print(f"Failed to delete cached image {image_path}: {exc}")
-    
     update_progress(1, "اكتمل إنشاء الملف بنجاح!", "completed")
     return filepath, filename
 
@@ -1277,7 +2001,7 @@ def api_export_headline_only():
     if not filepath:
         return jsonify({'error': 'No articles found for the specified date'}), 404
 
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    return send_artifact(filepath, filename, DOCX_MIMETYPE)
 
 
 @app.route('/api/export/word-with-images')
@@ -1305,17 +2029,7 @@ def api_export_with_images():
     
     # Ensure filename is properly encoded for Content-Disposition header
     try:
-        response = send_file(
-            filepath_str, 
-            as_attachment=True, 
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
-        
-        # Explicitly set Content-Disposition header to ensure correct filename
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"; filename*=UTF-8\'\'{quote(filename)}'
-        
-        return response
+        return send_artifact(filepath_str, filename, DOCX_MIMETYPE)
     except Exception as e:
         print(f"Error sending file: {e}")
         return jsonify({'error': f'Failed to send file: {str(e)}'}), 500
@@ -1331,139 +2045,30 @@ def api_export_with_images_start():
     if not date:
         return jsonify({'error': 'Date parameter is required'}), 400
 
-    # Generate unique job ID
-    job_id = str(uuid.uuid4())
-    
-    # Initialize progress
-    with progress_lock:
-        progress_tracker[job_id] = {
-            'percentage': 0,
-            'message': 'بدء العملية...',
-            'status': 'processing',
-            'filepath': None,
-            'filename': None,
-            'error': None
-        }
-
-    # Start document creation in background thread
-    def create_document_thread():
-        def progress_callback(percentage, message, status):
-            with progress_lock:
-                if job_id in progress_tracker:
-                    progress_tracker[job_id]['percentage'] = percentage
-                    progress_tracker[job_id]['message'] = message
-                    progress_tracker[job_id]['status'] = status
-
-        try:
-            filepath, filename = create_document_with_images_progress(
-                date, include_content, progress_callback
-            )
-            with progress_lock:
-                if job_id in progress_tracker:
-                    if filepath:
-                        progress_tracker[job_id]['filepath'] = str(filepath.resolve()) if isinstance(filepath, Path) else filepath
-                        progress_tracker[job_id]['filename'] = filename
-                        progress_tracker[job_id]['status'] = 'completed'
-                        progress_tracker[job_id]['percentage'] = 100
-                        progress_tracker[job_id]['message'] = 'اكتمل إنشاء الملف بنجاح!'
-                    else:
-                        progress_tracker[job_id]['status'] = 'error'
-                        progress_tracker[job_id]['error'] = 'لم يتم العثور على مقالات'
-        except Exception as e:
-            with progress_lock:
-                if job_id in progress_tracker:
-                    progress_tracker[job_id]['status'] = 'error'
-                    progress_tracker[job_id]['error'] = str(e)
-                    progress_tracker[job_id]['message'] = f'حدث خطأ: {str(e)}'
+    def build(progress_callback, cancel_event):
+        return create_document_with_images_progress(date, include_content, progress_callback, cancel_event)
 
-    thread = threading.Thread(target=create_document_thread)
-    thread.daemon = True
-    thread.start()
-
-    return jsonify({'job_id': job_id})
+    return jsonify({'job_id': start_export_job(build)})
 
 
 @app.route('/api/export/word-with-images/progress/<job_id>')
 def api_export_with_images_progress(job_id):
     """SSE endpoint for streaming progress updates"""
-    def generate():
-        last_percentage = -1
-        while True:
-            with progress_lock:
-                progress = progress_tracker.get(job_id, {})
-                percentage = progress.get('percentage', 0)
-                message = progress.get('message', '')
-                status = progress.get('status', 'processing')
-                filepath = progress.get('filepath')
-                filename = progress.get('filename')
-                error = progress.get('error')
-
-            # Only send update if percentage changed or status changed
-            if percentage != last_percentage or status in ['completed', 'error']:
-                data = {
-                    'percentage': percentage,
-                    'message': message,
-                    'status': status
-                }
-                
-                if status == 'completed' and filepath and filename:
-                    data['filepath'] = filepath
-                    data['filename'] = filename
-                    data['download_url'] = f'/api/export/word-with-images/download/{job_id}'
-                
-                if status == 'error' and error:
-                    data['error'] = error
-
-                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-                last_percentage = percentage
-
-                if status in ['completed', 'error']:
-                    # Clean up after a delay
-                    time.sleep(2)
-                    with progress_lock:
-                        if job_id in progress_tracker:
-                            del progress_tracker[job_id]
-                    break
-
-            time.sleep(0.5)  # Update every 500ms
-
-    return Response(
-        stream_with_context(generate()),
-        mimetype='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'X-Accel-Buffering': 'no',
-            'Connection': 'keep-alive'
-        }
-    )
+    return stream_job_progress(job_id, f'/api/export/word-with-images/download/{job_id}')
 
 
 @app.route('/api/export/word-with-images/download/<job_id>')
 def api_export_with_images_download(job_id):
     """Download the completed document"""
-    with progress_lock:
-        progress = progress_tracker.get(job_id, {})
-        filepath = progress.get('filepath')
-        filename = progress.get('filename')
+    return send_job_file(job_id)
 
-    if not filepath or not filename:
-        return jsonify({'error': 'File not found or job not completed'}), 404
-
-    if not os.path.exists(filepath):
-        return jsonify({'error': 'Generated file not found'}), 404
 
-    try:
-        response = send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"; filename*=UTF-8\'\'{quote(filename)}'
-        return response
-    except Exception as e:
-        print(f"Error sending file: {e}")
-        return jsonify({'error': f'Failed to send file: {str(e)}'}), 500
+@app.route('/api/export/word-with-images/cancel/<job_id>', methods=['POST'])
+def api_export_with_images_cancel(job_id):
+    """Cancel a running export job"""
+    if not cancel_job(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify({'job_id': job_id, 'status': 'cancelling'})
 
 
 @app.route('/api/export/word/start', methods=['POST'])
@@ -1476,55 +2081,17 @@ def api_export_word_start():
     if not date:
         return jsonify({'error': 'Date parameter is required'}), 400
 
-    articles = [a for a in analyzer.articles if a.get('date') == date]
+    articles = analyzer.get_articles_by_date(date)
     if not articles:
         return jsonify({'error': 'No articles found for the specified date'}), 404
 
-    job_id = str(uuid.uuid4())
-    
-    with progress_lock:
-        progress_tracker[job_id] = {
-            'percentage': 0,
-            'message': 'بدء العملية...',
-            'status': 'processing',
-            'filepath': None,
-            'filename': None,
-            'error': None
-        }
-
-    def create_document_thread():
-        def progress_callback(percentage, message, status):
-            with progress_lock:
-                if job_id in progress_tracker:
-                    progress_tracker[job_id]['percentage'] = percentage
-                    progress_tracker[job_id]['message'] = message
-                    progress_tracker[job_id]['status'] = status
-
-        try:
-            doc = analyzer.create_word_document(articles, date, include_content, progress_callback)
-            filename = f"palestine_news_with_summaries_{date.replace('-', '_')}.docx"
-            filepath = TEMP_DIR / filename
-            doc.save(filepath)
-            
-            with progress_lock:
-                if job_id in progress_tracker:
-                    progress_tracker[job_id]['filepath'] = str(filepath.resolve())
-                    progress_tracker[job_id]['filename'] = filename
-                    progress_tracker[job_id]['status'] = 'completed'
-                    progress_tracker[job_id]['percentage'] = 100
-                    progress_tracker[job_id]['message'] = 'اكتمل إنشاء الملف بنجاح!'
-        except Exception as e:
-            with progress_lock:
-                if job_id in progress_tracker:
-                    progress_tracker[job_id]['status'] = 'error'
-                    progress_tracker[job_id]['error'] = str(e)
-                    progress_tracker[job_id]['message'] = f'حدث خطأ: {str(e)}'
-
-    thread = threading.Thread(target=create_document_thread)
-    thread.daemon = True
-    thread.start()
+    def build(progress_callback, cancel_event):
+        doc = analyzer.create_word_document(articles, date, include_content, progress_callback, cancel_event)
+        filename = f"palestine_news_with_summaries_{date.replace('-', '_')}.docx"
+        filepath = artifacts.write(filename, doc.save)
+        return filepath, filename
 
-    return jsonify({'job_id': job_id})
+    return jsonify({'job_id': start_export_job(build)})
 
 
 @app.route('/api/export/headline-only/start', methods=['POST'])
@@ -1536,219 +2103,56 @@ def api_export_headline_only_start():
     if not date:
         return jsonify({'error': 'Date parameter is required'}), 400
 
-    job_id = str(uuid.uuid4())
-    
-    with progress_lock:
-        progress_tracker[job_id] = {
-            'percentage': 0,
-            'message': 'بدء العملية...',
-            'status': 'processing',
-            'filepath': None,
-            'filename': None,
-            'error': None
-        }
-
-    def create_document_thread():
-        def progress_callback(percentage, message, status):
-            with progress_lock:
-                if job_id in progress_tracker:
-                    progress_tracker[job_id]['percentage'] = percentage
-                    progress_tracker[job_id]['message'] = message
-                    progress_tracker[job_id]['status'] = status
-
-        try:
-            filepath, filename = create_headline_only_document(date, progress_callback)
-            with progress_lock:
-                if job_id in progress_tracker:
-                    if filepath:
-                        progress_tracker[job_id]['filepath'] = str(filepath.resolve()) if isinstance(filepath, Path) else filepath
-                        progress_tracker[job_id]['filename'] = filename
-                        progress_tracker[job_id]['status'] = 'completed'
-                        progress_tracker[job_id]['percentage'] = 100
-                        progress_tracker[job_id]['message'] = 'اكتمل إنشاء الملف بنجاح!'
-                    else:
-                        progress_tracker[job_id]['status'] = 'error'
-                        progress_tracker[job_id]['error'] = 'لم يتم العثور على مقالات'
-        except Exception as e:
-            with progress_lock:
-                if job_id in progress_tracker:
-                    progress_tracker[job_id]['status'] = 'error'
-                    progress_tracker[job_id]['error'] = str(e)
-                    progress_tracker[job_id]['message'] = f'حدث خطأ: {str(e)}'
-
-    thread = threading.Thread(target=create_document_thread)
-    thread.daemon = True
-    thread.start()
+    def build(progress_callback, cancel_event):
+        return create_headline_only_document(date, progress_callback, cancel_event)
 
-    return jsonify({'job_id': job_id})
+    return jsonify({'job_id': start_export_job(build)})
 
 
 @app.route('/api/export/word/progress/<job_id>')
 def api_export_word_progress(job_id):
     """SSE endpoint for streaming progress updates (word with summaries)"""
-    def generate():
-        last_percentage = -1
-        while True:
-            with progress_lock:
-                progress = progress_tracker.get(job_id, {})
-                percentage = progress.get('percentage', 0)
-                message = progress.get('message', '')
-                status = progress.get('status', 'processing')
-                filepath = progress.get('filepath')
-                filename = progress.get('filename')
-                error = progress.get('error')
-
-            if percentage != last_percentage or status in ['completed', 'error']:
-                data = {
-                    'percentage': percentage,
-                    'message': message,
-                    'status': status
-                }
-                
-                if status == 'completed' and filepath and filename:
-                    data['filepath'] = filepath
-                    data['filename'] = filename
-                    data['download_url'] = f'/api/export/word/download/{job_id}'
-                
-                if status == 'error' and error:
-                    data['error'] = error
-
-                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-                last_percentage = percentage
-
-                if status in ['completed', 'error']:
-                    time.sleep(2)
-                    with progress_lock:
-                        if job_id in progress_tracker:
-                            del progress_tracker[job_id]
-                    break
-
-            time.sleep(0.5)
-
-    return Response(
-        stream_with_context(generate()),
-        mimetype='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'X-Accel-Buffering': 'no',
-            'Connection': 'keep-alive'
-        }
-    )
+    return stream_job_progress(job_id, f'/api/export/word/download/{job_id}')
 
 
 @app.route('/api/export/headline-only/progress/<job_id>')
 def api_export_headline_only_progress(job_id):
     """SSE endpoint for streaming progress updates (headline only)"""
-    def generate():
-        last_percentage = -1
-        while True:
-            with progress_lock:
-                progress = progress_tracker.get(job_id, {})
-                percentage = progress.get('percentage', 0)
-                message = progress.get('message', '')
-                status = progress.get('status', 'processing')
-                filepath = progress.get('filepath')
-                filename = progress.get('filename')
-                error = progress.get('error')
-
-            if percentage != last_percentage or status in ['completed', 'error']:
-                data = {
-                    'percentage': percentage,
-                    'message': message,
-                    'status': status
-                }
-                
-                if status == 'completed' and filepath and filename:
-                    data['filepath'] = filepath
-                    data['filename'] = filename
-                    data['download_url'] = f'/api/export/headline-only/download/{job_id}'
-                
-                if status == 'error' and error:
-                    data['error'] = error
-
-                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-                last_percentage = percentage
-
-                if status in ['completed', 'error']:
-                    time.sleep(2)
-                    with progress_lock:
-                        if job_id in progress_tracker:
-                            del progress_tracker[job_id]
-                    break
-
-            time.sleep(0.5)
-
-    return Response(
-        stream_with_context(generate()),
-        mimetype='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'X-Accel-Buffering': 'no',
-            'Connection': 'keep-alive'
-        }
-    )
+    return stream_job_progress(job_id, f'/api/export/headline-only/download/{job_id}')
 
 
 @app.route('/api/export/word/download/<job_id>')
 def api_export_word_download(job_id):
     """Download the completed document (word with summaries)"""
-    with progress_lock:
-        progress = progress_tracker.get(job_id, {})
-        filepath = progress.get('filepath')
-        filename = progress.get('filename')
+    return send_job_file(job_id)
 
-    if not filepath or not filename:
-        return jsonify({'error': 'File not found or job not completed'}), 404
 
-    if not os.path.exists(filepath):
-        return jsonify({'error': 'Generated file not found'}), 404
-
-    try:
-        response = send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"; filename*=UTF-8\'\'{quote(filename)}'
-        return response
-    except Exception as e:
-        print(f"Error sending file: {e}")
-        return jsonify({'error': f'Failed to send file: {str(e)}'}), 500
+@app.route('/api/export/word/cancel/<job_id>', methods=['POST'])
+def api_export_word_cancel(job_id):
+    """Cancel a running export job"""
+    if not cancel_job(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify({'job_id': job_id, 'status': 'cancelling'})
 
 
 @app.route('/api/export/headline-only/download/<job_id>')
 def api_export_headline_only_download(job_id):
     """Download the completed document (headline only)"""
-    with progress_lock:
-        progress = progress_tracker.get(job_id, {})
-        filepath = progress.get('filepath')
-        filename = progress.get('filename')
+    return send_job_file(job_id)
 
-    if not filepath or not filename:
-        return jsonify({'error': 'File not found or job not completed'}), 404
 
-    if not os.path.exists(filepath):
-        return jsonify({'error': 'Generated file not found'}), 404
-
-    try:
-        response = send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"; filename*=UTF-8\'\'{quote(filename)}'
-        return response
-    except Exception as e:
-        print(f"Error sending file: {e}")
-        return jsonify({'error': f'Failed to send file: {str(e)}'}), 500
+@app.route('/api/export/headline-only/cancel/<job_id>', methods=['POST'])
+def api_export_headline_only_cancel(job_id):
+    """Cancel a running export job"""
+    if not cancel_job(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify({'job_id': job_id, 'status': 'cancelling'})
 
 
 @app.route('/api/article/<int:article_id>/content')
 def api_article_content(article_id):
     """API endpoint to fetch full article content"""
-    article = next((a for a in analyzer.articles if a.get('id') == article_id), None)
+    article = analyzer.get_article(article_id)
     if not article:
         return jsonify({'error': 'Article not found'}), 404
     
@@ -1769,10 +2173,7 @@ def api_export_word():
         return jsonify({'error': 'Date parameter is required'}), 400
     
     # Get articles for the specified date
-    articles = []
-    for article in analyzer.articles:
-        if article.get('date') == date:
-            articles.append(article)
+    articles = analyzer.get_articles_by_date(date)
     
     if not articles:
         return jsonify({'error': 'No articles found for the specified date'}), 404
@@ -1781,16 +2182,11 @@ def api_export_word():
         # Create Word document
         doc = analyzer.create_word_document(articles, date, include_content)
         
-        # Save to temporary file
+        # Save to a unique temporary file
         filename = f"palestine_news_with_summaries_{date.replace('-', '_')}.docx"
-        temp_path = os.path.join('temp', filename)
-        
-        # Create temp directory if it doesn't exist
-        os.makedirs('temp', exist_ok=True)
-        
-        doc.save(temp_path)
+        temp_path = artifacts.write(filename, doc.save)
         
-        return send_file(temp_path, as_attachment=True, download_name=filename)
+        return send_artifact(temp_path, filename, DOCX_MIMETYPE)
         
     except Exception as e:
         print(f"Error creating Word document: {e}")
@@ -1800,7 +2196,7 @@ def api_export_word():
 def article_detail(article_id):
     """Article detail page"""
     lang = get_language()
-    article = next((a for a in analyzer.articles if a.get('id') == article_id), None)
+    article = analyzer.get_article(article_id)
     if not article:
         return "Article not found", 404
     return render_template('article_detail.html', article=article, lang=lang)
@@ -7,10 +7,17 @@ Extracts articles from HTML file and creates structured data
 
 import re
 import json
+import sys
+import time
 from datetime import datetime
+from html.parser import HTMLParser
 from bs4 import BeautifulSoup
 import html
 
+# Elements that never have children or an end tag
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
 def clean_text(text):
     """Clean and normalize text"""
     if not text:
@@ -21,36 +28,134 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
+# Date formats understood by parse_date: (pattern, group numbers of year, month, day)
+DATE_PATTERNS = [
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), (3, 2, 1)),  # DD/MM/YYYY format (most common in this data)
+    (re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'), (1, 2, 3)),  # YYYY-MM-DD format
+    (re.compile(r'(\d{1,2})-(\d{1,2})-(\d{4})'), (3, 2, 1)),  # DD-MM-YYYY format
+    (re.compile(r'(\d{4})/(\d{1,2})/(\d{1,2})'), (1, 2, 3)),  # YYYY/MM/DD format
+]
+URL_DATE_PATTERN = re.compile(r'/(\d{4})/(\d{1,2})/(\d{1,2})/')  # like /2024/7/16/
+TEXT_DATE_PATTERNS = [
+    re.compile(r'(\d{1,2}/\d{1,2}/\d{4})'),  # DD/MM/YYYY or MM/DD/YYYY
+    re.compile(r'(\d{4}-\d{2}-\d{2})'),      # YYYY-MM-DD
+    re.compile(r'(\d{1,2}-\d{1,2}-\d{4})'),  # DD-MM-YYYY or MM-DD-YYYY
+]
+
 def parse_date(date_text):
     """Parse date from various formats to standard format"""
     if not date_text:
         return None
-    
-    # Try multiple date patterns
-    patterns = [
-        # DD/MM/YYYY format (most common in this data)
-        (r'(\d{1,2})/(\d{1,2})/(\d{4})', lambda m: (int(m.group(3)), int(m.group(2)), int(m.group(1)))),  # year, month, day
-        # YYYY-MM-DD format
-        (r'(\d{4})-(\d{1,2})-(\d{1,2})', lambda m: (int(m.group(1)), int(m.group(2)), int(m.group(3)))),     # year, month, day
-        # DD-MM-YYYY format
-        (r'(\d{1,2})-(\d{1,2})-(\d{4})', lambda m: (int(m.group(3)), int(m.group(2)), int(m.group(1)))), # year, month, day
-        # YYYY/MM/DD format
-        (r'(\d{4})/(\d{1,2})/(\d{1,2})', lambda m: (int(m.group(1)), int(m.group(2)), int(m.group(3)))), # year, month, day
-    ]
-    
-    for pattern, date_parser in patterns:
-        date_match = re.search(pattern, date_text)
+
+    for pattern, groups in DATE_PATTERNS:
+        date_match = pattern.search(date_text)
         if date_match:
             try:
-                year, month, day = date_parser(date_match)
+                year, month, day = (int(date_match.group(group)) for group in groups)
                 return datetime(year, month, day).strftime('%Y-%m-%d')
-            except (ValueError, IndexError):
+            except ValueError:
                 continue
-    
+
     return None
 
+class DateExtractor:
+    """Finds and parses article dates, counting which strategy resolved each article.
+
+    Strategies are tried in a fixed order, each only when the previous ones
+    found nothing: the "Published On" screen-reader text, the <time datetime>
+    attribute, the /YYYY/M/D/ part of the link and finally a scan of the whole
+    article text. The element lookups are passed as callables so the costly
+    ones (tree searches, the full text) only run when they are needed, and
+    parsed dates are cached per date_text (a page has only a few hundred).
+    """
+
+    STRATEGIES = ('screen_reader', 'time', 'url', 'text', 'none')
+
+    def __init__(self):
+        self.strategy_counts = dict.fromkeys(self.STRATEGIES, 0)
+        self.examples = {}       # strategy -> first date_text it produced
+        self._parsed = {}        # date_text -> parsed date
+        self.cache_hits = 0
+
+    def parse(self, date_text):
+        """parse_date with a per-date_text cache"""
+        try:
+            date = self._parsed[date_text]
+            self.cache_hits += 1
+        except KeyError:
+            date = self._parsed[date_text] = parse_date(date_text)
+        return date
+
+    def find(self, get_screen_reader_text, get_time_datetime, link, get_article_text):
+        """Return (date_text, strategy) for one article"""
+        # Method 1: Look for screen-reader-text with "Published On"
+        screen_reader_text = get_screen_reader_text()
+        if screen_reader_text and "Published On" in screen_reader_text:
+            return screen_reader_text, 'screen_reader'
+
+        # Method 2: Look for time elements with datetime attribute
+        time_datetime = get_time_datetime()
+        if time_datetime:
+            return f"Published On {time_datetime}", 'time'
+
+        # Method 3: Look for date in URL pattern (extract from link)
+        url_date_match = URL_DATE_PATTERN.search(link) if link else None
+        if url_date_match:
+            year, month, day = url_date_match.groups()
+            return f"Published On {day}/{month}/{year}", 'url'
+
+        # Method 4: Look for any element containing date patterns
+        article_text = get_article_text()
+        for pattern in TEXT_DATE_PATTERNS:
+            match = pattern.search(article_text)
+            if match:
+                return f"Published On {match.group(1)}", 'text'
+        return "", 'none'
+
+    def extract(self, get_screen_reader_text, get_time_datetime, link, get_article_text):
+        """Return (date_text, date) for one article and record the strategy used"""
+        date_text, strategy = self.find(get_screen_reader_text, get_time_datetime, link, get_article_text)
+        self.strategy_counts[strategy] += 1
+        self.examples.setdefault(strategy, date_text)
+        return date_text, self.parse(date_text)
+
+    def print_report(self):
+        total = sum(self.strategy_counts.values())
+        print(f"Date strategies ({total} articles, {len(self._parsed)} distinct date texts, {self.cache_hits} cache hits):")
+        for strategy in self.STRATEGIES:
+            count = self.strategy_counts[strategy]
+            if count:
+                print(f"  - {strategy}: {count} (e.g. {self.examples[strategy]!r})")
+
+def make_article_record(article_id, title, excerpt, link, date_text, date, image_url, article_class):
+    """Build the article record, or None when it has no title or link"""
+    if not (title and link):
+        return None
+
+    # Extract article type
+    article_type = "post"
+    if 'gc--type-video' in article_class:
+        article_type = "video"
+    elif 'gc--type-liveblog' in article_class:
+        article_type = "liveblog"
+    elif 'gc--type-episode' in article_class:
+        article_type = "episode"
+
+    return {
+        'id': article_id,
+        'title': title,
+        'excerpt': excerpt,
+        'link': link,
+        'date': date,
+        'date_text': date_text,
+        'image_url': image_url,
+        'type': article_type,
+        'source': 'Al Jazeera'
+    }
+
 def extract_articles(html_file_path):
     """Extract articles from HTML file"""
+    dates = DateExtractor()
     
     print(f"Reading HTML file: {html_file_path}")
     
@@ -90,78 +195,27 @@ def extract_articles(html_file_path):
                     excerpt = clean_text(p_elem.get_text())
             
             # Extract date - improved logic to handle different date formats
-            date_text = ""
-            
-            # Method 1: Look for screen-reader-text with "Published On"
-            date_elem = article.find('span', class_='screen-reader-text')
-            if date_elem and "Published On" in date_elem.get_text():
-                date_text = date_elem.get_text()
-            
-            # Method 2: Look for time elements with datetime attribute
-            if not date_text:
+            def screen_reader_text(article=article):
+                date_elem = article.find('span', class_='screen-reader-text')
+                return date_elem.get_text() if date_elem else None
+
+            def time_datetime(article=article):
                 time_elem = article.find('time')
-                if time_elem:
-                    datetime_attr = time_elem.get('datetime', '')
-                    if datetime_attr:
-                        date_text = f"Published On {datetime_attr}"
-            
-            # Method 3: Look for date in URL pattern (extract from link)
-            if not date_text and link:
-                # Extract date from URL like /2024/7/16/
-                url_date_match = re.search(r'/(\d{4})/(\d{1,2})/(\d{1,2})/', link)
-                if url_date_match:
-                    year, month, day = url_date_match.groups()
-                    date_text = f"Published On {day}/{month}/{year}"
-            
-            # Method 4: Look for any element containing date patterns
-            if not date_text:
-                # Search all text in the article for date patterns
-                article_text = article.get_text()
-                date_patterns = [
-                    r'(\d{1,2}/\d{1,2}/\d{4})',  # DD/MM/YYYY or MM/DD/YYYY
-                    r'(\d{4}-\d{2}-\d{2})',      # YYYY-MM-DD
-                    r'(\d{1,2}-\d{1,2}-\d{4})'   # DD-MM-YYYY or MM-DD-YYYY
-                ]
-                for pattern in date_patterns:
-                    match = re.search(pattern, article_text)
-                    if match:
-                        date_text = f"Published On {match.group(1)}"
-                        break
-            
+                return time_elem.get('datetime', '') if time_elem else ''
+
+            date_text, date = dates.extract(screen_reader_text, time_datetime, link, article.get_text)
+
             # Extract image
             img_elem = article.find('img', class_='gc__image')
             image_url = ""
             if img_elem:
                 image_url = img_elem.get('src', '')
-            
-            # Extract article type
-            article_class = article.get('class', [])
-            article_type = "post"
-            if 'gc--type-video' in article_class:
-                article_type = "video"
-            elif 'gc--type-liveblog' in article_class:
-                article_type = "liveblog"
-            elif 'gc--type-episode' in article_class:
-                article_type = "episode"
-            
-            # Parse date
-            parsed_date = parse_date(date_text)
-            
+
             # Only include articles with valid data
-            if title and link:
-                article_data = {
-                    'id': i + 1,
-                    'title': title,
-                    'excerpt': excerpt,
-                    'link': link,
-                    'date': parsed_date,
-                    'date_text': date_text,
-                    'image_url': image_url,
-                    'type': article_type,
-                    'source': 'Al Jazeera'
-                }
+            article_data = make_article_record(i + 1, title, excerpt, link, date_text, date, image_url, article.get('class', []))
+            if article_data:
                 articles.append(article_data)
-                
+
         except Exception as e:
             print(f"Error processing article {i}: {e}")
             continue
@@ -170,8 +224,219 @@ def extract_articles(html_file_path):
     articles.sort(key=lambda x: x['date'] or '1900-01-01', reverse=True)
     
     print(f"Successfully extracted {len(articles)} articles")
+    dates.print_report()
     return articles
 
+class ArticleStreamParser(HTMLParser):
+    """Event-based extractor: emits each article record as its <article class="gc"> closes.
+
+    Only the fields of the article being parsed are kept, so memory does not
+    grow with the size of the page. Fields are picked with the same rules as
+    extract_articles (first matching element inside the article).
+    """
+
+    def __init__(self, dates=None):
+        super().__init__(convert_charrefs=True)
+        self.dates = dates or DateExtractor()
+        self.completed = []      # records finished since the last drain()
+        self.article_count = 0   # <article class="gc"> elements seen
+        self.errors = 0
+        self._reset_article()
+        self._article = None     # class list of the article being parsed
+
+    def _reset_article(self):
+        self._stack = []         # open tags inside the article (index 0 is the article)
+        self._roles = {}         # role -> stack index of the open element
+        self._seen = set()       # roles already matched (only the first match counts)
+        self._text = {}          # role -> collected text parts
+        self._article_text = []
+        self._link = ''
+        self._time_datetime = ''
+        self._image_url = ''
+
+    def _open_role(self, role):
+        self._seen.add(role)
+        self._roles[role] = len(self._stack) - 1
+        self._text[role] = []
+
+    def handle_starttag(self, tag, attrs):
+        if self._article is None:
+            if tag == 'article':
+                classes = (dict(attrs).get('class') or '').split()
+                if 'gc' in classes:
+                    self._reset_article()
+                    self._article = classes
+                    self._stack.append(tag)
+            return
+
+        attributes = dict(attrs)
+        classes = (attributes.get('class') or '').split()
+        if tag not in VOID_ELEMENTS:
+            self._stack.append(tag)
+        roles, seen = self._roles, self._seen
+
+        if tag == 'h3' and 'gc__title' in classes and 'title' not in seen:
+            self._open_role('title')
+        elif tag == 'a' and 'title' in roles and 'title_link' not in seen:
+            self._open_role('title_link')
+            self._link = attributes.get('href') or ''
+        elif tag == 'span' and 'title_link' in roles and 'title_span' not in seen:
+            self._open_role('title_span')
+        elif tag == 'div' and 'gc__excerpt' in classes and 'excerpt' not in seen:
+            self._open_role('excerpt')
+        elif tag == 'p' and 'excerpt' in roles and 'excerpt_p' not in seen:
+            self._open_role('excerpt_p')
+
+        if tag == 'span' and 'screen-reader-text' in classes and 'date' not in seen:
+            self._open_role('date')
+        elif tag == 'time' and 'time' not in seen:
+            self._seen.add('time')
+            self._time_datetime = attributes.get('datetime') or ''
+        elif tag == 'img' and 'gc__image' in classes and 'image' not in seen:
+            self._seen.add('image')
+            self._image_url = attributes.get('src') or ''
+
+    def handle_endtag(self, tag):
+        if self._article is None:
+            return
+        # Close the most recent open element with this name (and anything left open inside it)
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index] == tag:
+                break
+        else:
+            return
+        del self._stack[index:]
+        for role in [role for role, depth in self._roles.items() if depth >= index]:
+            del self._roles[role]
+        if not self._stack:
+            self._finish_article()
+
+    def handle_data(self, data):
+        if self._article is None:
+            return
+        self._article_text.append(data)
+        for role in self._roles:
+            self._text[role].append(data)
+
+    def _finish_article(self):
+        self.article_count += 1
+        try:
+            date_text, date = self.dates.extract(
+                lambda: ''.join(self._text['date']) if 'date' in self._text else None,
+                lambda: self._time_datetime,
+                self._link,
+                lambda: ''.join(self._article_text)
+            )
+            record = make_article_record(
+                self.article_count,
+                clean_text(''.join(self._text.get('title_span', ()))),
+                clean_text(''.join(self._text.get('excerpt_p', ()))),
+                self._link,
+                date_text,
+                date,
+                self._image_url,
+                self._article
+            )
+            if record:
+                self.completed.append(record)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error processing article {self.article_count - 1}: {e}")
+        self._article = None
+        self._reset_article()
+
+    def drain(self):
+        """Return and forget the records completed so far"""
+        records, self.completed = self.completed, []
+        return records
+
+def iter_articles(html_file_path, chunk_size=1024 * 1024, dates=None):
+    """Stream article records from an HTML file in document order"""
+    parser = ArticleStreamParser(dates)
+    with open(html_file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+def extract_articles_to_jsonl(html_file_path, output_file):
+    """Extract articles from an HTML file into a JSONL file, one article per line as it is parsed.
+
+    Unlike extract_articles the records are written in page order (the saved
+    scroll pages are already newest first) instead of being sorted by date.
+    """
+    print(f"Streaming HTML file: {html_file_path}")
+    started = time.perf_counter()
+    dates = DateExtractor()
+    count = 0
+    with open(output_file, 'w', encoding='utf-8') as out:
+        for article in iter_articles(html_file_path, dates=dates):
+            out.write(json.dumps(article, ensure_ascii=False))
+            out.write('\n')
+            count += 1
+            if count % 10000 == 0:
+                print(f"  {count:,} articles...")
+    elapsed = time.perf_counter() - started
+    print(f"Successfully extracted {count} articles in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} articles/s)")
+    dates.print_report()
+    print(f"Articles saved to: {output_file}")
+    return count
+
+def benchmark_dates(html_file_path, repeat=20):
+    """Micro-benchmark of date discovery and parsing over the articles of a saved page"""
+    with open(html_file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    article_elements = soup.find_all('article', class_='gc')
+    inputs = []
+    for article in article_elements:
+        title_elem = article.find('h3', class_='gc__title')
+        link_elem = title_elem.find('a') if title_elem else None
+        inputs.append((article, link_elem.get('href', '') if link_elem else ''))
+
+    def screen_reader_text(article):
+        date_elem = article.find('span', class_='screen-reader-text')
+        return date_elem.get_text() if date_elem else None
+
+    def time_datetime(article):
+        time_elem = article.find('time')
+        return time_elem.get('datetime', '') if time_elem else ''
+
+    dates = DateExtractor()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        date_texts = [
+            dates.find(lambda: screen_reader_text(article), lambda: time_datetime(article), link, article.get_text)[0]
+            for article, link in inputs
+        ]
+    find_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for date_text in date_texts:
+            parse_date(date_text)
+    parse_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for date_text in date_texts:
+            dates.parse(date_text)
+    cached_seconds = time.perf_counter() - started
+
+    dates = DateExtractor()  # fresh counters for the strategy report
+    for article, link in inputs:
+        dates.extract(lambda: screen_reader_text(article), lambda: time_datetime(article), link, article.get_text)
+
+    runs = max(len(inputs) * repeat, 1)
+    print(f"Date benchmark: {len(inputs)} articles x {repeat} runs")
+    print(f"  find date text:  {find_seconds / runs * 1e6:8.1f} µs/article")
+    print(f"  parse_date:      {parse_seconds / runs * 1e6:8.1f} µs/article")
+    print(f"  cached parse:    {cached_seconds / runs * 1e6:8.1f} µs/article")
+    dates.print_report()
+
 def save_articles_to_json(articles, output_file):
     """Save articles to JSON file"""
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -181,7 +446,21 @@ def save_articles_to_json(articles, output_file):
 def main():
     input_file = r"C:\Users\User\Documents\gazza_app\palestine_news_1.html"
     output_file = r"C:\Users\User\Documents\gazza_app\articles_data_1.json"
-    
+    if len(sys.argv) == 3 and sys.argv[1] == '--benchmark-dates':
+        benchmark_dates(sys.argv[2])
+        return
+    if len(sys.argv) >= 3:
+        input_file, output_file = sys.argv[1], sys.argv[2]
+
+    # A .jsonl output streams the page instead of building the whole document tree
+    if output_file.endswith('.jsonl'):
+        try:
+            extract_articles_to_jsonl(input_file, output_file)
+            print(f"\n✅ Article extraction completed successfully!")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+        return
+
     try:
         articles = extract_articles(input_file)
         save_articles_to_json(articles, output_file)
@@ -0,0 +1,1102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact columnar article store
+Keeps the combined dataset as typed columns instead of one dict per article:
+categorical type/source/date columns and UTF-8 string arenas for the
+free-text fields. Dict-shaped rows are only built on demand
+(for API serialization and document export).
+"""
+
+import heapq
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot writers are not coordinated between processes
+    fcntl = None
+
+# Field order of the article dicts in articles_combined.json
+ARTICLE_FIELDS = ('id', 'title', 'excerpt', 'link', 'date', 'date_text', 'image_url', 'type', 'source', 'cluster_id')
+TEXT_FIELDS = ('title', 'excerpt', 'link', 'image_url')
+CATEGORICAL_FIELDS = ('date', 'date_text', 'type', 'source')
+SEARCH_FIELDS = ('title', 'excerpt')
+TERM_TABLES = ('article', 'day', 'month', 'total')  # see term_counts.py
+NEAR_DUPLICATE_ARRAYS = ('signatures', 'has_signature', 'band_keys', 'band_rows')  # see near_duplicates.py
+TIMELINE_GRANULARITIES = ('day', 'week', 'month')
+
+
+def _unique(rows: Iterable[int]) -> Iterator[int]:
+    """Drop repeats from an ascending row stream"""
+    previous = -1
+    for row in rows:
+        if row != previous:
+            yield row
+            previous = row
+
+
+def _popcount(value: int) -> int:
+    return value.bit_count() if hasattr(value, 'bit_count') else bin(value).count('1')
+
+
+def _bitset(rows: Iterable[int], size: int) -> int:
+    """Rows as the set bits of one int (bit i = row i)"""
+    bits = bytearray((size + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class StringArena:
+    """Immutable list of strings stored back to back as UTF-8 in one buffer"""
+
+    def __init__(self, data, offsets, base: int = 0):
+        self.data = data        # bytes-like buffer supporting slicing and .find()
+        self.offsets = offsets  # len(strings) + 1 byte offsets, relative to base
+        self.base = base        # start of this arena inside data (non-zero for snapshots)
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> 'StringArena':
+        chunks = []
+        offsets = array('Q', [0])
+        position = 0
+        for value in strings:
+            encoded = (value or '').encode('utf-8')
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets.append(position)
+        if position < 2 ** 32:
+            offsets = array('I', offsets)
+        return cls(b''.join(chunks), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        base = self.base
+        return bytes(self.data[base + self.offsets[row]:base + self.offsets[row + 1]]).decode('utf-8')
+
+    def to_list(self) -> List[str]:
+        """Decode every string at once (faster than indexing row by row)"""
+        data, base, offsets = self.data, self.base, self.offsets
+        starts = [base + offset for offset in offsets]
+        return [str(data[start:end], 'utf-8') for start, end in zip(starts, starts[1:])]
+
+    def byte_length(self) -> int:
+        return self.offsets[len(self)]
+
+    def extended(self, strings: Iterable[str]) -> 'StringArena':
+        """New arena with strings appended; existing strings are copied as bytes, not decoded"""
+        tail = StringArena.from_strings(strings)
+        size = self.byte_length()
+        offsets = array('Q', self.offsets)
+        offsets.extend(size + offset for offset in tail.offsets[1:])
+        if offsets[-1] < 2 ** 32:
+            offsets = array('I', offsets)
+        return StringArena(bytes(self.data[self.base:self.base + size]) + tail.data, offsets)
+
+    def lowered(self) -> 'StringArena':
+        """Arena of str.lower() values; returns self when lowering changes nothing"""
+        lowered = [self[row].lower() for row in range(len(self))]
+        if all(lowered[row] == self[row] for row in range(len(self))):
+            return self
+        return StringArena.from_strings(lowered)
+
+    def find_rows(self, needle: str) -> List[int]:
+        """Rows whose string contains needle, in ascending order"""
+        return list(self.iter_rows(needle))
+
+    def iter_rows(self, needle: str, start_row: int = 0) -> Iterator[int]:
+        """Lazily yield the rows from start_row on whose string contains needle, in ascending order"""
+        if not needle:
+            yield from range(start_row, len(self))
+            return
+        pattern = needle.encode('utf-8')
+        data = self.data
+        offsets = self.offsets
+        base = self.base
+        end = base + offsets[len(self)]
+        position = base + offsets[min(start_row, len(self))]
+        while True:
+            found = data.find(pattern, position, end)
+            if found < 0:
+                return
+            row = bisect_right(offsets, found - base) - 1
+            row_end = base + offsets[row + 1]
+            if found + len(pattern) <= row_end:
+                yield row
+                position = row_end
+            else:
+                position = found + 1  # match straddles two strings
+
+
+class CategoricalColumn:
+    """Column of repeated values stored once each and referenced by small integer codes"""
+
+    def __init__(self, categories: List, codes):
+        self.categories = categories
+        self.codes = codes
+        self._code_by_value = {value: code for code, value in enumerate(categories)}
+
+    @classmethod
+    def from_values(cls, values: Iterable, sort_categories: bool = False) -> 'CategoricalColumn':
+        values = list(values)
+        categories = list(dict.fromkeys(values))
+        if sort_categories:
+            categories.sort(key=_category_sort_key)
+        code_by_value = {value: code for code, value in enumerate(categories)}
+        return cls(categories, array(_code_typecode(len(categories)), (code_by_value[value] for value in values)))
+
+    def extended(self, values: Iterable, sort_categories: bool = False) -> Tuple['CategoricalColumn', Optional[List[int]]]:
+        """Column with values appended, and the old -> new code map (None when old codes are kept).
+
+        New categories go after the existing ones, so the existing codes are
+        copied as they are; only when a sorted column gains a value that sorts
+        before a known one are the categories re-sorted and the codes translated.
+        """
+        values = list(values)
+        added = [value for value in dict.fromkeys(values) if value not in self._code_by_value]
+        categories = list(self.categories)
+        code_map = None
+        if sort_categories and added:
+            added.sort(key=_category_sort_key)
+            if categories and _category_sort_key(added[0]) < _category_sort_key(categories[-1]):
+                categories = sorted(categories + added, key=_category_sort_key)
+                code_by_value = {value: code for code, value in enumerate(categories)}
+                code_map = [code_by_value[value] for value in self.categories]
+                added = []
+        categories.extend(added)
+        code_by_value = {value: code for code, value in enumerate(categories)}
+        codes = array(_code_typecode(len(categories)))
+        if code_map is None:
+            _extend_array(codes, self.codes)
+        else:
+            codes.extend(map(code_map.__getitem__, self.codes))
+        codes.extend(code_by_value[value] for value in values)
+        return CategoricalColumn(categories, codes), code_map
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row: int):
+        return self.categories[self.codes[row]]
+
+    def code_of(self, value) -> Optional[int]:
+        return self._code_by_value.get(value)
+
+    def value_counts(self) -> Counter:
+        code_counts = Counter(self.codes)
+        return Counter({self.categories[code]: count for code, count in code_counts.items()})
+
+
+class ArticleStore:
+    """Read-only columnar representation of the articles dataset"""
+
+    def __init__(self, ids, text_columns: dict, categorical_columns: dict,
+                 lowered_columns: Optional[dict] = None, indexes: Optional[dict] = None, cluster_ids=None,
+                 terms=None, near_duplicates=None):
+        self.ids = ids
+        # Near-duplicate cluster of each row (see near_duplicates.py); an article
+        # without one is its own cluster
+        self.cluster_ids = cluster_ids if cluster_ids is not None else ids
+        self.title = text_columns['title']
+        self.excerpt = text_columns['excerpt']
+        self.link = text_columns['link']
+        self.image_url = text_columns['image_url']
+        self.dates = categorical_columns['date']
+        self.date_text = categorical_columns['date_text']
+        self.types = categorical_columns['type']
+        self.sources = categorical_columns['source']
+        self.version: Optional[str] = None  # identifies the dataset file the store was loaded from
+
+        # Case-insensitive search runs over lowered copies (shared when identical)
+        if lowered_columns is None:
+            lowered_columns = {field: text_columns[field].lowered() for field in SEARCH_FIELDS}
+        self.title_lower = lowered_columns['title']
+        self.excerpt_lower = lowered_columns['excerpt']
+
+        if indexes is None:
+            indexes = self._build_indexes()
+        if 'day_type_counts' not in indexes:  # snapshots written before the matrix existed
+            indexes['day_type_counts'] = self._day_type_counts_index()
+        self._id_order = indexes['id_order']
+        self._sorted_ids = indexes['sorted_ids']
+        self._date_order = indexes['date_order']
+        self._date_keys = indexes['date_keys']
+        self._image_order = indexes['image_order']
+        self._image_date_keys = indexes['image_date_keys']
+        self._day_type_counts = indexes['day_type_counts']
+        self._terms = terms  # title term counts (term_counts.TermCounts), built on first use
+        self._near_duplicates = near_duplicates  # near_duplicates.NearDuplicateIndex of the rows, if known
+        self._month_bitsets = None
+        self._cluster_members = None
+
+    @classmethod
+    def from_records(cls, records: List[dict], near_duplicates=None) -> 'ArticleStore':
+        """Build the store from article dicts as found in articles_combined.json
+
+        near_duplicates is the index the records were clustered with, if any
+        (saved with the snapshot so the next ingest does not rebuild it).
+        """
+        ids = _id_array(record.get('id') or 0 for record in records)
+        cluster_ids = None
+        if any('cluster_id' in record for record in records):
+            cluster_ids = _id_array(record.get('cluster_id') or record.get('id') or 0 for record in records)
+        text_columns = {
+            field: StringArena.from_strings(record.get(field) for record in records)
+            for field in TEXT_FIELDS
+        }
+        categorical_columns = {
+            field: CategoricalColumn.from_values(
+                (record.get(field) for record in records), sort_categories=(field == 'date')
+            )
+            for field in CATEGORICAL_FIELDS
+        }
+        return cls(ids, text_columns, categorical_columns, cluster_ids=cluster_ids, near_duplicates=near_duplicates)
+
+    def extended(self, records: List[dict], near_duplicates=None) -> 'ArticleStore':
+        """New store with records appended (used by incremental ingest).
+
+        Only the new rows are encoded: existing text is concatenated at the
+        byte level, categorical codes are copied (or translated when a new date
+        sorts before known ones) and the new rows are merged into the existing
+        indexes. near_duplicates is the near-duplicate index after the records
+        were added to it.
+        """
+        ids = _extended_ids(self.ids, [record.get('id') or 0 for record in records])
+        cluster_ids = _extended_ids(self.cluster_ids, [
+            record.get('cluster_id') or record.get('id') or 0 for record in records
+        ])
+        text_columns = {
+            field: getattr(self, field).extended(record.get(field) for record in records)
+            for field in TEXT_FIELDS
+        }
+        lowered_columns = {}
+        for field in SEARCH_FIELDS:
+            values = [record.get(field) or '' for record in records]
+            lowered = getattr(self, f'{field}_lower')
+            if lowered is getattr(self, field) and all(value.lower() == value for value in values):
+                lowered_columns[field] = text_columns[field]
+            else:
+                lowered_columns[field] = lowered.extended(value.lower() for value in values)
+        categorical_columns = {}
+        date_map = None
+        for field in CATEGORICAL_FIELDS:
+            column, code_map = self.column(field).extended((record.get(field) for record in records),
+                                                           sort_categories=(field == 'date'))
+            categorical_columns[field] = column
+            if field == 'date':
+                date_map = code_map
+        indexes = self._extended_indexes(ids, text_columns['image_url'], categorical_columns, date_map)
+        store = ArticleStore(ids, text_columns, categorical_columns, lowered_columns, indexes, cluster_ids,
+                             near_duplicates=near_duplicates)
+        if self._terms is not None:
+            dates = store.dates
+            store._terms = self._terms.extended([record.get('title') or '' for record in records],
+                                                dates.categories, dates.codes)
+        return store
+
+    def _extended_indexes(self, ids, image_url: 'StringArena', categorical_columns: dict,
+                          date_map: Optional[List[int]]) -> dict:
+        """Indexes of the extended store: the new rows (len(self) on) merged into this store's indexes"""
+        first_new_row = len(self)
+        new_rows = range(first_new_row, len(ids))
+        dates, types = categorical_columns['date'], categorical_columns['type']
+        date_codes = dates.codes
+        old = self.indexes()
+        indexes = {}
+
+        # id -> row stays empty while ids are 1..N in row order
+        if not len(old['id_order']) and all(ids[row] == row + 1 for row in new_rows):
+            indexes['id_order'] = array('I')
+            indexes['sorted_ids'] = array('i')
+        else:
+            id_order, sorted_ids = old['id_order'], old['sorted_ids']
+            if not len(id_order):
+                id_order, sorted_ids = array('I', range(first_new_row)), self.ids
+            entries = [(bisect_right(sorted_ids, article_id), article_id, row)
+                       for article_id, row in sorted((ids[row], row) for row in new_rows)]
+            indexes['id_order'], indexes['sorted_ids'] = _inserted(id_order, sorted_ids, entries, _typecode(ids))
+
+        # Date keys are translated when the date codes were (a backfilled date)
+        date_keys, image_date_keys = old['date_keys'], old['image_date_keys']
+        if date_map is not None:
+            date_keys = array(_typecode(date_codes), map(date_map.__getitem__, date_keys))
+            image_date_keys = array('i', (-date_map[-key] for key in image_date_keys))
+        entries = [(bisect_right(date_keys, code), code, row)
+                   for code, row in sorted((date_codes[row], row) for row in new_rows)]
+        indexes['date_order'], indexes['date_keys'] = _inserted(old['date_order'], date_keys, entries,
+                                                                _typecode(date_codes))
+
+        # Images: newest first (date, then id, descending)
+        image_order = old['image_order']
+        image_offsets = image_url.offsets
+        new_images = [row for row in new_rows if image_offsets[row + 1] > image_offsets[row]]
+        new_images.sort(key=lambda row: (date_codes[row], ids[row]), reverse=True)
+        entries = []
+        for row in new_images:
+            key = -date_codes[row]
+            start, end = bisect_left(image_date_keys, key), bisect_right(image_date_keys, key)
+            entries.append((bisect_right(image_order, -ids[row], start, end, key=lambda r: -ids[r]), key, row))
+        indexes['image_order'], indexes['image_date_keys'] = _inserted(image_order, image_date_keys, entries, 'i')
+
+        # Per (date, type) counts: old rows moved to their (possibly new) place, new rows counted
+        type_count, old_type_count = len(types.categories), len(self.types.categories)
+        counts = array('I', bytes(4 * len(dates.categories) * type_count))
+        old_counts = old['day_type_counts']
+        for code in range(len(self.dates.categories)):
+            start = (date_map[code] if date_map is not None else code) * type_count
+            counts[start:start + old_type_count] = array('I', old_counts[code * old_type_count:
+                                                                         (code + 1) * old_type_count])
+        type_codes = types.codes
+        for row in new_rows:
+            counts[date_codes[row] * type_count + type_codes[row]] += 1
+        indexes['day_type_counts'] = counts
+        return indexes
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _build_indexes(self) -> dict:
+        rows = range(len(self))
+        indexes = {}
+
+        # id -> row; left empty when ids are 1..N in row order (the usual case)
+        if all(self.ids[row] == row + 1 for row in rows):
+            indexes['id_order'] = array('I')
+            indexes['sorted_ids'] = array('i')
+        else:
+            indexes['id_order'] = array('I', sorted(rows, key=self.ids.__getitem__))
+            indexes['sorted_ids'] = array(_typecode(self.ids), (self.ids[row] for row in indexes['id_order']))
+
+        # date -> rows, in original row order within each date; date categories
+        # are sorted, so ordering by code is ordering by date
+        date_codes = self.dates.codes
+        indexes['date_order'] = array('I', sorted(rows, key=date_codes.__getitem__))
+        indexes['date_keys'] = array(_typecode(date_codes), (date_codes[row] for row in indexes['date_order']))
+
+        # rows with an image, newest first (date, then id, descending)
+        image_offsets = self.image_url.offsets
+        image_rows = [row for row in rows if image_offsets[row + 1] > image_offsets[row]]
+        image_rows.sort(key=lambda row: (date_codes[row], self.ids[row]), reverse=True)
+        indexes['image_order'] = array('I', image_rows)
+        indexes['image_date_keys'] = array('i', (-date_codes[row] for row in image_rows))
+        indexes['day_type_counts'] = self._day_type_counts_index()
+        return indexes
+
+    def _day_type_counts_index(self) -> array:
+        """Articles per (date, type) as a flat date-major matrix: [date_code * type_count + type_code]"""
+        type_count = len(self.types.categories)
+        counts = array('I', bytes(4 * len(self.dates.categories) * type_count))
+        for date_code, type_code in zip(self.dates.codes, self.types.codes):
+            counts[date_code * type_count + type_code] += 1
+        return counts
+
+    @property
+    def terms(self):
+        """Term-frequency tables of the titles (per article, day, month and overall)"""
+        if self._terms is None:
+            from term_counts import TermCounts
+            self._terms = TermCounts.from_titles(self.title.to_list(), self.dates.codes, self.dates.categories)
+        return self._terms
+
+    @property
+    def near_duplicates(self):
+        """MinHash/LSH index of the rows with their known clusters (built on first use if not saved)"""
+        if self._near_duplicates is None:
+            from near_duplicates import NearDuplicateIndex
+            index = NearDuplicateIndex()
+            for row in range(len(self)):
+                index.add(self.ids[row], f"{self.title[row]} {self.excerpt[row]}", cluster_id=self.cluster_ids[row])
+            self._near_duplicates = index
+        return self._near_duplicates
+
+    def column(self, field: str) -> CategoricalColumn:
+        return {'date': self.dates, 'date_text': self.date_text, 'type': self.types, 'source': self.sources}[field]
+
+    def indexes(self) -> dict:
+        return {
+            'id_order': self._id_order,
+            'sorted_ids': self._sorted_ids,
+            'date_order': self._date_order,
+            'date_keys': self._date_keys,
+            'image_order': self._image_order,
+            'image_date_keys': self._image_date_keys,
+            'day_type_counts': self._day_type_counts
+        }
+
+    # -- row access ---------------------------------------------------------
+
+    def article(self, row: int) -> dict:
+        """Dict view of one row, shaped like the original JSON record"""
+        return {
+            'id': self.ids[row],
+            'title': self.title[row],
+            'excerpt': self.excerpt[row],
+            'link': self.link[row],
+            'date': self.dates[row],
+            'date_text': self.date_text[row],
+            'image_url': self.image_url[row],
+            'type': self.types[row],
+            'source': self.sources[row],
+            'cluster_id': self.cluster_ids[row]
+        }
+
+    def articles(self, rows: Iterable[int]) -> List[dict]:
+        return [self.article(row) for row in rows]
+
+    def to_records(self) -> List[dict]:
+        """All rows as article dicts, built column by column"""
+        columns = [list(self.ids)]
+        for field in ARTICLE_FIELDS[1:]:
+            if field == 'cluster_id':
+                columns.append(list(self.cluster_ids))
+            elif field in TEXT_FIELDS:
+                columns.append(getattr(self, field).to_list())
+            else:
+                column = self.column(field)
+                columns.append([column.categories[code] for code in column.codes])
+        return [dict(zip(ARTICLE_FIELDS, values)) for values in zip(*columns)]
+
+    def row_for_id(self, article_id: int) -> Optional[int]:
+        if not len(self._sorted_ids):
+            row = article_id - 1
+            return row if 0 <= row < len(self) else None
+        position = bisect_left(self._sorted_ids, article_id)
+        if position < len(self._sorted_ids) and self._sorted_ids[position] == article_id:
+            return self._id_order[position]
+        return None
+
+    # -- indexed lookups ----------------------------------------------------
+
+    # Index lookups take an optional after_row/limit for keyset pagination: the
+    # page starts right after the position after_row has in the index order, so
+    # a deep page costs a bisect plus the page itself.
+
+    def rows_on_date(self, date: str, after_row: Optional[int] = None, limit: Optional[int] = None) -> array:
+        """Rows published on the given date, in dataset order"""
+        code = self.dates.code_of(date)
+        if code is None:
+            return self._date_order[:0]
+        start, end = bisect_left(self._date_keys, code), bisect_right(self._date_keys, code)
+        if after_row is not None:
+            start = bisect_right(self._date_order, after_row, start, end)  # rows ascend within a date
+        return self._date_order[start:end if limit is None else min(end, start + limit)]
+
+    def image_rows(self, date: Optional[str] = None, after_row: Optional[int] = None,
+                   limit: Optional[int] = None) -> array:
+        """Rows that have an image, newest first, optionally for a single date"""
+        if not date and after_row is None and limit is None:
+            return self._image_order
+        keys = self._image_date_keys
+        start, end = 0, len(keys)
+        if date:
+            code = self.dates.code_of(date)
+            if code is None:
+                return self._image_order[:0]
+            start, end = bisect_left(keys, -code), bisect_right(keys, -code)
+        if after_row is not None:
+            # Same (date, id) descending order as the index: skip the later dates,
+            # then bisect the ids (descending) of after_row's date
+            key = -self.dates.codes[after_row]
+            lo, hi = max(start, bisect_left(keys, key, start, end)), bisect_right(keys, key, start, end)
+            after_id = self.ids[after_row]
+            while lo < hi:
+                middle = (lo + hi) // 2
+                if self.ids[self._image_order[middle]] >= after_id:
+                    lo = middle + 1
+                else:
+                    hi = middle
+            start = max(start, lo)
+        return self._image_order[start:end if limit is None else min(end, start + limit)]
+
+    def _filter_codes(self, content_type: str = 'all', date_from: Optional[str] = None,
+                      date_to: Optional[str] = None):
+        """(type code, per-date-code flags) of a search filter; type code -1 if content_type never occurs"""
+        type_code = None
+        if content_type != 'all':
+            type_code = self.types.code_of(content_type)
+            if type_code is None:
+                type_code = -1
+        # Date bounds are compared as strings, like the original filter, but once
+        # per distinct date instead of once per article
+        date_codes = None
+        if date_from or date_to:
+            date_codes = bytearray(len(self.dates.categories))
+            for code, value in enumerate(self.dates.categories):
+                value = value or ''
+                if (not date_from or value >= date_from) and (not date_to or value <= date_to):
+                    date_codes[code] = 1
+        return type_code, date_codes
+
+    def search_rows(self, query: str = '', search_type: str = 'all', content_type: str = 'all',
+                    date_from: Optional[str] = None, date_to: Optional[str] = None,
+                    after_row: Optional[int] = None) -> Iterator[int]:
+        """Yield matching rows in dataset order (case-insensitive substring match).
+
+        Rows are found lazily, so taking one page of the results (from after_row
+        on) only scans as far as that page.
+        """
+        query_lower = query.lower() if query else ''
+        start_row = 0 if after_row is None else after_row + 1
+        if not query_lower or search_type == 'title':
+            candidates = self.title_lower.iter_rows(query_lower, start_row)
+        elif search_type == 'excerpt':
+            candidates = self.excerpt_lower.iter_rows(query_lower, start_row)
+        else:
+            candidates = _unique(heapq.merge(self.title_lower.iter_rows(query_lower, start_row),
+                                             self.excerpt_lower.iter_rows(query_lower, start_row)))
+
+        type_code, date_codes = self._filter_codes(content_type, date_from, date_to)
+        if type_code == -1:
+            return
+        type_codes = self.types.codes
+        row_date_codes = self.dates.codes
+        for row in candidates:
+            if type_code is not None and type_codes[row] != type_code:
+                continue
+            if date_codes is not None and not date_codes[row_date_codes[row]]:
+                continue
+            yield row
+
+    def count_containing(self, keyword: str) -> int:
+        """Number of rows whose title or excerpt contains keyword (case-sensitive)"""
+        return len(set(self.title.find_rows(keyword)).union(self.excerpt.find_rows(keyword)))
+
+    def row_matcher(self, query: str = '', search_type: str = 'all', content_type: str = 'all',
+                    date_from: Optional[str] = None, date_to: Optional[str] = None) -> Callable[[int], bool]:
+        """Predicate telling whether search_rows with these filters would yield a row"""
+        type_code, date_codes = self._filter_codes(content_type, date_from, date_to)
+        query_lower = query.lower() if query else ''
+
+        def matches(row: int) -> bool:
+            if type_code is not None and self.types.codes[row] != type_code:
+                return False
+            if date_codes is not None and not date_codes[self.dates.codes[row]]:
+                return False
+            if not query_lower:
+                return True
+            return (search_type != 'excerpt' and query_lower in self.title_lower[row]) or \
+                (search_type != 'title' and query_lower in self.excerpt_lower[row])
+        return matches
+
+    def cluster_members(self, cluster_id: int) -> List[int]:
+        """Rows of a near-duplicate cluster, ascending"""
+        if self._cluster_members is None:
+            members = {}
+            for row, member_cluster in enumerate(self.cluster_ids):
+                members.setdefault(member_cluster, []).append(row)
+            self._cluster_members = {key: rows for key, rows in members.items() if len(rows) > 1}
+        return self._cluster_members.get(cluster_id, [])
+
+    def search_page(self, query: str = '', search_type: str = 'all', content_type: str = 'all',
+                    date_from: Optional[str] = None, date_to: Optional[str] = None,
+                    after_row: Optional[int] = None, limit: int = 20, collapse: bool = False
+                    ) -> Tuple[List[int], Counter, bool]:
+        """One keyset page of search results: up to limit rows after after_row.
+
+        Returns the rows, the matching-row count of their near-duplicate
+        clusters (only when collapse is set) and whether more rows follow.
+        With collapse a row is shown only if it is the first match of its
+        cluster, which is decided from the cluster's other rows rather than
+        from the earlier pages.
+        """
+        filters = (query, search_type, content_type, date_from, date_to)
+        matches = self.row_matcher(*filters) if collapse else None
+        rows, sizes = [], Counter()
+        for row in self.search_rows(*filters, after_row=after_row):
+            if collapse:
+                members = self.cluster_members(self.cluster_ids[row])
+                if any(member < row and matches(member) for member in members):
+                    continue
+            if len(rows) == limit:
+                return rows, sizes, True
+            rows.append(row)
+            if collapse:
+                cluster_id = self.cluster_ids[row]
+                sizes[cluster_id] = 1 + sum(1 for member in self.cluster_members(cluster_id)
+                                            if member > row and matches(member))
+        return rows, sizes, False
+
+    def collapse_rows(self, rows: Iterable[int]) -> Tuple[List[int], Counter]:
+        """Keep the first row of each near-duplicate cluster; also returns the cluster sizes"""
+        cluster_ids = self.cluster_ids
+        sizes = Counter()
+        kept = []
+        for row in rows:
+            cluster_id = cluster_ids[row]
+            if not sizes[cluster_id]:
+                kept.append(row)
+            sizes[cluster_id] += 1
+        return kept, sizes
+
+    # -- aggregates ---------------------------------------------------------
+
+    def statistics(self) -> dict:
+        dates = [value for value in self.dates.categories if value]
+        return {
+            'total_articles': len(self),
+            'date_range': {
+                'start': min(dates) if dates else None,
+                'end': max(dates) if dates else None
+            },
+            'article_types': dict(self.types.value_counts()),
+            'articles_with_images': len(self._image_order)
+        }
+
+    def monthly_counts(self) -> List[tuple]:
+        """(YYYY-MM, count) pairs sorted by month"""
+        monthly = Counter()
+        for date, count in self.dates.value_counts().items():
+            if date:
+                monthly[date[:7]] += count
+        return sorted(monthly.items())
+
+    def month_bitsets(self) -> List[Tuple[str, int]]:
+        """(YYYY-MM, bitset of the rows dated in that month) pairs, sorted by month"""
+        if self._month_bitsets is None:
+            rows_by_month = {}
+            date_codes = self.dates.codes
+            months = [value[:7] if value else None for value in self.dates.categories]
+            for row in range(len(self)):
+                month = months[date_codes[row]]
+                if month:
+                    rows_by_month.setdefault(month, []).append(row)
+            self._month_bitsets = [(month, _bitset(rows, len(self))) for month, rows in sorted(rows_by_month.items())]
+        return self._month_bitsets
+
+    def keyword_matrix(self, keywords: List[str], content_type: str = 'all',
+                       date_from: Optional[str] = None, date_to: Optional[str] = None) -> dict:
+        """Keyword x month counts and keyword x keyword co-occurrence in one pass.
+
+        Each keyword is scanned once (case-sensitive title/excerpt match, like
+        count_containing) into a bitset of matching rows; every cell is then
+        the popcount of an AND of two bitsets. Diagonal cells are the keyword
+        totals.
+        """
+        size = len(self)
+        keyword_bits = [
+            _bitset(set(self.title.find_rows(keyword)).union(self.excerpt.find_rows(keyword)), size)
+            for keyword in keywords
+        ]
+        if content_type != 'all' or date_from or date_to:
+            selected = _bitset(self.search_rows('', 'all', content_type, date_from, date_to), size)
+            keyword_bits = [bits & selected for bits in keyword_bits]
+
+        months = [(month, bits) for month, bits in self.month_bitsets()
+                  if (not date_from or month >= date_from[:7]) and (not date_to or month <= date_to[:7])]
+        return {
+            'keywords': keywords,
+            'totals': [_popcount(bits) for bits in keyword_bits],
+            'months': [month for month, _ in months],
+            'by_month': [[_popcount(bits & month_bits) for _, month_bits in months] for bits in keyword_bits],
+            'cooccurrence': [[_popcount(first & second) for second in keyword_bits] for first in keyword_bits]
+        }
+
+    def daily_counts(self, content_type: str = 'all', query: str = '',
+                     date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[tuple]:
+        """(date, count) pairs of the dated articles matching the filters, sorted by date.
+
+        Without a query the counts are read from the day x type matrix; with one,
+        only the rows matching it are counted.
+        """
+        categories = self.dates.categories
+        per_date = [0] * len(categories)
+        if query:
+            date_codes = self.dates.codes
+            for row in self.search_rows(query, 'all', content_type, date_from, date_to):
+                per_date[date_codes[row]] += 1
+        else:
+            type_count = len(self.types.categories)
+            if content_type == 'all':
+                type_codes = range(type_count)
+            else:
+                type_code = self.types.code_of(content_type)
+                type_codes = [] if type_code is None else [type_code]
+            matrix = self._day_type_counts
+            for date_code, value in enumerate(categories):
+                if value and (not date_from or value >= date_from) and (not date_to or value <= date_to):
+                    per_date[date_code] = sum(matrix[date_code * type_count + code] for code in type_codes)
+        return [(categories[code], count) for code, count in enumerate(per_date) if count and categories[code]]
+
+    def timeline(self, granularity: str = 'month', content_type: str = 'all', query: str = '',
+                 date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[tuple]:
+        """(period, count) pairs from the first to the last matching period, empty periods included.
+
+        Periods are YYYY-MM-DD for days, the Monday of the week for weeks and
+        YYYY-MM for months.
+        """
+        if granularity not in TIMELINE_GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(TIMELINE_GRANULARITIES)}")
+        counts = Counter()
+        for value, count in self.daily_counts(content_type, query, date_from, date_to):
+            try:
+                day = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                continue
+            if granularity == 'week':
+                day -= timedelta(days=day.weekday())
+            elif granularity == 'month':
+                day = day.replace(day=1)
+            counts[day] += count
+        if not counts:
+            return []
+
+        periods = []
+        period, last = min(counts), max(counts)
+        while period <= last:
+            periods.append(period)
+            if granularity == 'day':
+                period += timedelta(days=1)
+            elif granularity == 'week':
+                period += timedelta(days=7)
+            else:
+                period = (period.replace(day=28) + timedelta(days=4)).replace(day=1)
+        period_format = '%Y-%m' if granularity == 'month' else '%Y-%m-%d'
+        return [(period.strftime(period_format), counts.get(period, 0)) for period in periods]
+
+
+
+def _id_array(values: Iterable[int]) -> array:
+    ids = array('q', values)
+    if all(-2 ** 31 <= value < 2 ** 31 for value in ids):
+        ids = array('i', ids)
+    return ids
+
+
+def _extended_ids(ids, values: List[int]) -> array:
+    """ids with values appended (widened to 64 bits if a new value needs it)"""
+    typecode = _typecode(ids)
+    if typecode == 'i' and not all(-2 ** 31 <= value < 2 ** 31 for value in values):
+        typecode = 'q'
+    extended = array(typecode)
+    _extend_array(extended, ids)
+    extended.extend(values)
+    return extended
+
+
+def _code_typecode(category_count: int) -> str:
+    return 'B' if category_count <= 256 else 'H' if category_count <= 65536 else 'I'
+
+
+def _category_sort_key(value):
+    return value is not None, value or ''
+
+
+def _extend_array(target: array, values):
+    """Append an array or snapshot view to target (a byte copy when the item types match)"""
+    if _typecode(values) == target.typecode:
+        target.frombytes(bytes(values))
+    else:
+        target.extend(values)
+
+
+def _inserted(values, keys, entries: List[tuple], key_typecode: str) -> Tuple[array, array]:
+    """Copies of a sorted index (values with parallel keys) with (position, key, value) entries inserted.
+
+    Entries must be ordered by position; each goes before the old element at
+    its position. Old elements are copied in slices between the insertions.
+    """
+    new_values, new_keys = array('I'), array(key_typecode)
+    start = 0
+    for position, key, value in entries:
+        _extend_array(new_values, values[start:position])
+        _extend_array(new_keys, keys[start:position])
+        new_values.append(value)
+        new_keys.append(key)
+        start = position
+    _extend_array(new_values, values[start:])
+    _extend_array(new_keys, keys[start:])
+    return new_values, new_keys
+
+
+# -- binary snapshot ---------------------------------------------------------
+#
+# Layout: MAGIC, an 8-byte little-endian header length, a UTF-8 JSON header and
+# then the raw column buffers, each starting on an 8-byte boundary. The header
+# holds the (small) category lists and the offset/length/typecode of every
+# buffer, so loading is a single read plus zero-copy memoryview casts.
+
+SNAPSHOT_MAGIC = b'GZSNAP01'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snapshot'
+
+
+def _typecode(values) -> str:
+    """Item format of an array or a cast memoryview"""
+    return getattr(values, 'typecode', None) or values.format
+
+
+def snapshot_path_for(json_path) -> Path:
+    """Snapshot file written next to a combined JSON dataset"""
+    return Path(json_path).with_suffix(SNAPSHOT_SUFFIX)
+
+
+def _source_signature(json_path) -> Optional[dict]:
+    try:
+        stat = os.stat(json_path)
+    except OSError:
+        return None
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _signature_version(signature: Optional[dict]) -> Optional[str]:
+    return f"{signature['mtime_ns']:x}-{signature['size']:x}" if signature else None
+
+
+def dataset_version(json_path) -> Optional[str]:
+    """Cheap (single stat) identifier of the current contents of a dataset file"""
+    return _signature_version(_source_signature(json_path))
+
+
+def save_snapshot(store: ArticleStore, path, source_path=None) -> Path:
+    """Write the store (columns and indexes) to a binary snapshot file"""
+    path = Path(path)
+    buffers = []
+
+    def add(name, values, typecode=None):
+        buffers.append((name, memoryview(values).cast('B'), typecode or _typecode(values)))
+
+    add('ids', store.ids)
+    if store.cluster_ids is not store.ids:
+        add('cluster_ids', store.cluster_ids)
+    for field in TEXT_FIELDS:
+        arena = getattr(store, field)
+        add(f'{field}.offsets', arena.offsets)
+        add(f'{field}.data', arena.data[arena.base:arena.base + arena.byte_length()], 'B')
+    for field in SEARCH_FIELDS:
+        arena = getattr(store, f'{field}_lower')
+        if arena is not getattr(store, field):
+            add(f'{field}_lower.offsets', arena.offsets)
+            add(f'{field}_lower.data', arena.data[arena.base:arena.base + arena.byte_length()], 'B')
+    columns = {field: store.column(field) for field in CATEGORICAL_FIELDS}
+    for field, column in columns.items():
+        add(f'{field}.codes', column.codes)
+    for name, values in store.indexes().items():
+        add(f'index.{name}', values)
+    terms = store.terms
+    add('terms.vocabulary.offsets', terms.vocabulary.offsets)
+    add('terms.vocabulary.data', terms.vocabulary.data[terms.vocabulary.base:
+                                                       terms.vocabulary.base + terms.vocabulary.byte_length()], 'B')
+    for table_name in TERM_TABLES:
+        for part, values in zip(('offsets', 'terms', 'counts'), getattr(terms, table_name).arrays()):
+            add(f'terms.{table_name}.{part}', values)
+    near_duplicates = store._near_duplicates
+    if near_duplicates is not None and len(near_duplicates) == len(store):
+        for name, values in near_duplicates.arrays().items():
+            add(f'near_duplicates.{name}', values)
+
+    sections = {}
+    position = 0
+    for name, data, typecode in buffers:
+        sections[name] = [position, len(data), typecode]
+        position += (len(data) + 7) // 8 * 8
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'byteorder': sys.byteorder,
+        'rows': len(store),
+        'source': _source_signature(source_path) if source_path else None,
+        'categories': {field: column.categories for field, column in columns.items()},
+        'sections': sections
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    header_bytes += b' ' * (-(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)) % 8)
+
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.part')
+    with open(tmp_path, 'wb') as fh:
+        fh.write(SNAPSHOT_MAGIC)
+        fh.write(len(header_bytes).to_bytes(8, 'little'))
+        fh.write(header_bytes)
+        for name, data, typecode in buffers:
+            fh.write(data)
+            fh.write(b'\0' * (-len(data) % 8))
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_snapshot_header(data) -> Tuple[dict, int]:
+    if bytes(data[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+        raise ValueError('not an article snapshot')
+    header_start = len(SNAPSHOT_MAGIC) + 8
+    header_length = int.from_bytes(data[len(SNAPSHOT_MAGIC):header_start], 'little')
+    header = json.loads(bytes(data[header_start:header_start + header_length]).decode('utf-8'))
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {header.get('version')}")
+    if header.get('byteorder') != sys.byteorder:
+        raise ValueError('snapshot was written on a machine with a different byte order')
+    return header, header_start + header_length
+
+
+def store_from_buffer(data) -> ArticleStore:
+    """Build a store whose columns are views into a snapshot buffer (no copies)"""
+    header, data_start = _read_snapshot_header(data)
+    view = memoryview(data)
+    sections = header['sections']
+
+    def values(name):
+        offset, length, typecode = sections[name]
+        start = data_start + offset
+        return view[start:start + length].cast(typecode)
+
+    def arena(name):
+        offset = sections[f'{name}.data'][0]
+        return StringArena(data, values(f'{name}.offsets'), base=data_start + offset)
+
+    text_columns = {field: arena(field) for field in TEXT_FIELDS}
+    lowered_columns = {
+        field: arena(f'{field}_lower') if f'{field}_lower.data' in sections else text_columns[field]
+        for field in SEARCH_FIELDS
+    }
+    categorical_columns = {
+        field: CategoricalColumn(header['categories'][field], values(f'{field}.codes'))
+        for field in CATEGORICAL_FIELDS
+    }
+    indexes = {name[len('index.'):]: values(name) for name in sections if name.startswith('index.')}
+    ids = values('ids')
+    cluster_ids = values('cluster_ids') if 'cluster_ids' in sections else None
+    terms = None
+    if 'terms.vocabulary.data' in sections:  # snapshots written before term counts build them on first use
+        from term_counts import CountTable, TermCounts
+        tables = {
+            table_name: CountTable(*(values(f'terms.{table_name}.{part}') for part in ('offsets', 'terms', 'counts')))
+            for table_name in TERM_TABLES
+        }
+        terms = TermCounts(arena('terms.vocabulary'), tables, categorical_columns['date'].categories)
+    near_duplicates = None
+    if 'near_duplicates.signatures' in sections:  # written by combine_and_deduplicate.py
+        from near_duplicates import NearDuplicateIndex
+        near_duplicates = NearDuplicateIndex.from_arrays(
+            *(values(f'near_duplicates.{name}') for name in NEAR_DUPLICATE_ARRAYS),
+            cluster_ids if cluster_ids is not None else ids
+        )
+    return ArticleStore(ids, text_columns, categorical_columns, lowered_columns, indexes, cluster_ids, terms,
+                        near_duplicates)
+
+
+def load_snapshot(path) -> ArticleStore:
+    """Memory-map a snapshot written by save_snapshot.
+
+    The mapping is read-only and file backed, so every process that loads the
+    same snapshot (e.g. forked web workers) shares one copy in the page cache.
+    """
+    with open(path, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            raise ValueError('empty snapshot file')
+        data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    return store_from_buffer(data)
+
+
+def snapshot_is_current(snapshot_path, json_path, signature: Optional[dict] = None) -> bool:
+    """True if the snapshot was written from the current version of json_path"""
+    try:
+        with open(snapshot_path, 'rb') as fh:
+            prefix = fh.read(len(SNAPSHOT_MAGIC) + 8)
+            if prefix[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return False
+            header_length = int.from_bytes(prefix[len(SNAPSHOT_MAGIC):], 'little')
+            header, _ = _read_snapshot_header(prefix + fh.read(header_length))
+    except (OSError, ValueError):
+        return False
+    return header.get('source') == (signature or _source_signature(json_path))
+
+
+@contextmanager
+def snapshot_lock(json_path):
+    """Exclusive lock of the snapshot of a dataset, held while writing the dataset or its snapshot.
+
+    Only the holder writes the snapshot; everyone else waits for it and maps
+    the finished file, so all processes share one snapshot inode.
+    """
+    snapshot_path = snapshot_path_for(json_path)
+    lock_path = snapshot_path.with_name(f'.{snapshot_path.name}.lock')
+    with open(lock_path, 'a') as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _map_if_current(snapshot_path, json_path, signature) -> Optional[ArticleStore]:
+    if not (signature and snapshot_is_current(snapshot_path, json_path, signature)):
+        return None
+    try:
+        return load_snapshot(snapshot_path)
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"Ignoring unreadable snapshot {snapshot_path}: {exc}")
+        return None
+
+
+def _read_json_store(json_path) -> ArticleStore:
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return ArticleStore.from_records(json.load(f))
+
+
+def load_store(json_path, write_snapshot: bool = False) -> ArticleStore:
+    """Load the dataset from its snapshot when it is up to date, otherwise from JSON.
+
+    With write_snapshot, a missing or stale snapshot is rebuilt from the JSON by
+    the process holding the snapshot lock and then mapped; processes that had to
+    wait for the lock map the snapshot it wrote instead of writing their own.
+    """
+    snapshot_path = snapshot_path_for(json_path)
+    signature = _source_signature(json_path)
+    store = _map_if_current(snapshot_path, json_path, signature)
+    if store is None and snapshot_path.exists():
+        print(f"Snapshot {snapshot_path} is stale, loading {json_path} instead")
+
+    if store is None and write_snapshot:
+        try:
+            with snapshot_lock(json_path):
+                # Written by another worker (or an ingest) while we waited?
+                signature = _source_signature(json_path)
+                store = _map_if_current(snapshot_path, json_path, signature)
+                if store is None:
+                    store = _read_json_store(json_path)
+                    # Only snapshot what was actually read: skip if the file changed meanwhile
+                    if _source_signature(json_path) == signature:
+                        save_snapshot(store, snapshot_path, source_path=json_path)
+                        store = load_snapshot(snapshot_path)
+        except OSError as exc:
+            print(f"Could not write snapshot {snapshot_path}: {exc}")
+    if store is None:
+        store = _read_json_store(json_path)
+    store.version = _signature_version(signature)
+    return store
+
+
+def load_articles(json_path) -> List[dict]:
+    """Article dicts for scripts that work on plain records (snapshot-backed when possible)"""
+    snapshot_path = snapshot_path_for(json_path)
+    if snapshot_is_current(snapshot_path, json_path):
+        return load_snapshot(snapshot_path).to_records()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Build a binary snapshot of a combined articles JSON file')
+    parser.add_argument('json_path', nargs='?', default='articles_combined.json')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with snapshot_lock(args.json_path):
+        built = _read_json_store(args.json_path)
+        written = save_snapshot(built, snapshot_path_for(args.json_path), source_path=args.json_path)
+    print(f"Wrote {written} ({len(built)} articles, {written.stat().st_size / 1024 / 1024:.1f} MB) "
+          f"in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lifecycle manager for generated export files
+Every artifact gets its own directory under the temp root, is written to a
+hidden .part file and renamed into place when complete, and is garbage
+collected in the background once it is too old or the directory is too big.
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+# Marker file of an artifact a finished job produced but nobody downloaded yet;
+# on disk so that the sweeps of all worker processes see it
+UNCLAIMED_MARKER = '.unclaimed'
+
+
+class ArtifactManager:
+    """Unique per-job output paths with atomic finalize and TTL/size based cleanup"""
+
+    def __init__(self, root_dir: Path, ttl_seconds: int = 2 * 3600,
+                 max_bytes: int = 1024 * 1024 * 1024, sweep_interval: int = 300):
+        self.root_dir = Path(root_dir).resolve()
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.Lock()
+        self._pending = set()  # artifact directories still being written
+        self._gc_thread = None
+        self._gc_pid = None  # process the GC thread runs in (threads do not survive fork)
+        self._metrics = {
+            'created': 0,
+            'discarded': 0,
+            'expired': 0,
+            'evicted': 0,
+            'bytes_reclaimed': 0,
+            'last_sweep': None
+        }
+
+    def allocate(self, filename: str) -> Path:
+        """Reserve a unique directory for an artifact and return its temporary .part path"""
+        self.start_gc()
+        artifact_dir = self.root_dir / uuid.uuid4().hex
+        artifact_dir.mkdir()
+        with self._lock:
+            self._pending.add(artifact_dir)
+        return artifact_dir / f".{filename}.part"
+
+    def finalize(self, part_path: Path) -> Path:
+        """Atomically move a completed .part file to its final name"""
+        part_path = Path(part_path)
+        final_path = part_path.with_name(part_path.name[1:-len('.part')])
+        os.replace(part_path, final_path)
+        with self._lock:
+            self._pending.discard(part_path.parent)
+            self._metrics['created'] += 1
+        return final_path
+
+    def discard(self, path: Path):
+        """Remove an artifact (finished or partial) together with its directory"""
+        artifact_dir = Path(path).parent
+        with self._lock:
+            self._pending.discard(artifact_dir)
+            self._metrics['discarded'] += 1
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+
+    def hold(self, path: Path):
+        """Mark a finished artifact as waiting for its download: only the TTL may remove it"""
+        (Path(path).parent / UNCLAIMED_MARKER).touch()
+
+    def release(self, path: Path):
+        """The artifact was downloaded; it may now be evicted to respect the size budget"""
+        (Path(path).parent / UNCLAIMED_MARKER).unlink(missing_ok=True)
+
+    def write(self, filename: str, writer: Callable[[Path], None]) -> Path:
+        """Run writer(part_path) and finalize the result; partial output is removed on failure"""
+        part_path = self.allocate(filename)
+        try:
+            writer(part_path)
+        except BaseException:
+            self.discard(part_path)
+            raise
+        return self.finalize(part_path)
+
+    def _entries(self):
+        """Yield (path, size, mtime, protected) for each top-level artifact entry.
+
+        Entries still being written (.part) or not yet downloaded are protected
+        from size-based eviction.
+        """
+        for entry in os.scandir(self.root_dir):
+            protected = False
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    size = 0
+                    mtime = entry.stat().st_mtime
+                    for child in os.scandir(entry.path):
+                        child_stat = child.stat(follow_symlinks=False)
+                        size += child_stat.st_size
+                        mtime = max(mtime, child_stat.st_mtime)
+                        protected = protected or child.name.endswith('.part') or child.name == UNCLAIMED_MARKER
+                else:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    size, mtime = entry_stat.st_size, entry_stat.st_mtime
+            except FileNotFoundError:
+                continue  # removed concurrently (another worker's sweep)
+            yield Path(entry.path), size, mtime, protected
+
+    def _remove(self, path: Path):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+    def sweep(self) -> dict:
+        """Delete expired artifacts, then evict the oldest downloaded ones while over the size budget"""
+        now = time.time()
+        with self._lock:
+            pending = set(self._pending)
+
+        entries = []
+        expired = evicted = reclaimed = 0
+        for path, size, mtime, protected in self._entries():
+            if path in pending:
+                continue
+            if now - mtime > self.ttl_seconds:
+                # Also clears .part leftovers of jobs that died mid-write
+                self._remove(path)
+                expired += 1
+                reclaimed += size
+            else:
+                entries.append((mtime, size, protected, path))
+
+        total = sum(entry[1] for entry in entries)
+        for mtime, size, protected, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if protected:
+                continue  # still being written by another worker, or not downloaded yet
+            self._remove(path)
+            evicted += 1
+            reclaimed += size
+            total -= size
+
+        with self._lock:
+            self._metrics['expired'] += expired
+            self._metrics['evicted'] += evicted
+            self._metrics['bytes_reclaimed'] += reclaimed
+            self._metrics['last_sweep'] = now
+        return {'expired': expired, 'evicted': evicted, 'bytes_reclaimed': reclaimed}
+
+    def start_gc(self):
+        """Start the background garbage collection thread (once per process, also after a fork)"""
+        def gc_loop():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as exc:
+                    print(f"Artifact cleanup failed: {exc}")
+                time.sleep(self.sweep_interval)
+
+        with self._lock:
+            if self._gc_thread is not None and self._gc_pid == os.getpid():
+                return
+            self._gc_pid = os.getpid()
+            self._gc_thread = threading.Thread(target=gc_loop, name='artifact-gc', daemon=True)
+            self._gc_thread.start()
+
+    def stats(self) -> dict:
+        """Disk usage and cleanup metrics for the artifact directory"""
+        now = time.time()
+        count = total = 0
+        oldest: Optional[float] = None
+        for _, size, mtime, _ in self._entries():
+            count += 1
+            total += size
+            oldest = mtime if oldest is None else min(oldest, mtime)
+
+        with self._lock:
+            metrics = dict(self._metrics)
+            pending = len(self._pending)
+
+        return {
+            'root_dir': str(self.root_dir),
+            'artifacts': count,
+            'pending': pending,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'oldest_age_seconds': int(now - oldest) if oldest is not None else None,
+            **metrics
+        }
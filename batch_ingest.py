@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Ingestion of Archive Captures
+Converts many saved captures (MHTML -> HTML -> articles) in parallel and merges
+them into the combined dataset.
+
+Each capture is converted by a worker process; as soon as a capture is done its
+articles are fed to the deduplication engine of an incremental ingest, so the
+merge overlaps with the conversion of the remaining captures.
+
+Usage:
+    python batch_ingest.py captures/*.mhtml
+    python batch_ingest.py captures/ --workers 4 --extract-only
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from article_extractor import extract_articles_to_jsonl
+from combine_and_deduplicate import COMBINED_FILE, ingest
+from mhtml_to_html_converter import extract_html_from_mhtml
+
+CAPTURE_SUFFIXES = ('.mhtml', '.mht', '.html', '.htm', '.json', '.jsonl')
+DEFAULT_WORK_DIR = "batch_output"
+
+
+def find_captures(paths):
+    """Expand directories into the capture files they contain"""
+    captures = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            captures.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in CAPTURE_SUFFIXES))
+        else:
+            captures.append(path)
+    return captures
+
+
+def work_file_stem(index, capture_path):
+    """Name of a capture's intermediate files: its position in the batch keeps
+    captures with the same file name (from different directories) apart"""
+    return f"{index:05d}_{Path(capture_path).stem}"
+
+
+def process_capture(capture_path, work_dir, index=0):
+    """Convert one capture to a JSONL batch file (runs in a worker process).
+
+    index is the capture's position in the batch (see work_file_stem).
+    Returns the batch file, the article count and the time spent in each stage.
+    """
+    capture = Path(capture_path)
+    stem = work_file_stem(index, capture)
+    suffix = capture.suffix.lower()
+    timings = {}
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        if suffix in ('.json', '.jsonl'):
+            return {'capture': str(capture), 'batch_file': str(capture), 'articles': None, 'timings': timings}
+
+        html_path = capture
+        if suffix in ('.mhtml', '.mht'):
+            started = time.perf_counter()
+            html_path = Path(work_dir) / f"{stem}.html"
+            if not extract_html_from_mhtml(str(capture), str(html_path), location_pattern=None):
+                raise ValueError(f"no HTML part found ({log.getvalue().strip().splitlines()[-1]})")
+            timings['mhtml'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batch_file = Path(work_dir) / f"{stem}.jsonl"
+        count = extract_articles_to_jsonl(str(html_path), str(batch_file))
+        timings['extract'] = time.perf_counter() - started
+
+    return {'capture': str(capture), 'batch_file': str(batch_file), 'articles': count, 'timings': timings}
+
+
+def run_batch(captures, work_dir=DEFAULT_WORK_DIR, workers=None, extract_only=False, report_file=None):
+    """Convert captures in a process pool and ingest each one as it finishes"""
+    os.makedirs(work_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    totals = {'mhtml': 0.0, 'extract': 0.0, 'dedup': 0.0}
+    failed = []
+    started = time.perf_counter()
+
+    print("📦 BATCH INGEST")
+    print("=" * 50)
+    print(f"Captures: {len(captures)}, workers: {workers}, work dir: {work_dir}")
+
+    def completed_batches():
+        """Yield batch files in completion order; the time until the next request is the dedup time"""
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_capture, str(capture), work_dir, index): capture
+                       for index, capture in enumerate(captures)}
+            for done, future in enumerate(as_completed(futures), 1):
+                capture = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.append(str(capture))
+                    print(f"[{done}/{len(captures)}] ❌ {capture}: {e}")
+                    continue
+
+                for stage, seconds in result['timings'].items():
+                    totals[stage] += seconds
+                stages = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in result['timings'].items())
+                articles = f"{result['articles']:,} articles" if result['articles'] is not None else "batch file"
+                print(f"[{done}/{len(captures)}] ✅ {capture}: {articles}" + (f" ({stages})" if stages else ""))
+
+                merge_started = time.perf_counter()
+                yield result['batch_file']
+                totals['dedup'] += time.perf_counter() - merge_started
+
+    if extract_only:
+        batch_files = list(completed_batches())
+        ingest_seconds = 0.0
+    else:
+        batch_files = []
+
+        def tracked():
+            for batch_file in completed_batches():
+                batch_files.append(batch_file)
+                yield batch_file
+
+        ingest_started = time.perf_counter()
+        ingest(tracked(), report_file=report_file)
+        ingest_seconds = time.perf_counter() - ingest_started - totals['dedup']
+
+    elapsed = time.perf_counter() - started
+    print(f"\n⏱️ Timings (stage times are summed over workers):")
+    print(f"  MHTML -> HTML: {totals['mhtml']:.1f}s")
+    print(f"  HTML -> articles: {totals['extract']:.1f}s")
+    if not extract_only:
+        print(f"  Deduplication: {totals['dedup']:.1f}s")
+        print(f"  Waiting for workers, clustering and saving: {ingest_seconds:.1f}s")
+    print(f"  Wall clock: {elapsed:.1f}s")
+    print(f"Batch files: {len(batch_files)}" + (f", failed captures: {len(failed)}" if failed else ""))
+    for capture in failed:
+        print(f"  - {capture}")
+    return batch_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert and ingest many archive captures in parallel')
+    parser.add_argument('captures', nargs='+', help='MHTML/HTML captures, JSON/JSONL batch files or directories of them')
+    parser.add_argument('--workers', type=int, help='worker processes (default: number of CPUs)')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK_DIR, help='where extracted HTML and JSONL files are written')
+    parser.add_argument('--extract-only', action='store_true',
+                        help='only produce the JSONL batch files, do not ingest them')
+    parser.add_argument('--report', metavar='PATH',
+                        help='write every merge decision (dropped/replaced duplicate) to a JSONL file')
+    args = parser.parse_args()
+
+    captures = find_captures(args.captures)
+    if not captures:
+        print("No captures found")
+        return
+    extract_only = args.extract_only
+    if not extract_only and not os.path.exists(COMBINED_FILE):
+        print(f"{COMBINED_FILE} not found: extracting only (run combine_and_deduplicate.py on the batch files first)")
+        extract_only = True
+
+    run_batch(captures, args.work_dir, args.workers, extract_only, args.report)
+    if args.report and not extract_only:
+        print(f"Merge decisions written to: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
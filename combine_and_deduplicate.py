@@ -5,48 +5,201 @@ Combine and Deduplicate Articles from Multiple JSON Files
 Combines all articles_data_*.json files and removes duplicates based on title and link
 """
 
+import argparse
 import json
 import os
+import shutil
 from datetime import datetime
 from collections import defaultdict
 
-def load_articles_from_file(file_path):
-    """Load articles from a JSON file"""
+from article_store import ArticleStore, load_store, save_snapshot, snapshot_lock, snapshot_path_for
+from near_duplicates import article_text, assign_clusters, cluster_summary
+
+COMBINED_FILE = "articles_combined.json"
+SUMMARY_FILE = "dataset_summary.json"
+KEY_INDEX_FILE = "articles_combined.keys.jsonl"
+
+def dedup_key(title, link):
+    """Deduplication key of a title and link; a missing or null value counts as ''"""
+    return f"{title or ''}_{link or ''}"
+
+def article_key(article):
+    """Deduplication key of an article dict: title and link"""
+    return dedup_key(article.get('title'), article.get('link'))
+
+def replacement_reason(article, existing):
+    """Why article is a better version of existing (non-null date, longer excerpt), or None"""
+    if article.get('date') and not existing.get('date'):
+        return 'replaced_missing_date'
+    if len(article.get('excerpt', '')) > len(existing.get('excerpt', '')):
+        return 'replaced_longer_excerpt'
+    return None
+
+def write_json_atomic(path, data):
+    """Write JSON through a temporary file so a running web app never reads a partial file"""
+    tmp_file = f"{path}.part"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
+
+def iter_json_array(file_path, chunk_size=1024 * 1024):
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+        started = False
+        after_value = False  # an element was read, expecting ',' or ']'
+
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    raise ValueError('unexpected end of file')
+                fill()
+                continue
+
+            char = buffer[position]
+            if not started:
+                if char != '[':
+                    raise ValueError('expected a JSON array')
+                started = True
+                position += 1
+                continue
+            if char == ']':
+                return
+            if char == ',' and after_value:
+                after_value = False
+                position += 1
+                continue
+            if after_value:
+                raise ValueError(f"expected ',' or ']' at character {char!r}")
+
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                fill()  # element continues in the next chunk
+                continue
+            if end == len(buffer) and not eof:
+                fill()  # a number/literal might continue in the next chunk
+                continue
+            position = end
+            after_value = True
+            yield value
+
+
+def iter_json_lines(file_path):
+    """Yield the records of a JSONL file (e.g. from article_extractor's streaming mode)"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_articles_from_file(file_path):
+    """Stream articles from a JSON or JSONL file"""
+    count = 0
+    records = iter_json_lines(file_path) if file_path.endswith('.jsonl') else iter_json_array(file_path)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            articles = json.load(f)
-        print(f"Loaded {len(articles)} articles from {file_path}")
-        return articles
+        for article in records:
+            count += 1
+            yield article
+        print(f"Loaded {count} articles from {file_path}")
     except Exception as e:
-        print(f"Error loading {file_path}: {e}")
-        return []
+        print(f"Error loading {file_path} (after {count} articles): {e}")
+
+
+class DedupEngine:
+    """Streaming deduplication by title and link.
+
+    Unique articles live in slots in first-seen order and a key -> slot index
+    makes both the duplicate check and the replacement by a better version O(1).
+    Every merge decision is counted and can be written to a JSONL report.
+    """
+
+    def __init__(self, lookup_existing=None, report_file=None):
+        self.slots = []       # unique articles in first-seen order
+        self.sources = []     # source file of the article in each slot
+        self.positions = {}   # dedup key -> slot
+        self.existing_slots = set()  # slots seeded from lookup_existing
+        self.decisions = defaultdict(int)
+        self.lookup_existing = lookup_existing  # key -> already stored article (incremental ingest)
+        self.report = open(report_file, 'w', encoding='utf-8') if report_file else None
+
+    def add(self, article, source=None):
+        """Merge one article; returns the decision taken"""
+        key = article_key(article)
+        slot = self.positions.get(key)
+        if slot is None and self.lookup_existing is not None:
+            existing = self.lookup_existing(key)
+            if existing is not None:
+                slot = self._append(key, existing, 'existing')
+                self.existing_slots.add(slot)
+
+        if slot is None:
+            self._append(key, article, source)
+            decision = 'new'
+        else:
+            reason = replacement_reason(article, self.slots[slot])
+            decision = reason or 'dropped_duplicate'
+            if self.report:
+                self.report.write(json.dumps({
+                    'decision': decision,
+                    'title': article.get('title'),
+                    'link': article.get('link'),
+                    'kept_from': source if reason else self.sources[slot],
+                    'dropped_from': self.sources[slot] if reason else source
+                }, ensure_ascii=False) + '\n')
+            if reason:
+                self.slots[slot] = article
+                self.sources[slot] = source
+
+        self.decisions[decision] += 1
+        return decision
+
+    def _append(self, key, article, source):
+        self.positions[key] = len(self.slots)
+        self.slots.append(article)
+        self.sources.append(source)
+        return len(self.slots) - 1
+
+    def add_file(self, file_path):
+        for article in iter_articles_from_file(file_path):
+            self.add(article, file_path)
+
+    def close(self):
+        if self.report:
+            self.report.close()
+            self.report = None
+
+    def print_report(self):
+        print("Merge decisions:")
+        for decision in ('new', 'dropped_duplicate', 'replaced_missing_date', 'replaced_longer_excerpt'):
+            print(f"  - {decision}: {self.decisions[decision]:,}")
+
+    def unique_articles(self):
+        """Deduplicated articles (excluding ones seeded from lookup_existing)"""
+        return [article for slot, article in enumerate(self.slots) if slot not in self.existing_slots]
+
 
 def deduplicate_articles(all_articles):
     """Remove duplicate articles based on title and link"""
-    seen_articles = {}
-    unique_articles = []
-    duplicates_removed = 0
-    
+    engine = DedupEngine()
     for article in all_articles:
-        # Create a unique key based on title and link
-        key = f"{article.get('title', '')}_{article.get('link', '')}"
-        
-        if key not in seen_articles:
-            seen_articles[key] = article
-            unique_articles.append(article)
-        else:
-            duplicates_removed += 1
-            # Keep the article with more complete data (prefer non-null dates, longer excerpts)
-            existing = seen_articles[key]
-            if (article.get('date') and not existing.get('date')) or \
-               (len(article.get('excerpt', '')) > len(existing.get('excerpt', ''))):
-                # Replace with better version
-                seen_articles[key] = article
-                unique_articles = [a for a in unique_articles if a != existing]
-                unique_articles.append(article)
-    
+        engine.add(article)
+    duplicates_removed = sum(count for decision, count in engine.decisions.items() if decision != 'new')
     print(f"Removed {duplicates_removed} duplicate articles")
-    return unique_articles
+    return engine.unique_articles()
 
 def analyze_articles(articles):
     """Analyze the combined articles dataset"""
@@ -100,8 +253,174 @@ def analyze_articles(articles):
         'missing_images': missing_images
     }
 
-def main():
-    """Main function to combine and deduplicate all JSON files"""
+def load_key_index(path=KEY_INDEX_FILE):
+    """Load the persisted dedup key -> article id index (append-only JSONL)"""
+    key_to_id = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # interrupted write
+                entry = json.loads(line)
+                key_to_id[entry['key']] = entry['id']
+    except FileNotFoundError:
+        pass
+    return key_to_id
+
+def append_key_index(entries, path=KEY_INDEX_FILE):
+    with open(path, 'a', encoding='utf-8') as f:
+        for key, article_id in entries:
+            f.write(json.dumps({'key': key, 'id': article_id}, ensure_ascii=False) + '\n')
+
+def write_key_index(key_to_id, path=KEY_INDEX_FILE):
+    tmp_file = f"{path}.part"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    append_key_index(key_to_id.items(), tmp_file)
+    os.replace(tmp_file, path)
+
+def assign_ids(articles, previous_ids):
+    """Give every article an id, keeping the id of articles already known by key"""
+    next_id = max(previous_ids.values(), default=0) + 1
+    key_to_id = {}
+    for article in articles:
+        key = article_key(article)
+        article_id = previous_ids.get(key)
+        if article_id is None:
+            article_id = next_id
+            next_id += 1
+        article['id'] = article_id
+        key_to_id[key] = article_id
+    return key_to_id
+
+def update_summary(summary, added=(), removed=()):
+    """Apply added/removed articles to a dataset_summary.json dict in place"""
+    for articles, sign in ((added, 1), (removed, -1)):
+        for article in articles:
+            summary['total_articles'] += sign
+            article_type = article.get('type', 'unknown')
+            summary['type_counts'][article_type] = summary['type_counts'].get(article_type, 0) + sign
+            date = article.get('date')
+            if date:
+                year = date.split('-')[0]
+                summary['year_counts'][year] = summary['year_counts'].get(year, 0) + sign
+            summary['missing_dates'] += sign * (not date)
+            summary['missing_excerpts'] += sign * (not article.get('excerpt'))
+            summary['missing_images'] += sign * (not article.get('image_url'))
+    summary['type_counts'] = {k: v for k, v in summary['type_counts'].items() if v}
+    summary['year_counts'] = {k: v for k, v in sorted(summary['year_counts'].items()) if v}
+    return summary
+
+def append_to_json_array(path, articles, existing_count):
+    """Append records to a pretty-printed JSON array without re-serialising the existing ones"""
+    tmp_file = f"{path}.part"
+    shutil.copyfile(path, tmp_file)
+    with open(tmp_file, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - 64))
+        tail = f.read()
+        f.seek(end - len(tail) + len(tail[:tail.rindex(b']')].rstrip()))
+        f.truncate()
+        items = ',\n'.join(
+            '  ' + json.dumps(article, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            for article in articles
+        )
+        f.write(((',\n' if existing_count else '\n') + items + '\n]').encode('utf-8'))
+    os.replace(tmp_file, path)
+
+def ingest(batch_files, combined_file=COMBINED_FILE, report_file=None):
+    """Merge new batch files into the combined dataset without a full recombine.
+
+    Existing articles keep their ids; new ones get ids after the current maximum.
+    When a batch only adds articles, the combined JSON is appended to and the
+    snapshot is extended; a batch that improves existing articles rewrites them.
+    """
+    print("📥 INCREMENTAL INGEST")
+    print("=" * 50)
+
+    # Held from the first read to the last write: a concurrent ingest must see
+    # this one's articles and ids, and web workers that notice the new JSON wait
+    # for this snapshot instead of building their own
+    with snapshot_lock(combined_file):
+        store = load_store(combined_file)
+        key_to_id = load_key_index()
+        if len(key_to_id) != len(store):
+            print(f"Rebuilding dedup key index from {combined_file}")
+            key_to_id = {dedup_key(store.title[row], store.link[row]): store.ids[row] for row in range(len(store))}
+            write_key_index(key_to_id)
+
+        def lookup_existing(key):
+            article_id = key_to_id.get(key)
+            return store.article(store.row_for_id(article_id)) if article_id is not None else None
+
+        engine = DedupEngine(lookup_existing, report_file)
+        try:
+            for file_path in batch_files:
+                engine.add_file(file_path)
+        finally:
+            engine.close()
+
+        next_id = max(key_to_id.values(), default=0) + 1
+        added = []
+        replacements = {}    # row -> better version of an existing article
+        for slot, article in enumerate(engine.slots):
+            if slot in engine.existing_slots:
+                if engine.sources[slot] != 'existing':
+                    row = store.row_for_id(key_to_id[article_key(article)])
+                    replacements[row] = dict(article, id=store.ids[row], cluster_id=store.cluster_ids[row])
+            else:
+                added.append(dict(article, id=next_id))
+                next_id += 1
+
+        # Near-duplicate clusters: existing articles keep theirs, new ones may join them.
+        # The existing articles' signatures and LSH bands come from the snapshot, so
+        # only the new articles are signed.
+        if added:
+            assign_clusters(added, store.near_duplicates)
+
+        engine.print_report()
+        print(f"New articles: {len(added):,}")
+        print(f"Existing articles improved: {len(replacements):,}")
+        if not added and not replacements:
+            print("Nothing to ingest")
+            return
+
+        removed = [store.article(row) for row in replacements]
+        if replacements:
+            index = store.near_duplicates
+            records = store.to_records()
+            for row, article in replacements.items():
+                records[row] = article
+                index.replace(row, article_text(article))
+            records.extend(added)
+            write_json_atomic(combined_file, records)
+            new_store = ArticleStore.from_records(records, near_duplicates=index)
+        else:
+            append_to_json_array(combined_file, added, len(store))
+            new_store = store.extended(added, near_duplicates=store.near_duplicates)
+        snapshot_file = save_snapshot(new_store, snapshot_path_for(combined_file), source_path=combined_file)
+        append_key_index((article_key(article), article['id']) for article in added)
+
+        # Summary: adjust counts for the changed articles only
+        try:
+            with open(SUMMARY_FILE, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+            update_summary(summary, added=added + list(replacements.values()), removed=removed)
+        except (FileNotFoundError, ValueError, KeyError):
+            summary = analyze_articles(new_store.to_records())
+        dates = [date for date in new_store.dates.categories if date]
+        summary['date_range'] = f"{dates[0]} to {dates[-1]}" if dates else "No dates"
+        write_json_atomic(SUMMARY_FILE, summary)
+
+    affected_dates = sorted({a.get('date') for a in added + removed + list(replacements.values()) if a.get('date')})
+    print(f"\n✅ SUCCESS!")
+    print(f"Combined dataset: {len(new_store):,} articles ({combined_file}, {snapshot_file})")
+    print(f"Affected dates: {len(affected_dates)}" + (f" ({affected_dates[0]} to {affected_dates[-1]})" if affected_dates else ""))
+    print(f"Analysis summary saved to: {SUMMARY_FILE}")
+
+def combine_all(report_file=None):
+    """Combine and deduplicate all articles_data_*.json files"""
     print("🔄 COMBINING AND DEDUPLICATING ARTICLES")
     print("=" * 50)
     
@@ -116,40 +435,68 @@ def main():
     for file_path in json_files:
         print(f"  - {file_path}")
     
-    # Load all articles
-    all_articles = []
-    for file_path in json_files:
-        articles = load_articles_from_file(file_path)
-        all_articles.extend(articles)
+    # Stream all articles through the dedup engine
+    engine = DedupEngine(report_file=report_file)
+    try:
+        for file_path in json_files:
+            engine.add_file(file_path)
+    finally:
+        engine.close()
+    total_articles = sum(engine.decisions.values())
     
-    print(f"\nTotal articles before deduplication: {len(all_articles):,}")
+    print(f"\nTotal articles before deduplication: {total_articles:,}")
+    engine.print_report()
+    unique_articles = engine.unique_articles()
     
-    # Remove duplicates
-    unique_articles = deduplicate_articles(all_articles)
+    # Assign IDs (articles from a previous run keep theirs so /article/<id> links stay valid)
+    key_to_id = assign_ids(unique_articles, load_key_index())
     
-    # Reassign IDs
-    for i, article in enumerate(unique_articles, 1):
-        article['id'] = i
+    # Group re-published near-identical stories so the app can collapse them
+    print("\nDetecting near-duplicates...")
+    index = assign_clusters(unique_articles)
+    clusters = cluster_summary(article['cluster_id'] for article in unique_articles)
+    print(f"Near-duplicate articles: {clusters['near_duplicate_articles']:,} "
+          f"in {clusters['clusters_with_duplicates']:,} clusters")
     
     # Analyze the combined dataset
     analysis = analyze_articles(unique_articles)
     
     # Save combined file
-    output_file = "articles_combined.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(unique_articles, f, ensure_ascii=False, indent=2)
+    output_file = COMBINED_FILE
+    # Binary snapshot for fast loading by the web app and research tools, written
+    # under the snapshot lock together with the JSON it describes
+    with snapshot_lock(output_file):
+        write_json_atomic(output_file, unique_articles)
+        snapshot_file = save_snapshot(ArticleStore.from_records(unique_articles, near_duplicates=index),
+                                      snapshot_path_for(output_file), source_path=output_file)
+    write_key_index(key_to_id)
     
     print(f"\n✅ SUCCESS!")
     print(f"Combined dataset saved to: {output_file}")
     print(f"Final unique articles: {len(unique_articles):,}")
-    print(f"Duplicates removed: {len(all_articles) - len(unique_articles):,}")
+    print(f"Duplicates removed: {total_articles - len(unique_articles):,}")
+    print(f"Binary snapshot saved to: {snapshot_file}")
     
     # Save analysis summary
-    summary_file = "dataset_summary.json"
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        json.dump(analysis, f, ensure_ascii=False, indent=2)
+    write_json_atomic(SUMMARY_FILE, analysis)
     
-    print(f"Analysis summary saved to: {summary_file}")
+    print(f"Analysis summary saved to: {SUMMARY_FILE}")
+
+def main():
+    """Full recombine of all batch files, or incremental ingest of new ones"""
+    parser = argparse.ArgumentParser(description='Combine and deduplicate scraped article batches')
+    parser.add_argument('--ingest', nargs='+', metavar='BATCH_FILE',
+                        help='append new batch files to the existing combined dataset instead of recombining')
+    parser.add_argument('--report', metavar='PATH',
+                        help='write every merge decision (dropped/replaced duplicate) to a JSONL file')
+    args = parser.parse_args()
+
+    if args.ingest:
+        ingest(args.ingest, report_file=args.report)
+    else:
+        combine_all(report_file=args.report)
+    if args.report:
+        print(f"Merge decisions written to: {args.report}")
 
 if __name__ == "__main__":
     main()
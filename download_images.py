@@ -4,12 +4,12 @@
 
 import argparse
 import json
-import os
 from pathlib import Path
-from urllib.parse import urlparse, unquote
 
 import requests
 
+from image_store import ImageStore
+
 DEFAULT_OUTPUT_DIR = Path("images_cache")
 ARTICLES_FILE = Path("articles_combined.json")
 
@@ -54,38 +54,6 @@ def filter_articles(articles, target_date=None):
     return filtered
 
 
-def build_filename(article, output_dir: Path):
-    image_url = article["image_url"]
-    parsed = urlparse(image_url)
-    # Extract filename and extension from URL path
-    basename = Path(unquote(parsed.path)).name
-    if not basename:
-        basename = f"article_{article.get('id', 'unknown')}"
-
-    stem, ext = os.path.splitext(basename)
-    if not ext:
-        ext = ".jpg"
-
-    article_date = article.get("date") or "unknown_date"
-    safe_date = article_date.replace("/", "-")
-    target_dir = output_dir / safe_date
-    target_dir.mkdir(parents=True, exist_ok=True)
-
-    filename = f"{article.get('id', 'article')}_{stem}{ext}"
-    return target_dir / filename
-
-
-def download_image(url: str, destination: Path, force: bool = False):
-    if destination.exists() and not force:
-        return False  # skipped
-
-    response = requests.get(url, timeout=15)
-    response.raise_for_status()
-
-    destination.write_bytes(response.content)
-    return True
-
-
 def main():
     args = parse_arguments()
 
@@ -108,7 +76,10 @@ def main():
     if args.force:
         print("⚠️ سيتم إعادة تحميل الصور حتى لو كانت موجودة مسبقًا")
 
+    store = ImageStore(args.output)
+
     downloaded = 0
+    deduplicated = 0
     skipped = 0
     errors = 0
 
@@ -116,24 +87,29 @@ def main():
         if args.limit and downloaded >= args.limit:
             break
 
-        destination = build_filename(article, args.output)
         image_url = article["image_url"]
 
         try:
-            changed = download_image(image_url, destination, args.force)
-            if changed:
-                downloaded += 1
-                print(f"✅ تم التحميل: {destination.relative_to(args.output)}")
-            else:
-                skipped += 1
+            destination, outcome = store.fetch(image_url, force=args.force)
         except requests.RequestException as exc:
             errors += 1
             print(f"❌ خطأ في تحميل الصورة ({image_url}): {exc}")
+            continue
+
+        if outcome == "downloaded":
+            downloaded += 1
+            print(f"✅ تم التحميل: {destination.relative_to(args.output)}")
+        elif outcome == "deduplicated":
+            deduplicated += 1
+        else:
+            skipped += 1
 
     print("\n🚩 ملخص التحميل:")
     print(f"   الصور الجديدة: {downloaded}")
+    print(f"   الصور المكررة (نفس المحتوى برابط مختلف): {deduplicated}")
     print(f"   الصور المتخطاة (موجودة مسبقًا): {skipped}")
     print(f"   أخطاء التحميل: {errors}")
+    print(f"   عدد الصور الفريدة في المخزن: {len(store)}")
 
 
 if __name__ == "__main__":
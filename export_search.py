@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming Export of Search Results
+Writes the articles matching a search as CSV, JSONL or Parquet, chunk by chunk
+straight from the article store columns, so a 10k+ article subset is never
+materialized as a list of dicts or a DataFrame. The web app streams the same
+chunks as an HTTP download.
+
+Usage:
+    python export_search.py غزة -o gaza.csv
+    python export_search.py غزة --content-type video --date-from 2024-10-01 -o gaza_videos.parquet
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+from article_store import ARTICLE_FIELDS, load_store
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: Parquet export is unavailable without it
+    pa = None
+
+EXPORT_FORMATS = {
+    # format -> (mimetype, file extension)
+    'csv': ('text/csv; charset=utf-8', '.csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', '.jsonl'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet')
+}
+EXPORT_CHUNK_ROWS = 2000
+INTEGER_FIELDS = ('id', 'cluster_id')
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def _columns(store) -> Dict[str, object]:
+    """Field name -> the store column holding it"""
+    return {
+        'id': store.ids, 'title': store.title, 'excerpt': store.excerpt, 'link': store.link,
+        'date': store.dates, 'date_text': store.date_text, 'image_url': store.image_url,
+        'type': store.types, 'source': store.sources, 'cluster_id': store.cluster_ids
+    }
+
+
+def store_chunks(store, rows: Iterable[int], fields: Sequence[str] = ARTICLE_FIELDS,
+                 chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Dict[str, list]]:
+    """Column dicts of up to chunk_rows rows each, read from the store columns"""
+    columns = _columns(store)
+    chunk: List[int] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield {field: [columns[field][r] for r in chunk] for field in fields}
+            chunk = []
+    if chunk:
+        yield {field: [columns[field][r] for r in chunk] for field in fields}
+
+
+def record_chunks(records: Iterable[dict], fields: Sequence[str],
+                  chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Dict[str, list]]:
+    """Column dicts built from article dicts (for callers that already hold records)"""
+    chunk: List[dict] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_rows:
+            yield {field: [r.get(field) for r in chunk] for field in fields}
+            chunk = []
+    if chunk:
+        yield {field: [r.get(field) for r in chunk] for field in fields}
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose written bytes can be taken out after each chunk"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def encode_chunks(chunks: Iterable[Dict[str, list]], fmt: str,
+                  fields: Sequence[str] = ARTICLE_FIELDS) -> Iterator[bytes]:
+    """Encode column chunks as the bytes of one CSV, JSONL or Parquet file"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(fields)
+        yield ('\ufeff' + buffer.getvalue()).encode('utf-8')  # BOM (utf-8-sig) so Excel reads Arabic
+        for chunk in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(zip(*(chunk[field] for field in fields)))
+            yield buffer.getvalue().encode('utf-8')
+    elif fmt == 'jsonl':
+        for chunk in chunks:
+            lines = (json.dumps(dict(zip(fields, values)), ensure_ascii=False)
+                     for values in zip(*(chunk[field] for field in fields)))
+            yield ''.join(line + '\n' for line in lines).encode('utf-8')
+    elif fmt == 'parquet':
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet export")
+        schema = pa.schema([(field, pa.int64() if field in INTEGER_FIELDS else pa.string()) for field in fields])
+        sink = _DrainableSink()
+        writer = pq.ParquetWriter(sink, schema)
+        for chunk in chunks:  # one row group per chunk
+            writer.write_table(pa.Table.from_pydict(chunk, schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    else:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+
+def write_chunks(chunks: Iterable[bytes], output_file: str) -> None:
+    """Write encoded chunks to a file (via a .part file, so readers never see half an export)"""
+    tmp_path = f"{output_file}.part"
+    try:
+        with open(tmp_path, 'wb') as output:
+            for data in chunks:
+                output.write(data)
+        os.replace(tmp_path, output_file)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def format_for_path(output_file: str) -> str:
+    extension = os.path.splitext(output_file)[1].lower()
+    for fmt, (_, fmt_extension) in EXPORT_FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    return 'csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the articles matching a search as CSV, JSONL or Parquet')
+    parser.add_argument('query', nargs='?', default='', help='search text (empty: every article)')
+    parser.add_argument('-o', '--output', required=True, help='output file (.csv, .jsonl or .parquet)')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), help='default: from the output extension')
+    parser.add_argument('--type', default='all', choices=('all', 'title', 'excerpt'), help='fields to search')
+    parser.add_argument('--content-type', default='all', help='article type (post, video, liveblog, ...)')
+    parser.add_argument('--date-from', help='YYYY-MM-DD')
+    parser.add_argument('--date-to', help='YYYY-MM-DD')
+    parser.add_argument('--dataset', default='articles_combined.json')
+    args = parser.parse_args()
+
+    fmt = args.format or format_for_path(args.output)
+    if fmt == 'parquet' and not parquet_available():
+        print("❌ Parquet export needs pyarrow (pip install pyarrow)")
+        return
+
+    started = time.perf_counter()
+    store = load_store(args.dataset)
+    exported = 0
+
+    def counted(rows):
+        nonlocal exported
+        for row in rows:
+            exported += 1
+            yield row
+
+    rows = store.search_rows(args.query, args.type, args.content_type, args.date_from, args.date_to)
+    write_chunks(encode_chunks(store_chunks(store, counted(rows)), fmt), args.output)
+    print(f"✅ Exported {exported:,} articles to {args.output} ({fmt}, {time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn configuration for the Palestine News web application
+Usage: gunicorn app:app
+
+The app is imported once in the master (preload_app) and workers are forked
+from it. The article store lives in a read-only memory-mapped snapshot, so all
+workers share one physical copy of the dataset and its indexes; the remaining
+Python objects created at import time are moved out of the garbage collector's
+reach before forking so that collections in the workers do not touch (and
+copy) the shared pages.
+
+Note: background job progress is kept in memory per worker, so the job
+endpoints need sticky sessions (or a single worker) behind a load balancer.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120  # synchronous exports can take a while
+preload_app = True
+
+
+def when_ready(server):
+    """Freeze everything allocated while loading the app (runs once, before the first fork)"""
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} objects before forking workers")
+
+
+def post_fork(server, worker):
+    """Start the export cleanup thread in each worker (the master's thread is not inherited)"""
+    from app import artifacts
+    artifacts.start_gc()
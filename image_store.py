@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed image store
+Images are stored once as blobs named by the SHA-256 of their bytes, and an
+append-only index maps every image URL to the blob holding its content.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not coordinated between processes
+    fcntl = None
+
+INDEX_FILENAME = "index.jsonl"
+BLOBS_DIRNAME = "blobs"
+DEFAULT_EXTENSION = ".jpg"
+KNOWN_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".svg", ".avif"}
+
+
+def guess_extension(image_url: str) -> str:
+    """Return a normalised file extension for an image URL (default .jpg)"""
+    basename = Path(unquote(urlparse(image_url).path)).name
+    ext = os.path.splitext(basename)[1].lower()
+    return ext if ext in KNOWN_EXTENSIONS else DEFAULT_EXTENSION
+
+
+class ImageStore:
+    """Deduplicating image cache keyed by content hash.
+
+    Path resolution is a dictionary lookup that never touches the disk: the
+    index is loaded once and blob shard directories are created at most once
+    per process. A blob deleted behind the index is only noticed when reading
+    it fails; the reader then calls forget_missing() so that the next fetch
+    downloads it again. Several processes may share the store; index appends
+    are serialized with a file lock.
+    """
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = Path(root_dir)
+        self.blobs_dir = self.root_dir / BLOBS_DIRNAME
+        self.index_path = self.root_dir / INDEX_FILENAME
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._url_to_blob = {}     # image URL -> blob filename
+        self._digest_to_blob = {}  # sha256 hex digest -> blob filename
+        self._index_offset = 0     # bytes of index.jsonl already loaded
+        self._shard_dirs = set()   # shard directories known to exist
+        self._refresh_index()
+
+    def __len__(self):
+        return len(self._digest_to_blob)
+
+    def _refresh_index(self):
+        """Load index entries appended since the last refresh (possibly by other processes)"""
+        try:
+            with self.index_path.open("rb") as fh:
+                self._read_entries(fh)
+        except FileNotFoundError:
+            pass
+
+    def _read_entries(self, fh):
+        fh.seek(self._index_offset)
+        for raw_line in fh:
+            if not raw_line.endswith(b"\n"):
+                break  # partially written entry, pick it up next time
+            self._index_offset += len(raw_line)
+            try:
+                entry = json.loads(raw_line)
+            except ValueError:
+                continue
+            blob = entry.get("blob")
+            if not blob:
+                continue
+            self._url_to_blob[entry["url"]] = blob
+            self._digest_to_blob.setdefault(blob.split(".", 1)[0], blob)
+
+    def _append_index(self, url: str, blob: str):
+        """Append an entry under an exclusive lock, first loading what other processes appended"""
+        line = json.dumps({"url": url, "blob": blob}, ensure_ascii=False) + "\n"
+        with self.index_path.open("a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                self._read_entries(fh)
+                fh.seek(0, os.SEEK_END)
+                fh.write(line.encode("utf-8"))
+                fh.flush()
+                self._index_offset = fh.tell()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        self._url_to_blob[url] = blob
+
+    def blob_path(self, blob: str) -> Path:
+        return self.blobs_dir / blob[:2] / blob
+
+    def lookup(self, image_url: str) -> Optional[Path]:
+        """Return the cached path for a URL from the in-memory index, or None if it is not indexed"""
+        blob = self._url_to_blob.get(image_url)
+        return self.blob_path(blob) if blob else None
+
+    def forget_missing(self, image_url: str) -> bool:
+        """Drop a URL whose blob could not be read because it was deleted; returns True if dropped.
+
+        Only this process forgets it; the next fetch() downloads the image and
+        put() writes the blob back.
+        """
+        with self._lock:
+            blob = self._url_to_blob.get(image_url)
+            if not blob or self.blob_path(blob).exists():
+                return False
+            del self._url_to_blob[image_url]
+            return True
+
+    def put(self, image_url: str, content: bytes, force: bool = False) -> Tuple[Path, bool]:
+        """Store image bytes for a URL; returns (path, stored) where stored is False for duplicates.
+
+        An indexed blob is written again when its file is missing or force is set.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            blob = self._digest_to_blob.get(digest)
+            stored = blob is None or force or not self.blob_path(blob).exists()
+            if stored:
+                blob = blob or digest + guess_extension(image_url)
+                shard_dir = self.blobs_dir / blob[:2]
+                if shard_dir not in self._shard_dirs:
+                    shard_dir.mkdir(exist_ok=True)
+                    self._shard_dirs.add(shard_dir)
+                tmp_path = shard_dir / f".{blob}.{uuid.uuid4().hex}.part"
+                tmp_path.write_bytes(content)
+                os.replace(tmp_path, shard_dir / blob)
+                self._digest_to_blob[digest] = blob
+            if self._url_to_blob.get(image_url) != blob:
+                self._append_index(image_url, blob)
+        return self.blob_path(blob), stored
+
+    def fetch(self, image_url: str, force: bool = False, timeout: int = 15,
+              fetcher: Optional[Callable[[str], bytes]] = None) -> Tuple[Path, str]:
+        """Return the local path for an image URL, downloading it only if needed.
+
+        The second element reports what happened: 'cached' (URL already indexed),
+        'downloaded' (new or missing blob stored) or 'deduplicated' (content already stored
+        under another URL). Raises requests.RequestException on download errors.
+        A custom fetcher (url -> bytes) can replace the plain requests.get call.
+        """
+        if not force:
+            path = self.lookup(image_url)
+            if path is not None:
+                return path, "cached"
+            with self._lock:
+                self._refresh_index()
+            path = self.lookup(image_url)
+            if path is not None:
+                return path, "cached"
+
+        if fetcher is not None:
+            content = fetcher(image_url)
+        else:
+            response = requests.get(image_url, timeout=timeout)
+            response.raise_for_status()
+            content = response.content
+        path, stored = self.put(image_url, content, force=force)
+        return path, "downloaded" if stored else "deduplicated"
@@ -3,79 +3,158 @@
 """
 MHTML to HTML Converter
 Extracts HTML content from MHTML files and converts quoted-printable encoding
+
+The MHTML file is parsed as a stream of MIME parts: only the current line is
+held in memory, the HTML part is picked by its headers and its body is decoded
+line by line straight into the output file, so very large saved pages convert
+in bounded memory.
 """
 
+import binascii
+import codecs
+import os
 import re
-import quopri
 import sys
-import os
+from email.parser import BytesHeaderParser
 
-def decode_quoted_printable(text):
-    """Decode quoted-printable encoded text"""
-    try:
-        return quopri.decodestring(text).decode('utf-8', errors='ignore')
-    except:
-        return text
+# Content-Location of the saved Al Jazeera Palestine listing page
+DEFAULT_LOCATION_PATTERN = r'https://www\.aljazeera\.net/.*palestine'
 
-def extract_html_from_mhtml(mhtml_file_path, output_file_path):
-    """Extract HTML content from MHTML file"""
-    
-    print(f"Reading MHTML file: {mhtml_file_path}")
-    
-    with open(mhtml_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-    
-    # Find the main HTML section
-    # Updated pattern to handle different Al Jazeera URL structures
-    html_start_pattern = r'Content-Type: text/html.*?Content-Location: https://www\.aljazeera\.net/.*?palestine.*?\n\n'
-    html_match = re.search(html_start_pattern, content, re.DOTALL)
-    
-    if not html_match:
-        print("Could not find HTML content section")
-        return False
-    
-    # Extract HTML content starting from DOCTYPE
-    html_start = html_match.end()
-    html_content = content[html_start:]
-    
-    # Find the end of the HTML content (look for the next boundary or end of file)
-    # The main HTML section should end around line 297155 based on our search
-    lines = html_content.split('\n')
-    html_lines = []
-    
-    for i, line in enumerate(lines):
-        # Stop when we hit the next MIME boundary or if we've gone too far
-        if line.startswith('------MultipartBoundary') or i > 300000:
+
+def read_headers(stream):
+    """Read a MIME header block (up to the blank line) and parse it"""
+    header_lines = []
+    for line in stream:
+        if not line.strip():
             break
-        html_lines.append(line)
-    
-    # Join the HTML lines and decode quoted-printable
-    raw_html = '\n'.join(html_lines)
-    
-    print("Decoding quoted-printable content...")
-    decoded_html = decode_quoted_printable(raw_html)
-    
-    # Clean up the HTML
-    # Remove any remaining quoted-printable artifacts
-    decoded_html = re.sub(r'=\n', '', decoded_html)  # Remove soft line breaks
-    decoded_html = re.sub(r'=([0-9A-F]{2})', lambda m: chr(int(m.group(1), 16)), decoded_html)  # Decode hex chars
-    
-    print(f"Writing HTML file: {output_file_path}")
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        f.write(decoded_html)
-    
-    print(f"Conversion completed successfully!")
-    print(f"HTML file saved as: {output_file_path}")
-    return True
+        header_lines.append(line)
+    if not header_lines:
+        return None
+    return BytesHeaderParser().parsebytes(b''.join(header_lines))
+
+
+class PartDecoder:
+    """Incrementally decode one MIME part body (quoted-printable, base64 or plain) to UTF-8"""
+
+    def __init__(self, transfer_encoding, charset, output):
+        self.transfer_encoding = (transfer_encoding or '7bit').strip().lower()
+        try:
+            self.text_decoder = codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+        except LookupError:
+            self.text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.output = output
+        self.pending_newline = b''  # the line break before a boundary belongs to the boundary
+        self.base64_remainder = b''
+        self.bytes_written = 0
+
+    def _emit(self, data, final=False):
+        text = self.text_decoder.decode(data, final)
+        if text:
+            encoded = text.encode('utf-8')
+            self.output.write(encoded)
+            self.bytes_written += len(encoded)
+
+    def feed(self, line):
+        """Decode one raw body line (including its line ending)"""
+        body = line.rstrip(b'\r\n')
+        newline = line[len(body):]
+
+        if self.transfer_encoding == 'quoted-printable':
+            data = self.pending_newline
+            if body.endswith(b'='):
+                data += binascii.a2b_qp(body[:-1])  # soft line break
+                self.pending_newline = b''
+            else:
+                data += binascii.a2b_qp(body)
+                self.pending_newline = b'\n' if newline else b''
+            self._emit(data)
+        elif self.transfer_encoding == 'base64':
+            chunk = self.base64_remainder + b''.join(body.split())
+            usable = len(chunk) - len(chunk) % 4
+            self.base64_remainder = chunk[usable:]
+            if usable:
+                self._emit(binascii.a2b_base64(chunk[:usable]))
+        else:
+            self._emit(self.pending_newline + body)
+            self.pending_newline = newline
+
+    def close(self):
+        if self.base64_remainder:
+            self._emit(binascii.a2b_base64(self.base64_remainder + b'=' * (-len(self.base64_remainder) % 4)))
+        self._emit(b'', final=True)
+
+
+def extract_html_from_mhtml(mhtml_file_path, output_file_path, location_pattern=DEFAULT_LOCATION_PATTERN):
+    """Extract HTML content from MHTML file.
+
+    The first text/html part whose Content-Location matches location_pattern is
+    written to output_file_path (any text/html part if location_pattern is None).
+    """
+    print(f"Reading MHTML file: {mhtml_file_path}")
+    location_regex = re.compile(location_pattern) if location_pattern else None
+
+    with open(mhtml_file_path, 'rb') as stream:
+        message_headers = read_headers(stream)
+        boundary = message_headers.get_boundary() if message_headers is not None else None
+        if not boundary:
+            print("Not a multipart MHTML file (no MIME boundary found)")
+            return False
+        delimiter = b'--' + boundary.encode('ascii', errors='ignore')
+
+        # Skip the preamble up to the first part
+        for line in stream:
+            if line.startswith(delimiter):
+                break
+
+        while True:
+            headers = read_headers(stream)
+            if headers is None:
+                break
+            location = headers.get('Content-Location', '')
+            is_target = headers.get_content_type() == 'text/html' and \
+                (location_regex is None or location_regex.search(location))
+
+            if not is_target:
+                last_part = True
+                for line in stream:
+                    if line.startswith(delimiter):
+                        last_part = line.rstrip() == delimiter + b'--'
+                        break
+                if last_part:
+                    break
+                continue
+
+            print(f"Found HTML part: {location or '(no location)'}")
+            decoder_args = (headers.get('Content-Transfer-Encoding'), headers.get_content_charset())
+            print(f"Decoding {decoder_args[0] or '7bit'} content...")
+            tmp_path = f"{output_file_path}.part"
+            with open(tmp_path, 'wb') as output:
+                decoder = PartDecoder(*decoder_args, output)
+                for line in stream:
+                    if line.startswith(delimiter):
+                        break
+                    decoder.feed(line)
+                decoder.close()
+            os.replace(tmp_path, output_file_path)
+
+            print(f"Writing HTML file: {output_file_path} ({decoder.bytes_written / 1024 / 1024:.1f} MB)")
+            print(f"Conversion completed successfully!")
+            print(f"HTML file saved as: {output_file_path}")
+            return True
+
+    print("Could not find HTML content section")
+    return False
 
 def main():
     input_file = r"C:/Users/User/Documents/gazza_app/يوميات عزة - 4.mhtml"
     output_file = r"C:\Users\User\Documents\gazza_app\palestine_news_4.html"
-    
+    if len(sys.argv) >= 3:
+        input_file, output_file = sys.argv[1], sys.argv[2]
+
     if not os.path.exists(input_file):
         print(f"Input file not found: {input_file}")
         return
-    
+
     success = extract_html_from_mhtml(input_file, output_file)
     if success:
         print(f"\n✅ Successfully converted MHTML to HTML!")
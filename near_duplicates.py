@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Near-duplicate detection for re-published articles
+MinHash signatures over word shingles of the normalized title and excerpt,
+with LSH banding to find candidates, so clustering the whole archive is
+roughly linear instead of comparing every pair of articles.
+"""
+
+import hashlib
+import operator
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+NUM_PERMUTATIONS = 64
+BANDS = 16                      # 16 bands x 4 rows: candidates from ~50% similarity
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SIMILARITY_THRESHOLD = 0.7      # estimated Jaccard similarity to join a cluster
+MAX_CANDIDATES = 32             # candidates verified per article (bounds work on huge buckets)
+MAX_CACHED_SHINGLES = 1_000_000
+EMPTY_BIN = 1 << 32             # larger than any 32-bit bin value
+DENSIFY_OFFSET = 0x9E3779B1     # keeps borrowed bin values distinct per distance
+BAND_KEY_MULTIPLIER = 0x9E3779B97F4A7C15  # mixes the 4 values of a band into one 64-bit bucket key
+
+_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+_NON_WORD = re.compile(r'[^\w]+')
+_CHAR_MAP = str.maketrans('\u0623\u0625\u0622\u0671\u0649\u0629\u0624\u0626', '\u0627\u0627\u0627\u0627\u064a\u0647\u0648\u064a')  # أإآٱ->ا ى->ي ة->ه ؤ->و ئ->ي
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip Arabic diacritics/tatweel, unify letter variants and punctuation"""
+    text = _DIACRITICS.sub('', (text or '').lower()).translate(_CHAR_MAP)
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def shingles(text: str, size: int = 2) -> set:
+    """Word n-grams of normalized text (single words for very short texts)"""
+    words = normalize_text(text).split()
+    if len(words) < size:
+        return set(words)
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def band_keys(signature: array) -> List[int]:
+    """64-bit LSH bucket key of each band of a signature"""
+    keys = []
+    for band in range(BANDS):
+        a, b, c, d = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        keys.append(((a << 32 | b) ^ ((c << 32 | d) * BAND_KEY_MULTIPLIER)) & 0xFFFFFFFFFFFFFFFF)
+    return keys
+
+
+class NearDuplicateIndex:
+    """Online MinHash/LSH clustering.
+
+    Articles are added one at a time; each joins the cluster of the most similar
+    earlier article found through the LSH buckets, or starts its own cluster.
+    Cluster ids are the id of the cluster's first article, so they stay stable
+    when articles are appended later.
+
+    An index can be saved as flat arrays (see arrays()) and reopened with
+    from_arrays(): the saved articles are then looked up in those arrays
+    (binary search in per-band sorted bucket keys) without being re-hashed, so
+    an incremental ingest only signs the new articles.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.signatures: List[Optional[array]] = []  # articles added after the saved ones
+        self.cluster_ids = array('q')
+        self._buckets = [defaultdict(list) for _ in range(BANDS)]  # band key -> positions
+        self._shingle_hashes: Dict[str, int] = {}  # shingle -> 64-bit hash
+
+        # Saved articles (from_arrays): positions 0.._saved_size-1
+        self._saved_size = 0
+        self._saved_signatures = None  # flat NUM_PERMUTATIONS values per article
+        self._saved_present = None     # 1 if the article has a signature
+        self._saved_keys = None        # per band, sorted band keys of the signed articles
+        self._saved_rows = None        # position of each entry of _saved_keys
+        self._saved_cluster_ids = None
+        self._replaced: Dict[int, Optional[array]] = {}  # saved position -> signature of its new text
+
+    @classmethod
+    def from_arrays(cls, signatures, has_signature, band_keys, band_rows, cluster_ids,
+                    threshold: float = SIMILARITY_THRESHOLD) -> 'NearDuplicateIndex':
+        """Reopen an index saved with arrays(); cluster_ids are the saved articles' clusters"""
+        if len(signatures) != len(has_signature) * NUM_PERMUTATIONS or len(cluster_ids) != len(has_signature):
+            raise ValueError('near-duplicate arrays do not match')
+        index = cls(threshold)
+        index._saved_size = len(has_signature)
+        index._saved_signatures = signatures
+        index._saved_present = has_signature
+        index._saved_keys = band_keys
+        index._saved_rows = band_rows
+        index._saved_cluster_ids = cluster_ids
+        return index
+
+    def __len__(self):
+        return self._saved_size + len(self.signatures)
+
+    def _hash(self, shingle: str) -> int:
+        value = self._shingle_hashes.get(shingle)
+        if value is None:
+            if len(self._shingle_hashes) >= MAX_CACHED_SHINGLES:
+                self._shingle_hashes.clear()
+            value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            self._shingle_hashes[shingle] = value
+        return value
+
+    def signature(self, text: str) -> Optional[array]:
+        """MinHash signature of a text (None when it has no words).
+
+        Uses one-permutation hashing: each shingle is hashed once, the low bits
+        pick one of NUM_PERMUTATIONS bins and the high bits are min-reduced in
+        that bin. Empty bins borrow the value of the next non-empty bin
+        (rotation densification) so short texts still get full signatures.
+        """
+        features = shingles(text)
+        if not features:
+            return None
+        bins = [EMPTY_BIN] * NUM_PERMUTATIONS
+        for shingle in features:
+            value = self._hash(shingle)
+            slot = value % NUM_PERMUTATIONS
+            value >>= 32
+            if value < bins[slot]:
+                bins[slot] = value
+        if EMPTY_BIN in bins:
+            filled = [slot for slot, value in enumerate(bins) if value != EMPTY_BIN]
+            for slot in range(NUM_PERMUTATIONS):
+                if bins[slot] == EMPTY_BIN:
+                    position = bisect_left(filled, slot) % len(filled)
+                    distance = (filled[position] - slot) % NUM_PERMUTATIONS
+                    bins[slot] = (bins[filled[position]] + distance * DENSIFY_OFFSET) & 0xFFFFFFFF
+        return array('I', bins)
+
+    @staticmethod
+    def similarity(first: array, second: array) -> float:
+        """Estimated Jaccard similarity: share of equal signature positions"""
+        return sum(map(operator.eq, first, second)) / NUM_PERMUTATIONS
+
+    def signature_at(self, position: int) -> Optional[array]:
+        if position >= self._saved_size:
+            return self.signatures[position - self._saved_size]
+        if position in self._replaced:
+            return self._replaced[position]
+        return self._saved_signature(position)
+
+    def _saved_signature(self, position: int) -> Optional[array]:
+        if not self._saved_present[position]:
+            return None
+        return self._saved_signatures[position * NUM_PERMUTATIONS:(position + 1) * NUM_PERMUTATIONS]
+
+    def cluster_at(self, position: int) -> int:
+        if position >= self._saved_size:
+            return self.cluster_ids[position - self._saved_size]
+        return self._saved_cluster_ids[position]
+
+    def _saved_band(self, band: int) -> Tuple[int, int]:
+        """Range of a band's entries in the saved key/row arrays"""
+        size = len(self._saved_keys) // BANDS if self._saved_keys is not None else 0
+        return band * size, (band + 1) * size
+
+    def _bucket(self, band: int, key: int) -> Iterator[int]:
+        """Positions of the articles in a band's bucket"""
+        if self._saved_keys is not None:
+            start, end = self._saved_band(band)
+            entry = bisect_left(self._saved_keys, key, start, end)
+            while entry < end and self._saved_keys[entry] == key:
+                position = self._saved_rows[entry]
+                if position not in self._replaced:  # its saved keys are of the old text
+                    yield position
+                entry += 1
+        yield from self._buckets[band].get(key, ())
+
+    def add(self, article_id: int, text: str, cluster_id: Optional[int] = None) -> int:
+        """Index an article and return its cluster id.
+
+        Pass cluster_id to index an article whose cluster is already known
+        (e.g. existing articles before an incremental ingest).
+        """
+        signature = self.signature(text)
+        position = len(self)
+        keys = band_keys(signature) if signature is not None else []
+
+        if cluster_id is None:
+            cluster_id = article_id
+            if keys:
+                shared = defaultdict(int)
+                for band, key in enumerate(keys):
+                    for candidate in self._bucket(band, key):
+                        shared[candidate] += 1
+                best = None
+                candidates = sorted(shared, key=lambda c: (-shared[c], c))[:MAX_CANDIDATES]
+                for candidate in candidates:
+                    score = self.similarity(signature, self.signature_at(candidate))
+                    if score >= self.threshold and (best is None or score > best[0]):
+                        best = (score, candidate)
+                if best is not None:
+                    cluster_id = self.cluster_at(best[1])
+
+        for band, key in enumerate(keys):
+            self._buckets[band][key].append(position)
+        self.signatures.append(signature)
+        self.cluster_ids.append(cluster_id)
+        return cluster_id
+
+    def replace(self, position: int, text: str):
+        """Re-sign an indexed article whose text changed; its cluster is kept"""
+        old = self.signature_at(position)
+        signature = self.signature(text)
+        if position >= self._saved_size or position in self._replaced:
+            for band, key in enumerate(band_keys(old) if old is not None else ()):
+                self._buckets[band][key].remove(position)
+        if position >= self._saved_size:
+            self.signatures[position - self._saved_size] = signature
+        else:
+            self._replaced[position] = signature
+        for band, key in enumerate(band_keys(signature) if signature is not None else ()):
+            self._buckets[band][key].append(position)
+
+    @staticmethod
+    def _insert_position(keys, rows, start: int, end: int, key: int, position: int) -> int:
+        """Where (key, position) goes in a band's saved entries, which are ordered by (key, position)"""
+        first = bisect_left(keys, key, start, end)
+        return bisect_left(rows, position, first, bisect_right(keys, key, first, end))
+
+    def arrays(self) -> Dict[str, array]:
+        """The index as flat arrays for from_arrays() (cluster ids are saved by the caller).
+
+        Saved articles are copied slice by slice; only the added and replaced
+        articles' band keys are merged into the per-band arrays, which stay
+        ordered by (band key, position).
+        """
+        size = len(self)
+        has_signature = array('B', bytes(size))
+        signatures = array('I')
+        if self._saved_size:
+            has_signature[:self._saved_size] = array('B', bytes(self._saved_present))
+            signatures.frombytes(bytes(self._saved_signatures))
+        zeros = array('I', bytes(4 * NUM_PERMUTATIONS))
+        for position, signature in self._replaced.items():
+            has_signature[position] = signature is not None
+            start = position * NUM_PERMUTATIONS
+            signatures[start:start + NUM_PERMUTATIONS] = signature if signature is not None else zeros
+        for offset, signature in enumerate(self.signatures):
+            has_signature[self._saved_size + offset] = signature is not None
+            signatures.extend(signature if signature is not None else zeros)
+
+        # Stale saved entries (replaced articles) are dropped, in-memory bucket entries merged in
+        stale = [[] for _ in range(BANDS)]
+        for position in self._replaced:
+            old = self._saved_signature(position)
+            for band, key in enumerate(band_keys(old) if old is not None else ()):
+                start, end = self._saved_band(band)
+                entry = bisect_left(self._saved_keys, key, start, end)
+                while self._saved_rows[entry] != position:
+                    entry += 1
+                stale[band].append(entry)
+        saved_keys = self._saved_keys if self._saved_keys is not None else array('Q')
+        saved_rows = self._saved_rows if self._saved_rows is not None else array('I')
+        keys, rows = array('Q'), array('I')
+        for band in range(BANDS):
+            start, end = self._saved_band(band)
+            added = sorted((key, position) for key, positions in self._buckets[band].items() for position in positions)
+            # (entry, is_stale, ...): an insertion goes before a stale entry at the same place
+            events = sorted([(entry, 1, 0, 0) for entry in stale[band]] +
+                            [(self._insert_position(saved_keys, saved_rows, start, end, key, position), 0, key, position)
+                             for key, position in added])
+            cursor = start
+            for entry, is_stale, key, position in events:
+                keys.frombytes(bytes(saved_keys[cursor:entry]))
+                rows.frombytes(bytes(saved_rows[cursor:entry]))
+                cursor = entry
+                if is_stale:
+                    cursor += 1
+                else:
+                    keys.append(key)
+                    rows.append(position)
+            keys.frombytes(bytes(saved_keys[cursor:end]))
+            rows.frombytes(bytes(saved_rows[cursor:end]))
+        return {'signatures': signatures, 'has_signature': has_signature, 'band_keys': keys, 'band_rows': rows}
+
+
+def article_text(article: dict) -> str:
+    return f"{article.get('title') or ''} {article.get('excerpt') or ''}"
+
+
+def assign_clusters(articles: Iterable[dict], index: Optional[NearDuplicateIndex] = None) -> NearDuplicateIndex:
+    """Set 'cluster_id' on every article (articles must already have ids)"""
+    if index is None:
+        index = NearDuplicateIndex()
+    for article in articles:
+        article['cluster_id'] = index.add(article['id'], article_text(article))
+    return index
+
+
+def cluster_summary(cluster_ids: Iterable[int]) -> dict:
+    sizes = defaultdict(int)
+    for cluster_id in cluster_ids:
+        sizes[cluster_id] += 1
+    duplicates = [size for size in sizes.values() if size > 1]
+    return {
+        'clusters': len(sizes),
+        'clusters_with_duplicates': len(duplicates),
+        'near_duplicate_articles': sum(duplicates) - len(duplicates),
+        'largest_cluster': max(sizes.values(), default=0)
+    }
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    import time
+
+    from article_store import load_articles
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'articles_combined.json'
+    records = load_articles(path)
+    started = time.perf_counter()
+    assign_clusters(records)
+    elapsed = time.perf_counter() - started
+    print(json.dumps(cluster_summary(record['cluster_id'] for record in records), indent=2))
+    print(f"Clustered {len(records):,} articles in {elapsed:.2f}s")
@@ -11,10 +11,11 @@ from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 import pandas as pd
 
+from article_store import load_articles as load_combined_articles
+
 def load_articles():
     """Load the combined articles dataset"""
-    with open('articles_combined.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return load_combined_articles('articles_combined.json')
 
 def research_example_1_timeline_analysis():
     """Example 1: Analyze article frequency over time"""
@@ -5,142 +5,188 @@ Research Tools for Palestine News Articles Dataset
 Various analysis and search functions for the combined articles dataset
 """
 
-import json
 import re
-from datetime import datetime, timedelta
-from collections import Counter, defaultdict
-import matplotlib.pyplot as plt
+from collections import Counter
+import numpy as np
 import pandas as pd
-from wordcloud import WordCloud
-import arabic_reshaper
-from bidi.algorithm import get_display
+
+from article_store import ARTICLE_FIELDS, load_store
+from export_search import encode_chunks, record_chunks, write_chunks
+from wordcloud_service import render_wordcloud, word_frequencies
+
+MAX_CACHED_KEYWORD_MASKS = 4096
+
+def categorical(column):
+    """pandas Categorical sharing the codes of an article_store CategoricalColumn (None -> NaN)"""
+    categories = list(column.categories)
+    codes = np.asarray(column.codes, dtype=np.int32)
+    if None in categories:
+        missing = categories.index(None)
+        codes = np.where(codes == missing, -1, codes - (codes > missing))
+        del categories[missing]
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def build_frame(store):
+    """Typed DataFrame of the columns the queries filter and group on: datetime64
+    dates, categorical types and an image flag.
+
+    Dates are parsed once per distinct value and spread to the rows through the
+    store's category codes, so building the frame does no per-article parsing.
+    Text stays in the store; result dicts are built from it for the selected rows.
+    """
+    date_codes = np.asarray(store.dates.codes, dtype=np.int32)
+    date_values = pd.to_datetime(pd.Series(store.dates.categories, dtype=object), format='%Y-%m-%d', errors='coerce')
+    image_offsets = np.asarray(store.image_url.offsets, dtype=np.int64)
+    return pd.DataFrame({
+        'date': date_values.to_numpy()[date_codes],
+        'type': categorical(store.types),
+        'has_image': np.diff(image_offsets) > 0,
+    })
 
 class PalestineNewsAnalyzer:
     def __init__(self, json_file_path):
         """Initialize the analyzer with the combined articles dataset"""
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            self.articles = json.load(f)
-        print(f"Loaded {len(self.articles)} articles for analysis")
+        self.store = load_store(json_file_path)
+        # Queries are masks and groupbys over this frame; results are returned as
+        # the matching article dicts
+        self.frame = build_frame(self.store)
+        self._keyword_masks = {}  # (keyword, case_sensitive) -> row mask
+        print(f"Loaded {len(self.store)} articles for analysis")
+
+    def select(self, mask, newest_first=False):
+        """Article dicts of the rows selected by a boolean mask"""
+        rows = np.flatnonzero(np.asarray(mask, dtype=bool))
+        if newest_first:
+            # Stable, so articles of the same day keep their dataset order
+            dates = self.frame['date'].iloc[rows].reset_index(drop=True)
+            rows = rows[dates.sort_values(ascending=False, kind='stable', na_position='last').index.to_numpy()]
+        return self.store.articles(rows.tolist())
+
+    def date_mask(self, start_date, end_date):
+        """Rows dated between start_date and end_date (inclusive, 'YYYY-MM-DD')"""
+        dates = self.frame['date']
+        return ((dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))).to_numpy()
+
+    def type_mask(self, article_type):
+        """Rows of one article type"""
+        return (self.frame['type'] == article_type).to_numpy()
     
+    def keyword_mask(self, keyword, case_sensitive=False):
+        """Rows whose title or excerpt contains keyword.
+
+        The title and excerpt columns are scanned once per keyword (the store
+        keeps them as contiguous UTF-8 buffers, with pre-lowercased copies) and
+        the mask is cached, so sweeps that reuse keywords only combine masks.
+        """
+        key = (keyword if case_sensitive else keyword.lower(), case_sensitive)
+        mask = self._keyword_masks.get(key)
+        if mask is None:
+            if case_sensitive:
+                columns = (self.store.title, self.store.excerpt)
+            else:
+                columns = (self.store.title_lower, self.store.excerpt_lower)
+            mask = np.zeros(len(self.store), dtype=bool)
+            for column in columns:
+                mask[column.find_rows(key[0])] = True
+            if len(self._keyword_masks) >= MAX_CACHED_KEYWORD_MASKS:
+                self._keyword_masks.clear()
+            self._keyword_masks[key] = mask
+        return mask
+
+    def keywords_mask(self, keywords, case_sensitive=False):
+        """Rows matching any of the keywords"""
+        mask = np.zeros(len(self.store), dtype=bool)
+        for keyword in keywords:
+            mask |= self.keyword_mask(keyword, case_sensitive)
+        return mask
+
+    def keyword_masks(self, keyword_sets, case_sensitive=False):
+        """Match masks for many keyword sets at once.
+
+        keyword_sets maps a name to a list of keywords (a plain list of lists is
+        named by its position). Returns a boolean DataFrame with one column per
+        set, aligned with self.frame, so it combines with the other masks:
+
+            masks = analyzer.keyword_masks({'gaza': ['غزة', 'gaza'], 'un': ['الأمم المتحدة']})
+            analyzer.select(masks['gaza'] & analyzer.date_mask('2023-10-01', '2023-10-31'))
+            masks[analyzer.type_mask('video')].sum()   # matches per set among videos
+        """
+        if not isinstance(keyword_sets, dict):
+            keyword_sets = dict(enumerate(keyword_sets))
+        return pd.DataFrame({
+            name: self.keywords_mask(keywords, case_sensitive) for name, keywords in keyword_sets.items()
+        }, index=self.frame.index)
+
     def search_by_keywords(self, keywords, case_sensitive=False):
         """Search articles by keywords in title or excerpt"""
-        results = []
-        keywords_lower = [kw.lower() for kw in keywords] if not case_sensitive else keywords
-        
-        for article in self.articles:
-            title = article.get('title', '').lower() if not case_sensitive else article.get('title', '')
-            excerpt = article.get('excerpt', '').lower() if not case_sensitive else article.get('excerpt', '')
-            
-            if any(keyword in title or keyword in excerpt for keyword in keywords_lower):
-                results.append(article)
-        
-        return results
+        return self.select(self.keywords_mask(keywords, case_sensitive))
     
     def get_articles_by_date_range(self, start_date, end_date):
         """Get articles within a specific date range"""
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-        
-        results = []
-        for article in self.articles:
-            article_date = datetime.strptime(article.get('date', ''), '%Y-%m-%d')
-            if start <= article_date <= end:
-                results.append(article)
-        
-        return results
+        return self.select(self.date_mask(start_date, end_date))
     
     def get_articles_by_type(self, article_type):
         """Get articles by type (post, video, liveblog, episode)"""
-        return [article for article in self.articles if article.get('type') == article_type]
+        return self.select(self.type_mask(article_type))
     
     def analyze_timeline(self):
         """Analyze article distribution over time"""
-        dates = [article.get('date') for article in self.articles if article.get('date')]
-        date_counts = Counter(dates)
-        
-        # Convert to DataFrame for easier analysis
-        df = pd.DataFrame(list(date_counts.items()), columns=['date', 'count'])
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        
-        return df
+        date_counts = self.frame['date'].dropna().value_counts().sort_index()
+        return date_counts.rename_axis('date').reset_index(name='count')
     
     def get_most_active_days(self, top_n=20):
         """Get the most active days by article count"""
-        dates = [article.get('date') for article in self.articles if article.get('date')]
-        date_counts = Counter(dates)
-        return date_counts.most_common(top_n)
-    
-    def analyze_content_themes(self, top_n=50):
-        """Analyze common themes and keywords in titles"""
-        all_titles = ' '.join([article.get('title', '') for article in self.articles])
-        
-        # Extract Arabic words (simplified approach)
-        words = re.findall(r'[\u0600-\u06FF]+', all_titles)
-        word_counts = Counter(words)
-        
-        return word_counts.most_common(top_n)
+        date_counts = self.frame['date'].dropna().value_counts(sort=False)
+        top = date_counts.sort_values(ascending=False, kind='stable').head(top_n)
+        return [(date.strftime('%Y-%m-%d'), int(count)) for date, count in top.items()]
+    
+    def analyze_content_themes(self, top_n=50, start_date=None, end_date=None):
+        """Analyze common themes and keywords in titles (optionally within a date window)"""
+        # Merged from the precomputed per-day/per-month title term counts
+        return self.store.terms.top_terms(top_n, start_date, end_date)
     
     def get_video_articles(self):
         """Get all video articles with their details"""
-        videos = self.get_articles_by_type('video')
-        return sorted(videos, key=lambda x: x.get('date', ''), reverse=True)
+        return self.select(self.type_mask('video'), newest_first=True)
     
     def get_live_blog_articles(self):
         """Get all live blog articles"""
-        liveblogs = self.get_articles_by_type('liveblog')
-        return sorted(liveblogs, key=lambda x: x.get('date', ''), reverse=True)
+        return self.select(self.type_mask('liveblog'), newest_first=True)
     
     def search_by_url_pattern(self, pattern):
         """Search articles by URL pattern"""
-        results = []
-        for article in self.articles:
-            link = article.get('link', '')
-            if re.search(pattern, link):
-                results.append(article)
-        return results
+        regex = re.compile(pattern)
+        return self.select([regex.search(link) is not None for link in self.store.link.to_list()])
     
     def get_articles_with_images(self):
         """Get articles that have images"""
-        return [article for article in self.articles if article.get('image_url')]
+        return self.select(self.frame['has_image'].to_numpy())
     
     def export_to_csv(self, articles, filename):
         """Export articles to CSV for further analysis"""
-        df = pd.DataFrame(articles)
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
+        fields = list(articles[0]) if articles else ARTICLE_FIELDS
+        write_chunks(encode_chunks(record_chunks(articles, fields), 'csv', fields), filename)
         print(f"Exported {len(articles)} articles to {filename}")
     
-    def generate_wordcloud(self, text_field='title', output_file='wordcloud.png'):
-        """Generate a word cloud from article titles or excerpts"""
-        text = ' '.join([article.get(text_field, '') for article in self.articles])
-        
-        # Configure for Arabic text
-        arabic_text = arabic_reshaper.reshape(text)
-        bidi_text = get_display(arabic_text)
-        
-        wordcloud = WordCloud(
-            font_path='arial.ttf',  # You may need to install Arabic font
-            width=800, height=400,
-            background_color='white',
-            max_words=100
-        ).generate(bidi_text)
-        
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        plt.show()
+    def generate_wordcloud(self, text_field='title', output_file='wordcloud.png', content_type='all',
+                           start_date=None, end_date=None, max_words=100):
+        """Generate a word cloud PNG from article titles or excerpts (headless, from term frequencies)"""
+        # Set WORDCLOUD_FONT to a font with Arabic glyphs if arial.ttf is not available
+        frequencies = word_frequencies(self.store, text_field, content_type, start_date, end_date, max_words)
+        render_wordcloud(frequencies, output_file)
+        print(f"Word cloud saved to {output_file}")
     
     def get_statistics(self):
         """Get comprehensive statistics about the dataset"""
+        dates = self.frame['date']
         stats = {
-            'total_articles': len(self.articles),
+            'total_articles': len(self.store),
             'date_range': {
-                'start': min([article.get('date') for article in self.articles if article.get('date')]),
-                'end': max([article.get('date') for article in self.articles if article.get('date')])
+                'start': dates.min().strftime('%Y-%m-%d'),
+                'end': dates.max().strftime('%Y-%m-%d')
             },
-            'article_types': Counter([article.get('type') for article in self.articles]),
-            'articles_with_images': len(self.get_articles_with_images()),
+            'article_types': Counter(self.store.types.value_counts()),
+            'articles_with_images': int(self.frame['has_image'].sum()),
             'most_common_words': self.analyze_content_themes(20)
         }
         return stats
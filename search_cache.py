@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Search result cache
+Bounded LRU of search results keyed by the normalized query. An entry holds
+the matching rows and the totals, so a repeated search (the quick keywords)
+and every later page of it are slices of a cached list. The cache belongs to
+one dataset version and empties itself as soon as it sees a newer store.
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class SearchResult:
+    """Rows and totals of one search; rows is None for results too big to keep"""
+
+    __slots__ = ('rows', 'matched', 'total_collapsed', '_collapsed')
+
+    def __init__(self, rows: Optional[array], matched: int, total_collapsed: int):
+        self.rows = rows
+        self.matched = matched
+        self.total_collapsed = total_collapsed
+        self._collapsed = None
+
+    def total(self, collapse: bool = False) -> int:
+        return self.total_collapsed if collapse else self.matched
+
+    def view(self, store, collapse: bool = False):
+        """(rows, near-duplicate cluster sizes) as shown with or without collapsing"""
+        if not collapse:
+            return self.rows, None
+        if self._collapsed is None:  # built on first use, then kept with the entry
+            kept, sizes = store.collapse_rows(self.rows)
+            self._collapsed = (array('I', kept), sizes)
+        return self._collapsed
+
+
+class SearchResultCache:
+    """LRU of SearchResult entries for one dataset version, bounded by entries and cached rows"""
+
+    def __init__(self, max_entries: int = 256, max_rows: int = 1000000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized query -> SearchResult, least recently used first
+        self._version = None
+        self._rows = 0  # rows held by all entries
+        self._metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    @staticmethod
+    def normalize(query='', search_type='all', content_type='all', date_from=None, date_to=None) -> Tuple:
+        """Cache key: search is case-insensitive and search_type is irrelevant without a query"""
+        query = (query or '').lower()
+        return (query, (search_type or 'all') if query else 'all', content_type or 'all',
+                date_from or '', date_to or '')
+
+    def lookup(self, store, query='', search_type='all', content_type='all', date_from=None,
+               date_to=None) -> SearchResult:
+        """The result of a search on store, from the cache or computed and added to it"""
+        key = self.normalize(query, search_type, content_type, date_from, date_to)
+        with self._lock:
+            if store.version != self._version:
+                self._invalidate(store.version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._metrics['hits'] += 1
+                return entry
+            self._metrics['misses'] += 1
+
+        rows = array('I', store.search_rows(*key))
+        cluster_ids = store.cluster_ids
+        entry = SearchResult(rows, len(rows), len({cluster_ids[row] for row in rows}))
+        if len(rows) > self.max_rows // 4:
+            entry.rows = None  # keep only the totals of huge results
+
+        with self._lock:
+            if store.version == self._version and key not in self._entries:
+                self._entries[key] = entry
+                self._rows += len(entry.rows or ())
+                while self._entries and (len(self._entries) > self.max_entries or self._rows > self.max_rows):
+                    _, evicted = self._entries.popitem(last=False)
+                    self._rows -= len(evicted.rows or ())
+                    self._metrics['evictions'] += 1
+        return entry
+
+    def _invalidate(self, version):
+        if self._entries:
+            self._metrics['invalidations'] += 1
+        self._entries.clear()
+        self._rows = 0
+        self._version = version
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            lookups = metrics['hits'] + metrics['misses']
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'rows': self._rows,
+                'max_entries': self.max_entries,
+                'max_rows': self.max_rows,
+                **metrics,
+                'hit_ratio': round(metrics['hits'] / lookups, 4) if lookups else None
+            }
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precomputed term frequencies of the article titles
+Count tables per article, per day, per month and for the whole archive, so the
+top terms of any date window are a merge of a few precomputed rows instead of
+a rescan of every title. The tables are stored in the dataset snapshot and
+extended (not rebuilt) on incremental ingest.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from article_store import StringArena
+
+TERM_PATTERN = re.compile(r'[\u0600-\u06FF]+')  # Arabic words, as in the original theme analysis
+
+
+def tokenize(text: str) -> List[str]:
+    return TERM_PATTERN.findall(text or '')
+
+
+class CountTable:
+    """Rows of (term id, count) pairs stored CSR-style in three flat arrays"""
+
+    def __init__(self, offsets, terms, counts):
+        self.offsets = offsets  # len(rows) + 1
+        self.terms = terms      # term ids, ascending within a row
+        self.counts = counts
+
+    @classmethod
+    def empty(cls) -> 'CountTable':
+        return cls(array('I', [0]), array('I'), array('I'))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row(self, key: int):
+        start, end = self.offsets[key], self.offsets[key + 1]
+        return zip(self.terms[start:end], self.counts[start:end])
+
+    def append(self, counts: Dict[int, int]):
+        """Append a row (only for tables being built)"""
+        for term in sorted(counts):
+            self.terms.append(term)
+            self.counts.append(counts[term])
+        self.offsets.append(len(self.terms))
+
+    def append_row_of(self, other: 'CountTable', key: int):
+        start, end = other.offsets[key], other.offsets[key + 1]
+        self.terms.extend(other.terms[start:end])
+        self.counts.extend(other.counts[start:end])
+        self.offsets.append(len(self.terms))
+
+    def arrays(self) -> Tuple:
+        return self.offsets, self.terms, self.counts
+
+
+def month_keys(date_categories: Sequence[Optional[str]]) -> List[str]:
+    """Months (YYYY-MM) present in the sorted date categories"""
+    return sorted({date[:7] for date in date_categories if date})
+
+
+def _add(target: dict, pairs) -> None:
+    get = target.get
+    for term, count in pairs:
+        target[term] = get(term, 0) + count
+
+
+class TermCounts:
+    """Term-frequency tables of the article titles.
+
+    Day rows are keyed by the store's date category codes (categories are
+    sorted, so a date window is a contiguous code range) and month rows by
+    month_keys(date categories). Term ids follow first appearance in the
+    dataset, which is also the tie order of the top-term lists.
+    """
+
+    def __init__(self, vocabulary: StringArena, tables: Dict[str, CountTable], date_categories: Sequence):
+        self.vocabulary = vocabulary
+        self.article = tables['article']
+        self.day = tables['day']
+        self.month = tables['month']
+        self.total = tables['total']
+        self.date_categories = date_categories
+        self.months = month_keys(date_categories)
+        self._term_ids = None
+
+    @classmethod
+    def from_titles(cls, titles: Iterable[str], date_codes, date_categories: Sequence) -> 'TermCounts':
+        term_ids: Dict[str, int] = {}
+        article = CountTable.empty()
+        days = [dict() for _ in date_categories]
+        for title, date_code in zip(titles, date_codes):
+            counts = {}
+            for term in tokenize(title):
+                term_id = term_ids.setdefault(term, len(term_ids))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            article.append(counts)
+            _add(days[date_code], counts.items())
+        return cls._from_days(StringArena.from_strings(term_ids), article, days, date_categories, term_ids)
+
+    @classmethod
+    def _from_days(cls, vocabulary, article, days, date_categories, term_ids=None) -> 'TermCounts':
+        months = month_keys(date_categories)
+        month_index = {month: position for position, month in enumerate(months)}
+        month_rows = [dict() for _ in months]
+        total = {}
+        day = CountTable.empty()
+        for date, counts in zip(date_categories, days):
+            day.append(counts)
+            if date:
+                _add(month_rows[month_index[date[:7]]], counts.items())
+            _add(total, counts.items())
+        month = CountTable.empty()
+        for counts in month_rows:
+            month.append(counts)
+        total_table = CountTable.empty()
+        total_table.append(total)
+        terms = cls(vocabulary, {'article': article, 'day': day, 'month': month, 'total': total_table}, date_categories)
+        terms._term_ids = term_ids
+        return terms
+
+    def _term_id_map(self) -> Dict[str, int]:
+        if self._term_ids is None:
+            self._term_ids = {value: term_id for term_id, value in enumerate(self.vocabulary.to_list())}
+        return self._term_ids
+
+    def term_id(self, term: str) -> Optional[int]:
+        return self._term_id_map().get(term)
+
+    def extended(self, titles: Sequence[str], date_categories: Sequence, date_codes) -> 'TermCounts':
+        """Tables with articles appended (incremental ingest).
+
+        titles are the new articles' titles; date_categories/date_codes are the
+        date column of the extended store, whose last len(titles) rows are the
+        new articles. Only the new titles are tokenized and only the days and
+        months they fall on are merged; every other row is copied as is.
+        """
+        term_ids = dict(self._term_id_map())
+        new_terms = []
+        article = CountTable(array('I', self.article.offsets), array('I', self.article.terms),
+                             array('I', self.article.counts))
+        changed_days: Dict[Optional[str], dict] = {}
+        first_new_row = len(date_codes) - len(titles)
+        for position, title in enumerate(titles):
+            counts = {}
+            for term in tokenize(title):
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(term_ids)
+                    new_terms.append(term)
+                counts[term_id] = counts.get(term_id, 0) + 1
+            article.append(counts)
+            date = date_categories[date_codes[first_new_row + position]]
+            _add(changed_days.setdefault(date, {}), counts.items())
+
+        changed_months: Dict[str, dict] = {}
+        total = dict(self.total.row(0))
+        for date, counts in changed_days.items():
+            if date:
+                _add(changed_months.setdefault(date[:7], {}), counts.items())
+            _add(total, counts.items())
+
+        def merged(keys, old_table, old_keys, changed):
+            old_positions = {key: position for position, key in enumerate(old_keys)}
+            table = CountTable.empty()
+            for key in keys:
+                old_position = old_positions.get(key)
+                if key not in changed:
+                    table.append_row_of(old_table, old_position)
+                    continue
+                counts = dict(old_table.row(old_position)) if old_position is not None else {}
+                _add(counts, changed[key].items())
+                table.append(counts)
+            return table
+
+        total_table = CountTable.empty()
+        total_table.append(total)
+        tables = {
+            'article': article,
+            'day': merged(date_categories, self.day, self.date_categories, changed_days),
+            'month': merged(month_keys(date_categories), self.month, self.months, changed_months),
+            'total': total_table
+        }
+        vocabulary = self.vocabulary.extended(new_terms) if new_terms else self.vocabulary
+        terms = TermCounts(vocabulary, tables, date_categories)
+        terms._term_ids = term_ids
+        return terms
+
+    # -- queries ------------------------------------------------------------
+
+    def date_code_range(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Tuple[int, int]:
+        """Codes [first, end) of the dated categories in [date_from, date_to] (compared as strings)"""
+        categories = self.date_categories
+        lo = 0  # undated articles sort first and are never inside a window
+        while lo < len(categories) and not categories[lo]:
+            lo += 1
+        first = max(lo, bisect_left(categories, date_from, lo) if date_from else lo)
+        end = bisect_right(categories, date_to, lo) if date_to else len(categories)
+        return first, max(first, end)
+
+    def window_counts(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> dict:
+        """term id -> count over the articles dated in [date_from, date_to].
+
+        Months fully inside the window come from the month table and only the
+        days at its edges from the day table.
+        """
+        if not date_from and not date_to:
+            return dict(self.total.row(0))
+        categories = self.date_categories
+        code, end = self.date_code_range(date_from, date_to)
+        counts = {}
+        while code < end:
+            month = categories[code][:7]
+            month_end = bisect_left(categories, month + '\uffff', code)
+            starts_month = code == 0 or not categories[code - 1] or categories[code - 1][:7] != month
+            if starts_month and month_end <= end:
+                _add(counts, self.month.row(bisect_left(self.months, month)))
+            else:
+                for day_code in range(code, min(month_end, end)):
+                    _add(counts, self.day.row(day_code))
+            code = month_end
+        return counts
+
+    def day_series(self, term_id: int, first: int, end: int) -> List[int]:
+        """Daily counts of one term for the date codes [first, end)"""
+        offsets, terms, counts = self.day.arrays()
+        series = []
+        for code in range(first, end):
+            start, stop = offsets[code], offsets[code + 1]
+            position = bisect_left(terms, term_id, start, stop)
+            series.append(counts[position] if position < stop and terms[position] == term_id else 0)
+        return series
+
+    def trending(self, date_from: str, date_to: str, baseline_from: str, baseline_to: str,
+                 limit: int = 20, min_count: int = 3) -> List[dict]:
+        """Terms whose share of the window's title terms rose most against the baseline period.
+
+        The score is the ratio of the term's share in the window to its share
+        in the baseline, with add-one smoothing of the baseline count so that
+        new terms rank without dividing by zero. Terms seen fewer than
+        min_count times in the window are ignored.
+        """
+        window = self.window_counts(date_from, date_to)
+        window_total = sum(window.values())
+        if not window_total:
+            return []
+        baseline = self.window_counts(baseline_from, baseline_to)
+        scale = (sum(baseline.values()) + 1) / window_total
+        scored = sorted(
+            ((count * scale / (baseline.get(term_id, 0) + 1), count, term_id)
+             for term_id, count in window.items() if count >= min_count),
+            key=lambda item: (-item[0], -item[1], item[2])
+        )[:limit]
+        first, end = self.date_code_range(date_from, date_to)
+        return [
+            {
+                'term': self.vocabulary[term_id],
+                'count': count,
+                'baseline_count': baseline.get(term_id, 0),
+                'ratio': round(ratio, 2),
+                'daily': self.day_series(term_id, first, end)
+            }
+            for ratio, count, term_id in scored
+        ]
+
+    def rows_counts(self, rows: Iterable[int]) -> dict:
+        """term id -> count summed over the article rows (for filters the day tables cannot answer)"""
+        counts = {}
+        for row in rows:
+            _add(counts, self.article.row(row))
+        return counts
+
+    def top_terms(self, n: int = 50, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  exclude: Iterable[str] = (), counts: Optional[dict] = None) -> List[Tuple[str, int]]:
+        """Most frequent title terms in a date window (whole archive by default) or in precomputed counts"""
+        if counts is None:
+            counts = self.window_counts(date_from, date_to)
+        excluded = {self.term_id(term) for term in exclude}
+        ranked = sorted((term_id for term_id in counts if term_id not in excluded),
+                        key=lambda term_id: (-counts[term_id], term_id))[:n]
+        return [(self.vocabulary[term_id], counts[term_id]) for term_id in ranked]
+
+    def article_terms(self, row: int) -> Counter:
+        return Counter({self.vocabulary[term_id]: count for term_id, count in self.article.row(row)})
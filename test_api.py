@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the JSON API of the web app, run against a small generated dataset"""
+
+import importlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from artifacts import UNCLAIMED_MARKER
+from test_article_store import make_articles, write_dataset
+
+ARTICLES = make_articles(600)
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # app loads articles_combined.json and creates its cache folders in the working directory
+    workdir = tmp_path_factory.mktemp('app')
+    write_dataset(workdir / 'articles_combined.json', ARTICLES)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def lttb_reference(values, threshold):
+    """Straightforward LTTB (Steinarsson 2013) over points (index, value)"""
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+    every = (count - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for i in range(threshold - 2):
+        average_start = int((i + 1) * every) + 1
+        average_end = min(int((i + 2) * every) + 1, count)
+        average_x = sum(range(average_start, average_end)) / (average_end - average_start)
+        average_y = sum(values[average_start:average_end]) / (average_end - average_start)
+        areas = [
+            (abs((a - average_x) * (values[b] - values[a]) - (a - b) * (average_y - values[a])) / 2, b)
+            for b in range(int(i * every) + 1, int((i + 1) * every) + 1)
+        ]
+        a = max(areas, key=lambda item: (item[0], -item[1]))[1]
+        kept.append(a)
+    kept.append(count - 1)
+    return kept
+
+
+def test_lttb_matches_the_reference(app_module):
+    downsample = app_module.downsample_lttb
+    series = [
+        [(i * 37) % 101 for i in range(1000)],
+        [0] * 200 + [500] + [0] * 299,
+        list(range(50)),
+        [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5],
+    ]
+    for values in series:
+        for threshold in (3, 4, 10, 97, len(values) - 1, len(values), len(values) + 5):
+            kept = downsample(values, threshold)
+            assert kept == lttb_reference(values, threshold), (len(values), threshold)
+            assert len(kept) == min(threshold, len(values))
+            assert kept[0] == 0 and kept[-1] == len(values) - 1
+            assert kept == sorted(set(kept))
+    assert 200 in downsample(series[1], 10)  # the spike survives
+    assert downsample([5, 6], 2) == [0, 1]
+
+
+def test_timeline_counts_match_a_rescan(client):
+    days = Counter(article['date'] for article in ARTICLES if article['date'] and article['type'] == 'video')
+    response = client.get('/api/timeline?granularity=day&content_type=video&max_points=1000')
+    data = response.get_json()
+    assert response.status_code == 200 and not data['downsampled']
+    points = dict(data['points'])
+    assert {day: count for day, count in points.items() if count} == dict(days)
+    assert min(points) == min(days) and max(points) == max(days)
+    assert data['total_points'] == len(points)  # every day in between, empty ones included
+
+    months = Counter(article['date'][:7] for article in ARTICLES
+                     if article['date'] and 'رقم 1' in article['title'] and article['date'] <= '2024-06-30')
+    data = client.get('/api/timeline?granularity=month&q=رقم 1&date_to=2024-06-30').get_json()
+    assert [tuple(point) for point in data['points']] == sorted(months.items())
+    assert data['total_articles'] == sum(months.values())
+
+    full = client.get('/api/timeline?granularity=day').get_json()
+    data = client.get('/api/timeline?granularity=day&max_points=20').get_json()
+    assert data['downsampled'] and len(data['points']) == 20
+    assert data['total_points'] == full['total_points'] and data['total_articles'] == full['total_articles']
+    assert all(point in full['points'] for point in data['points'])
+    assert [point[0] for point in data['points']] == sorted(point[0] for point in data['points'])
+
+    assert client.get('/api/timeline?granularity=year').status_code == 400
+
+
+def test_keyword_matrix_endpoint(client, app_module):
+    keywords = ['عنوان 3', 'القدس 1']
+    data = client.get('/api/keywords/matrix?keywords=عنوان 3, القدس 1,عنوان 3&content_type=post').get_json()
+    assert data == app_module.analyzer.store.keyword_matrix(keywords, 'post')
+    assert data['totals'] == [
+        sum(1 for a in ARTICLES if a['type'] == 'post' and (k in a['title'] or k in (a['excerpt'] or '')))
+        for k in keywords]
+
+    many = ','.join(f"رقم {i}" for i in range(app_module.KEYWORD_MATRIX_MAX_KEYWORDS + 10))
+    assert len(client.get(f'/api/keywords/matrix?keywords={many}').get_json()['keywords']) == \
+        app_module.KEYWORD_MATRIX_MAX_KEYWORDS
+    assert client.get('/api/keywords/matrix?keywords= ,').status_code == 400
+
+
+def test_search_export_streams_the_search_results(client, app_module):
+    store = app_module.analyzer.store
+    response = client.get('/api/search/export?format=jsonl&q=القدس 2&content_type=post')
+    assert response.status_code == 200 and 'attachment' in response.headers['Content-Disposition']
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert records == store.articles(store.search_rows('القدس 2', 'all', 'post'))
+    assert records and all(a['type'] == 'post' and 'القدس 2' in a['excerpt'] for a in records)
+    assert client.get('/api/search/export?format=xlsx').status_code == 400
+
+
+def walk(client, url, by_cursor):
+    """Every article of a paginated endpoint, following next_cursor or the page numbers"""
+    articles, page, cursor = [], 1, None
+    while True:
+        if by_cursor:
+            data = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        else:
+            data = client.get(f'{url}&page={page}').get_json()
+        articles += data['articles']
+        if by_cursor and not data['next_cursor'] or not by_cursor and page >= data['total_pages']:
+            assert by_cursor or not data['next_cursor']
+            return articles, data['total']
+        cursor, page = data['next_cursor'], page + 1
+
+
+SEARCHES = [
+    'q=غزة عنوان 3', 'q=القدس 1&type=excerpt', 'q=رقم&content_type=video&date_from=2024-03-01&date_to=2024-09-30',
+    'content_type=liveblog', 'q=لا يوجد'
+]
+
+
+@pytest.mark.parametrize('cached', [True, False])
+def test_search_cursor_walk_matches_the_page_walk(client, app_module, monkeypatch, cached):
+    from search_cache import SearchResultCache
+    from test_article_store import _matches
+
+    if not cached:  # every result is too big to keep, so pages come from keyset scans
+        monkeypatch.setattr(app_module.analyzer, 'search_cache', SearchResultCache(max_rows=0))
+    for search in SEARCHES:
+        params = dict(param.split('=') for param in search.split('&'))
+        filters = (params.get('q', ''), params.get('type', 'all'), params.get('content_type', 'all'),
+                   params.get('date_from'), params.get('date_to'))
+        matching = [article for article in ARTICLES if _matches(article, *filters)]
+        sizes = Counter(article['cluster_id'] for article in matching)
+        first_of_cluster = list({article['cluster_id']: article for article in reversed(matching)}.values())[::-1]
+
+        for collapse, expected in ((False, matching), (True, first_of_cluster)):
+            url = f"/api/search?{search}&per_page=7{'&collapse=1' if collapse else ''}"
+            by_cursor, total = walk(client, url, by_cursor=True)
+            by_page, page_total = walk(client, url, by_cursor=False)
+            assert by_cursor == by_page, (search, collapse)
+            assert [a['id'] for a in by_cursor] == [a['id'] for a in expected], (search, collapse)
+            assert total == page_total == len(expected)
+            if collapse:
+                assert [a['near_duplicates'] for a in by_cursor] == [sizes[a['cluster_id']] - 1 for a in expected]
+                assert any(a['near_duplicates'] for a in by_cursor) or len(expected) == len(matching)
+
+
+def test_headlines_and_images_cursor_walks(client):
+    date = ARTICLES[1]['date']
+    on_date = [article['id'] for article in ARTICLES if article['date'] == date]
+    assert len(on_date) > 3
+    for by_cursor in (True, False):
+        articles, total = walk(client, f'/api/headlines?date={date}&per_page=2', by_cursor)
+        assert [a['id'] for a in articles] == on_date and total == len(on_date)
+
+    with_images = sorted((a for a in ARTICLES if a['image_url']), key=lambda a: (a['date'] or '', a['id']), reverse=True)
+    for url in ('/api/images?per_page=13', f"/api/images?per_page=1&date={with_images[0]['date']}"):
+        expected = [a['id'] for a in with_images if 'date=' not in url or a['date'] == with_images[0]['date']]
+        for by_cursor in (True, False):
+            articles, total = walk(client, url, by_cursor)
+            assert [a['id'] for a in articles] == expected and total == len(expected)
+
+
+def test_invalid_cursors_are_rejected(client):
+    missing = 'OTk5OTk'  # a well-formed cursor for id 99999, which is not in the dataset
+    for url in ('/api/search?q=غزة', '/api/headlines?date=2024-01-01', '/api/images?per_page=5'):
+        for cursor in ('not-a-cursor', missing):
+            response = client.get(f'{url}&cursor={cursor}')
+            assert response.status_code == 400 and 'cursor' in response.get_json()['error']
+
+
+def test_dataset_is_reloaded_when_the_file_changes(client, app_module, monkeypatch):
+    analyzer = app_module.analyzer
+    monkeypatch.setattr(app_module, 'DATASET_CHECK_INTERVAL', 0)
+
+    def settle(url):
+        response = client.get(url)  # the request that notices the change starts the reload
+        if analyzer._reload_thread is not None:
+            analyzer._reload_thread.join()
+        return response
+
+    def search_total():
+        return client.get('/api/search?q=غزة').get_json()['total']
+
+    original = analyzer.store
+    assert search_total() == len(ARTICLES)
+    invalidations = client.get('/api/admin/search-cache').get_json()['invalidations']
+    try:
+        write_dataset(Path('articles_combined.json'), ARTICLES + make_articles(40, start_id=601))
+        settle('/api/statistics')
+        assert len(analyzer.store) == 640 and search_total() == 640
+        assert client.get('/api/admin/search-cache').get_json()['invalidations'] == invalidations + 1
+        info = client.get('/api/admin/dataset').get_json()
+        assert info['version'] == info['file_version'] and info['articles'] == 640
+
+        Path('articles_combined.json').write_text('[{"id": 1,', encoding='utf-8')
+        settle('/api/statistics')
+        assert len(analyzer.store) == 640 and analyzer.last_reload_error
+        assert not analyzer.check_for_update()  # the broken version is not retried
+    finally:
+        write_dataset(Path('articles_combined.json'), ARTICLES)
+        analyzer.reload()
+    assert analyzer.store.to_records() == original.to_records() and search_total() == len(ARTICLES)
+
+
+def read_events(response):
+    """The JSON payloads of a server-sent event stream, up to its end"""
+    return [json.loads(line[len('data: '):]) for line in response.get_data(as_text=True).splitlines()
+            if line.startswith('data: ')]
+
+
+@pytest.fixture
+def gated_fetch(app_module, monkeypatch):
+    """Article content fetches that block until the gate opens (or the job is cancelled)"""
+    gate = threading.Event()
+
+    def fetch(article, cancel_event=None):
+        while not gate.wait(0.01):
+            app_module.check_cancelled(cancel_event)
+        return 'نص المقال'
+
+    monkeypatch.setattr(app_module, 'fetch_article_content_formatted', fetch)
+    return gate
+
+
+def job_status(app_module, job_id, timeout=5):
+    """Status of a job once it finished (or 'processing' if it is still running after timeout)"""
+    deadline = time.monotonic() + timeout
+    while app_module.progress_tracker[job_id]['status'] == 'processing' and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return app_module.progress_tracker[job_id]['status']
+
+
+def start_headline_export(client):
+    response = client.post('/api/export/headline-only/start', json={'date': ARTICLES[1]['date']})
+    assert response.status_code == 200
+    return response.get_json()['job_id']
+
+
+def test_export_job_runs_to_a_download(client, app_module, gated_fetch):
+    job_id = start_headline_export(client)
+    gated_fetch.set()
+    events = read_events(client.get(f'/api/export/headline-only/progress/{job_id}'))
+    assert events[-1]['status'] == 'completed' and events[-1]['download_url'].endswith(job_id)
+    percentages = [event['percentage'] for event in events]
+    assert percentages == sorted(percentages) and percentages[-1] == 100
+
+    filepath = Path(app_module.progress_tracker[job_id]['filepath'])
+    assert (filepath.parent / UNCLAIMED_MARKER).exists()
+    response = client.get(events[-1]['download_url'])
+    assert response.status_code == 200 and response.get_data()[:2] == b'PK'
+    response.close()
+    assert not (filepath.parent / UNCLAIMED_MARKER).exists()
+    assert client.post(f'/api/export/headline-only/cancel/{job_id}').status_code == 404  # already finished
+
+
+def test_synchronous_exports_are_held_until_the_response_is_closed(client, app_module, gated_fetch, monkeypatch):
+    gated_fetch.set()
+    created = []
+    create = app_module.create_headline_only_document
+    monkeypatch.setattr(app_module, 'create_headline_only_document',
+                        lambda date: created.append(create(date)) or created[-1])
+    response = client.get(f"/api/export/headline-only?date={ARTICLES[1]['date']}", buffered=False)
+    assert response.status_code == 200
+    marker = created[0][0].parent / UNCLAIMED_MARKER
+    assert marker.exists()  # a size-based sweep may not evict it mid-download
+    assert response.get_data()[:2] == b'PK'
+    response.close()
+    assert not marker.exists()
+
+
+def test_cancel_stops_an_export_job(client, app_module, gated_fetch):
+    job_id = start_headline_export(client)
+    assert client.post(f'/api/export/word/cancel/{job_id}').get_json()['status'] == 'cancelling'
+    assert job_status(app_module, job_id) == 'cancelled'
+    events = read_events(client.get(f'/api/export/headline-only/progress/{job_id}'))
+    assert events[-1]['status'] == 'cancelled'
+    assert client.get(f'/api/export/headline-only/download/{job_id}').status_code == 404
+    assert client.post('/api/export/word/cancel/no-such-job').status_code == 404
+
+
+def test_closing_the_progress_stream_does_not_cancel_the_job(client, app_module, gated_fetch, monkeypatch):
+    monkeypatch.setattr(app_module, 'JOB_ABANDON_GRACE_SECONDS', 0.3)
+
+    def open_and_close_stream(job_id):
+        response = client.get(f'/api/export/headline-only/progress/{job_id}', buffered=False)
+        assert json.loads(next(iter(response.response)).decode('utf-8')[len('data: '):])['status'] == 'processing'
+        response.close()
+
+    # A client that reconnects within the grace period keeps the job running
+    job_id = start_headline_export(client)
+    open_and_close_stream(job_id)
+    assert app_module.progress_tracker[job_id]['status'] == 'processing'
+    response = client.get(f'/api/export/headline-only/progress/{job_id}', buffered=False)
+    stream = iter(response.response)
+    next(stream)
+    time.sleep(0.6)  # twice the grace period
+    assert app_module.progress_tracker[job_id]['status'] == 'processing'
+    gated_fetch.set()
+    events = [json.loads(chunk.decode('utf-8')[len('data: '):]) for chunk in stream]
+    response.close()
+    assert events[-1]['status'] == 'completed'
+
+    # A job nobody watches any more is cancelled once the grace period is over
+    gated_fetch.clear()
+    job_id = start_headline_export(client)
+    open_and_close_stream(job_id)
+    assert job_status(app_module, job_id) == 'cancelled'
+    assert read_events(client.get(f'/api/export/headline-only/progress/{job_id}'))[-1]['status'] == 'cancelled'
+
+
+def test_image_download_job_matches_the_deprecated_synchronous_route(client, app_module, monkeypatch):
+    date = ARTICLES[1]['date']
+    with_images = [a for a in ARTICLES if a['date'] == date and a['image_url']]
+    failing = with_images[0]['image_url']
+    fetched = []
+
+    def download_bytes(url, cancel_event=None, **kwargs):
+        app_module.check_cancelled(cancel_event)
+        fetched.append(url)
+        if url == failing:
+            raise app_module.requests.HTTPError('404 Client Error')
+        return f'image:{url}'.encode('utf-8')
+
+    monkeypatch.setattr(app_module, 'download_bytes', download_bytes)
+    response = client.post('/api/tools/download-images', json={'date': date})
+    assert response.headers['Deprecation'] == 'true'
+    data = response.get_json()
+    assert (data['requested'], data['downloaded'], data['skipped'], data['errors'], data['truncated']) == \
+        (len(with_images), len(with_images) - 1, 0, 1, False)
+
+    # The job gives the same summary; the stored images now count as skipped
+    response = client.post('/api/tools/download-images/start', json={'date': date, 'archive': True})
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert job_status(app_module, job_id) == 'completed'
+    data = client.get(f'/api/tools/download-images/result/{job_id}').get_json()
+    assert (data['result']['requested'], data['result']['downloaded'], data['result']['skipped'],
+            data['result']['errors']) == (len(with_images), 0, len(with_images) - 1, 1)
+    assert data['stats']['processed'] == len(with_images)
+    assert fetched.count(failing) == 2 and len(fetched) == len(with_images) + 1
+
+    archive = client.get(f'/api/tools/download-images/download/{job_id}')
+    names = zipfile.ZipFile(io.BytesIO(archive.get_data())).namelist()
+    assert sorted(name.split('_')[0] for name in names) == sorted(f"{date}/{a['id']}" for a in with_images[1:])
+    assert client.get('/api/tools/download-images/result/no-such-job').status_code == 404
+
+    # The deprecated route stops after a small batch of image requests
+    monkeypatch.setattr(app_module, 'SYNC_DOWNLOAD_MAX_FETCHES', 2)
+    fetched.clear()
+    data = client.post('/api/tools/download-images', json={'date': date, 'force': True}).get_json()
+    assert len(with_images) > 2 and len(fetched) == 2 and data['truncated']
+
+
+def test_deleted_image_blobs_are_fetched_again_on_read(app_module, monkeypatch):
+    article = dict(ARTICLES[3], image_url='https://example.com/img/reread.jpg')
+    fetched = []
+    monkeypatch.setattr(app_module, 'download_bytes',
+                        lambda url, cancel_event=None, **kwargs: fetched.append(url) or b'image bytes')
+    assert app_module.read_image_bytes(article) == b'image bytes'
+    app_module.image_store.lookup(article['image_url']).unlink()
+    assert app_module.read_image_bytes(article) == b'image bytes'
+    assert app_module.image_store.lookup(article['image_url']).read_bytes() == b'image bytes'
+    assert fetched == [article['image_url']] * 2
+
+
+def test_progress_stream_of_an_unknown_job_ends_with_an_error(client):
+    # An EventSource that reconnects after the job expired must get a terminal event to close on
+    events = read_events(client.get('/api/export/word/progress/no-such-job'))
+    assert [event['status'] for event in events] == ['error'] and events[0]['error']
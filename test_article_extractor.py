@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the article extractor"""
+
+import json
+
+from article_extractor import DateExtractor, extract_articles, extract_articles_to_jsonl, iter_articles, parse_date
+
+CARDS = [
+    # Published On text, image, entities and extra whitespace
+    '''<article class="gc u-clickable-card gc--with-image">
+  <div class="gc__image-wrap"><img class="gc__image" src="/img/1.jpg" alt=""></div>
+  <h3 class="gc__title"><a href="/news/2024/5/6/one"><span>غزة &amp; القدس:
+     عنوان   أول</span></a></h3>
+  <div class="gc__excerpt"><p>مقتطف <b>أول</b></p><p>فقرة ثانية</p></div>
+  <footer><span class="screen-reader-text">Published On 6/5/2024</span></footer>
+</article>''',
+    # <time> element, video type, an unclosed <p> inside the excerpt
+    '''<article class="gc gc--type-video">
+  <h3 class="gc__title"><a href="/video/two"><span>فيديو من رفح</span></a></h3>
+  <div class="gc__excerpt"><p>مقتطف الفيديو</div>
+  <time datetime="2024-05-07">7 مايو</time>
+</article>''',
+    # Date from the link, liveblog
+    '''<article class="gc gc--type-liveblog">
+  <h3 class="gc__title"><a href="/liveblog/2024/5/8/three"><span>تغطية مباشرة</span></a></h3>
+  <span class="screen-reader-text">شارك</span>
+</article>''',
+    # Date found in the article text only, episode, no excerpt
+    '''<article class="gc gc--type-episode">
+  <h3 class="gc__title"><a href="/program/four"><span>حلقة</span></a></h3>
+  <div class="gc__date">بث في 09-05-2024</div>
+</article>''',
+    # No date at all
+    '''<article class="gc">
+  <h3 class="gc__title"><a href="/news/five"><span>بدون تاريخ</span></a></h3>
+</article>''',
+    # Skipped: no title
+    '''<article class="gc"><h3 class="gc__title"><a href="/news/six"></a></h3></article>''',
+    # Not an article card
+    '''<article class="featured"><h3 class="gc__title"><a href="/x"><span>ليس بطاقة</span></a></h3></article>''',
+]
+
+
+def write_page(path, cards):
+    path.write_text('<html><body><main>\n' + '\n'.join(cards) + '\n</main></body></html>', encoding='utf-8')
+    return path
+
+
+def test_streaming_matches_the_beautifulsoup_extractor(tmp_path):
+    page = write_page(tmp_path / 'page.html', CARDS * 40)
+    expected = extract_articles(str(page))
+    assert len(expected) == 5 * 40
+
+    for chunk_size in (7, 1024 * 1024):
+        streamed = list(iter_articles(str(page), chunk_size=chunk_size))
+        assert [article['id'] for article in streamed] == sorted(article['id'] for article in expected)
+        assert sorted(streamed, key=lambda article: article['id']) == \
+            sorted(expected, key=lambda article: article['id'])
+
+    first = streamed[0]
+    assert first['title'] == 'غزة & القدس: عنوان أول' and first['excerpt'] == 'مقتطف أول'
+    assert [article['type'] for article in streamed[:4]] == ['post', 'video', 'liveblog', 'episode']
+    assert [article['date'] for article in streamed[:5]] == ['2024-05-06', '2024-05-07', '2024-05-08', '2024-05-09', None]
+
+
+def test_jsonl_output_is_in_page_order(tmp_path):
+    page = write_page(tmp_path / 'page.html', CARDS * 3)
+    output = tmp_path / 'articles.jsonl'
+    assert extract_articles_to_jsonl(str(page), str(output)) == 15
+    with open(output, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records == list(iter_articles(str(page)))
+
+
+def test_parse_date_formats():
+    cases = {
+        'Published On 6/5/2024': '2024-05-06',
+        'Published On 2024-07-16': '2024-07-16',
+        'Published On 16-7-2024': '2024-07-16',
+        'Published On 2024/7/16': '2024-07-16',
+        'Published On 31/2/2024 2024-03-01': '2024-03-01',  # an invalid match falls through to the next format
+        'Published On 12 May 2024': None,
+        '': None,
+        None: None,
+    }
+    for date_text, date in cases.items():
+        assert parse_date(date_text) == date, date_text
+
+
+def test_date_extractor_caches_parse_date_and_runs_lookups_lazily():
+    dates = DateExtractor()
+    calls = []
+
+    def lookup(name, value):
+        return lambda: calls.append(name) or value
+
+    def extract(screen_reader, time, link, text):
+        calls.clear()
+        result = dates.extract(lookup('screen_reader', screen_reader), lookup('time', time), link, lookup('text', text))
+        return result, list(calls)
+
+    assert extract('Published On 6/5/2024', '2024-05-07', '/news/2024/5/8/x', '') == \
+        (('Published On 6/5/2024', '2024-05-06'), ['screen_reader'])
+    assert extract('شارك', '', '/news/2024/5/8/x', '') == \
+        (('Published On 8/5/2024', '2024-05-08'), ['screen_reader', 'time'])
+    assert extract(None, '', '/news/x', 'نص 09-05-2024') == \
+        (('Published On 09-05-2024', '2024-05-09'), ['screen_reader', 'time', 'text'])
+    assert extract(None, '2024-05-07', '', '') == (('Published On 2024-05-07', '2024-05-07'), ['screen_reader', 'time'])
+    assert extract('Published On 6/5/2024', '', '', '') == (('Published On 6/5/2024', '2024-05-06'), ['screen_reader'])
+    assert extract(None, '', '', 'بدون تاريخ') == (('', None), ['screen_reader', 'time', 'text'])
+
+    assert dates.strategy_counts == {'screen_reader': 2, 'time': 1, 'url': 1, 'text': 1, 'none': 1}
+    assert dates.cache_hits == 1
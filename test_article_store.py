@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the columnar article store and its binary snapshot"""
+
+import json
+import multiprocessing
+import os
+
+import article_store
+from article_store import ArticleStore, load_snapshot, load_store, save_snapshot, snapshot_path_for
+
+TYPES = ('post', 'video', 'liveblog', 'episode')
+
+
+def make_articles(count, start_id=1):
+    articles = []
+    for i in range(count):
+        day = 1 + i % 28
+        articles.append({
+            'id': start_id + i,
+            'title': f"غزة عنوان {i % 7} رقم {i}",
+            'excerpt': f"مقتطف عن القدس {i % 5}" if i % 3 else '',
+            'link': f"https://example.com/news/{start_id + i}",
+            'date': f"2024-{1 + i % 12:02d}-{day:02d}" if i % 11 else None,
+            'date_text': f"{day} يناير" if i % 11 else None,
+            'image_url': f"https://example.com/img/{i}.jpg" if i % 2 else '',
+            'type': TYPES[i % len(TYPES)],
+            'source': f"articles_data_{1 + i % 3}.json",
+            'cluster_id': start_id + i - (i % 4 == 1)
+        })
+    return articles
+
+
+def write_dataset(path, articles):
+    path.write_text(json.dumps(articles, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+def test_snapshot_round_trip(tmp_path):
+    articles = make_articles(200)
+    store = ArticleStore.from_records(articles)
+    loaded = load_snapshot(save_snapshot(store, tmp_path / 'articles.snapshot'))
+    assert loaded.to_records() == store.to_records()
+    assert loaded.indexes().keys() == store.indexes().keys()
+    for name, values in store.indexes().items():
+        assert list(loaded.indexes()[name]) == list(values), name
+    assert list(loaded.search_rows('غزة عنوان 3')) == list(store.search_rows('غزة عنوان 3'))
+    assert loaded.timeline('week') == store.timeline('week')
+
+
+def test_stale_snapshot_is_rebuilt_from_json(tmp_path):
+    json_path = write_dataset(tmp_path / 'articles.json', make_articles(50))
+    assert len(load_store(json_path, write_snapshot=True)) == 50
+    assert snapshot_path_for(json_path).exists()
+
+    write_dataset(json_path, make_articles(60))
+    assert len(load_store(json_path)) == 60  # stale snapshot is ignored
+    assert len(load_store(json_path, write_snapshot=True)) == 60
+    assert len(load_snapshot(snapshot_path_for(json_path))) == 60
+
+
+def _load_in_worker(json_path, log_path):
+    save = article_store.save_snapshot
+
+    def logged_save(*args, **kwargs):
+        with open(log_path, 'a') as log:
+            log.write(f"{os.getpid()}\n")
+        return save(*args, **kwargs)
+
+    article_store.save_snapshot = logged_save
+    return len(load_store(json_path, write_snapshot=True))
+
+
+def test_one_worker_writes_the_snapshot(tmp_path):
+    json_path = write_dataset(tmp_path / 'articles.json', make_articles(3000))
+    log_path = tmp_path / 'writers.log'
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        sizes = pool.starmap(_load_in_worker, [(json_path, log_path)] * 4)
+    assert sizes == [3000] * 4
+    assert len(log_path.read_text().split()) == 1
+
+
+def assert_same_store(actual, expected):
+    assert actual.to_records() == expected.to_records()
+    for field in article_store.CATEGORICAL_FIELDS:
+        assert actual.column(field).categories == expected.column(field).categories, field
+        assert list(actual.column(field).codes) == list(expected.column(field).codes), field
+    for name, values in expected.indexes().items():
+        assert list(actual.indexes()[name]) == list(values), name
+    for table_name in article_store.TERM_TABLES:
+        assert [list(part) for part in getattr(actual.terms, table_name).arrays()] == \
+               [list(part) for part in getattr(expected.terms, table_name).arrays()], table_name
+
+
+def extend_cases():
+    base = make_articles(300)
+    later = make_articles(40, start_id=301)
+    for article in later:
+        if article['date']:
+            article['date'] = '2025' + article['date'][4:]  # newer than every stored date
+    backfill = make_articles(40, start_id=301)
+    backfill[0]['date'] = '2023-06-01'  # sorts before the stored dates
+    backfill[1]['type'] = 'podcast'      # new category
+    gaps = make_articles(40, start_id=1000)  # ids no longer 1..N
+    return {'later': (base, later), 'backfill': (base, backfill), 'gaps': (base, gaps)}
+
+
+def test_extended_matches_a_full_build(tmp_path):
+    for name, (base, added) in extend_cases().items():
+        expected = ArticleStore.from_records(base + added)
+        store = ArticleStore.from_records(base)
+        store.terms  # noqa: B018 - extended incrementally when already built
+        assert_same_store(store.extended(added), expected)
+
+        # Snapshot-backed columns (memoryviews) extend the same way
+        snapshot = load_snapshot(save_snapshot(ArticleStore.from_records(base), tmp_path / f'{name}.snapshot'))
+        assert_same_store(snapshot.extended(added), expected)
+
+
+def _matches(article, query='', search_type='all', content_type='all', date_from=None, date_to=None):
+    query = query.lower()
+    if content_type != 'all' and article['type'] != content_type:
+        return False
+    date = article['date'] or ''
+    if (date_from and date < date_from) or (date_to and date > date_to):
+        return False
+    if not query:
+        return True
+    return (search_type != 'excerpt' and query in article['title'].lower()) or \
+        (search_type != 'title' and query in (article['excerpt'] or '').lower())
+
+
+def test_queries_match_a_rescan_of_the_records():
+    articles = make_articles(500)
+    articles[3]['title'] = 'GAZA Update'
+    store = ArticleStore.from_records(articles)
+    searches = [
+        ('غزة عنوان 3',), ('القدس 2', 'excerpt'), ('رقم 1', 'title', 'video'), ('gaza',),
+        ('', 'all', 'liveblog'), ('', 'all', 'all', '2024-03-01', '2024-06-15'),
+        ('القدس', 'all', 'post', None, '2024-02-10'), ('', 'all', 'podcast'), ('لا يوجد',)
+    ]
+    for search in searches:
+        expected = [row for row, article in enumerate(articles) if _matches(article, *search)]
+        assert list(store.search_rows(*search)) == expected, search
+        matches = store.row_matcher(*search)
+        assert [row for row in range(len(store)) if matches(row)] == expected, search
+
+    for date in ('2024-01-01', '2024-05-17', '2023-01-01'):
+        assert list(store.rows_on_date(date)) == \
+            [row for row, article in enumerate(articles) if article['date'] == date]
+
+    with_images = [row for row, article in enumerate(articles) if article['image_url']]
+    newest_first = sorted(with_images, key=lambda row: (articles[row]['date'] or '', articles[row]['id']), reverse=True)
+    assert list(store.image_rows()) == newest_first
+    assert list(store.image_rows('2024-04-04')) == [row for row in newest_first if articles[row]['date'] == '2024-04-04']
+
+    for content_type in ('all', 'episode'):
+        days = {}
+        for article in articles:
+            if article['date'] and content_type in ('all', article['type']):
+                days[article['date']] = days.get(article['date'], 0) + 1
+        assert store.daily_counts(content_type) == sorted(days.items())
+    months = {}
+    for article in articles:
+        if article['date'] and _matches(article, 'غزة عنوان 2'):
+            months[article['date'][:7]] = months.get(article['date'][:7], 0) + 1
+    assert store.timeline('month', query='غزة عنوان 2') == sorted(months.items())
+
+
+def test_keyword_matrix_matches_a_rescan():
+    articles = make_articles(400)
+    store = ArticleStore.from_records(articles)
+    keywords = ['عنوان 3', 'القدس 1', 'رقم 1', 'غائب']
+
+    def contains(article, keyword):  # case-sensitive, like count_containing
+        return keyword in article['title'] or keyword in (article['excerpt'] or '')
+
+    for content_type, date_from, date_to in (('all', None, None), ('video', None, None), ('all', '2024-03-10', '2024-08-20')):
+        selected = [a for a in articles if _matches(a, '', 'all', content_type, date_from, date_to)]
+        months = sorted({a['date'][:7] for a in articles if a['date']
+                         and (not date_from or a['date'][:7] >= date_from[:7])
+                         and (not date_to or a['date'][:7] <= date_to[:7])})
+        matrix = store.keyword_matrix(keywords, content_type, date_from, date_to)
+        assert matrix['months'] == months
+        assert matrix['totals'] == [sum(contains(a, k) for a in selected) for k in keywords]
+        assert matrix['by_month'] == [
+            [sum(contains(a, k) for a in selected if (a['date'] or '')[:7] == month) for month in months]
+            for k in keywords]
+        assert matrix['cooccurrence'] == [
+            [sum(contains(a, first) and contains(a, second) for a in selected) for second in keywords]
+            for first in keywords]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the export artifact manager"""
+
+import os
+import time
+
+from artifacts import ArtifactManager
+
+
+def manual_manager(tmp_path, **kwargs):
+    """A manager whose sweeps only run when the test calls sweep()"""
+    manager = ArtifactManager(tmp_path, **kwargs)
+    manager.start_gc = lambda: None  # the GC thread's first sweep would race the test's own
+    return manager
+
+
+def write_artifact(manager, name, size, age=0, hold=False):
+    path = manager.write(name, lambda part: part.write_bytes(b'x' * size))
+    if hold:
+        manager.hold(path)
+    if age:
+        stamp = time.time() - age
+        for child in path.parent.iterdir():
+            os.utime(child, (stamp, stamp))
+        os.utime(path.parent, (stamp, stamp))
+    return path
+
+
+def test_unclaimed_artifacts_are_not_evicted_for_size(tmp_path):
+    manager = manual_manager(tmp_path, ttl_seconds=3600, max_bytes=100)
+    unclaimed = write_artifact(manager, 'old.csv', 80, age=60, hold=True)
+    newer = write_artifact(manager, 'new.csv', 80, age=30)
+
+    result = manager.sweep()
+    assert unclaimed.exists()
+    assert not newer.exists() and result['evicted'] == 1
+
+
+def test_released_artifacts_are_evicted_oldest_first(tmp_path):
+    manager = manual_manager(tmp_path, ttl_seconds=3600, max_bytes=100)
+    old = write_artifact(manager, 'old.csv', 80, age=60, hold=True)
+    new = write_artifact(manager, 'new.csv', 80, age=30, hold=True)
+    assert manager.sweep()['evicted'] == 0
+
+    manager.release(old)
+    manager.sweep()
+    assert not old.exists() and new.exists()
+
+
+def test_unclaimed_artifacts_still_expire(tmp_path):
+    manager = manual_manager(tmp_path, ttl_seconds=10, max_bytes=1000)
+    path = write_artifact(manager, 'report.docx', 10, age=60, hold=True)
+    assert manager.sweep()['expired'] == 1
+    assert not path.parent.exists()
+
+
+def test_gc_thread_restarts_in_a_forked_process(tmp_path):
+    manager = ArtifactManager(tmp_path, sweep_interval=3600)
+    manager.start_gc()
+    thread = manager._gc_thread
+    manager.start_gc()
+    assert manager._gc_thread is thread
+
+    manager._gc_pid = -1  # as seen from a worker forked after the thread started
+    manager.allocate('report.csv')
+    assert manager._gc_thread is not thread and manager._gc_thread.is_alive()
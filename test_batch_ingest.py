@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the parallel batch ingestion of captures"""
+
+import json
+
+from batch_ingest import run_batch
+
+PAGE = '''<html><body>
+<article class="gc u-clickable-card">
+  <h3 class="gc__title"><a href="/news/2024/5/{day}/{slug}"><span>{title}</span></a></h3>
+  <div class="gc__excerpt"><p>مقتطف</p></div>
+  <div class="gc__date"><span class="screen-reader-text">Published On {day} May 2024</span></div>
+</article>
+</body></html>'''
+
+
+def write_capture(path, title, slug, day):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(PAGE.format(title=title, slug=slug, day=day), encoding='utf-8')
+    return path
+
+
+def test_captures_with_the_same_name_do_not_collide(tmp_path):
+    captures = [
+        write_capture(tmp_path / 'monday' / 'page.html', 'عنوان الاثنين', 'monday', 6),
+        write_capture(tmp_path / 'tuesday' / 'page.html', 'عنوان الثلاثاء', 'tuesday', 7),
+    ]
+    batch_files = run_batch(captures, str(tmp_path / 'work'), workers=2, extract_only=True)
+
+    assert len(set(batch_files)) == 2
+    titles = set()
+    for batch_file in batch_files:
+        with open(batch_file, encoding='utf-8') as f:
+            titles.update(json.loads(line)['title'] for line in f)
+    assert titles == {'عنوان الاثنين', 'عنوان الثلاثاء'}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the combine/ingest pipeline"""
+
+import json
+import threading
+
+import pytest
+
+import combine_and_deduplicate as combine
+from article_store import load_store
+from test_article_store import make_articles
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def write_json(path, articles):
+    path.write_text(json.dumps(articles, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_rebuilt_key_index_matches_article_keys(workdir):
+    articles = make_articles(20)
+    articles[3]['title'] = None
+    articles[4]['link'] = None
+    combined = write_json(workdir / combine.COMBINED_FILE, articles)
+
+    # No key index yet: ingest rebuilds it from the store, where null text reads as ''
+    batch = write_json(workdir / 'batch.json', [dict(articles[3]), dict(articles[4])])
+    combine.ingest([batch], combined)
+    assert len(load_store(combined)) == 20
+    assert combine.load_key_index()[combine.article_key(articles[3])] == articles[3]['id']
+
+
+def test_ingest_extends_like_a_full_combine(workdir, monkeypatch):
+    from near_duplicates import NearDuplicateIndex, assign_clusters
+    from test_near_duplicates import make_articles as make_stories
+
+    stories = make_stories(400)
+    for story in stories:
+        story.update(link=f"https://example.com/{story['id']}", date=f"2024-05-{1 + story['id'] % 28:02d}",
+                     type='post')
+    inputs = [{key: value for key, value in story.items() if key != 'id'} for story in stories]
+    write_json(workdir / 'articles_data_1.json', inputs[:300])
+    combine.combine_all()
+
+    signed = []
+    signature = NearDuplicateIndex.signature
+    monkeypatch.setattr(NearDuplicateIndex, 'signature', lambda self, text: signed.append(text) or signature(self, text))
+    combine.ingest([write_json(workdir / 'batch.json', inputs[300:])])
+    assert len(signed) == 100  # only the new articles are signed
+
+    expected = [dict(story) for story in stories]
+    full_index = assign_clusters(expected)
+    store = load_store(combine.COMBINED_FILE)
+    assert store._near_duplicates is not None  # saved in the snapshot
+    assert list(store.cluster_ids) == [story['cluster_id'] for story in expected]
+    assert store.near_duplicates.arrays() == full_index.arrays()
+
+
+def test_ingest_re_signs_improved_articles(workdir):
+    from near_duplicates import NearDuplicateIndex
+
+    articles = make_articles(50)
+    for article in articles:
+        del article['id'], article['cluster_id']
+    write_json(workdir / 'articles_data_1.json', articles)
+    combine.combine_all()
+
+    improved = dict(articles[7], excerpt='مقتطف أطول بكثير عن قصف مستشفى في خان يونس')
+    combine.ingest([write_json(workdir / 'batch.json', [improved] + make_articles(5, start_id=500))])
+
+    store = load_store(combine.COMBINED_FILE)
+    assert len(store) == 55 and store.excerpt[7] == improved['excerpt']
+    rebuilt = NearDuplicateIndex()
+    for row in range(len(store)):
+        rebuilt.add(store.ids[row], f"{store.title[row]} {store.excerpt[row]}", cluster_id=store.cluster_ids[row])
+    assert store.near_duplicates.arrays() == rebuilt.arrays()
+
+
+def test_overlapping_ingests_keep_ids_unique(workdir, monkeypatch):
+    articles = make_articles(30)
+    for article in articles:
+        del article['id'], article['cluster_id']
+    write_json(workdir / 'articles_data_1.json', articles)
+    combine.combine_all()
+    batches = [write_json(workdir / f'batch_{n}.json', make_articles(5, start_id=start))
+               for n, start in enumerate((500, 600))]
+
+    # The first ingest stops after reading the dataset; the second starts from
+    # that same state unless it has to wait until the first one has written
+    first_read, gate = threading.Event(), threading.Event()
+    assign_clusters = combine.assign_clusters
+
+    def paused_assign_clusters(added, index):
+        if not first_read.is_set():
+            first_read.set()
+            gate.wait(5)
+        return assign_clusters(added, index)
+
+    monkeypatch.setattr(combine, 'assign_clusters', paused_assign_clusters)
+    threads = [threading.Thread(target=combine.ingest, args=([batch],)) for batch in batches]
+    threads[0].start()
+    assert first_read.wait(5)
+    threads[1].start()
+    threads[1].join(0.3)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    store = load_store(combine.COMBINED_FILE)
+    assert len(store) == 40 and len(set(store.ids)) == 40
+    assert sorted(combine.load_key_index().values()) == sorted(store.ids)
+
+
+def test_dedup_engine_keeps_the_same_articles_as_the_quadratic_merge():
+    articles = make_articles(120)
+    for article in articles:
+        del article['id'], article['cluster_id']
+    copies = []
+    for i, article in enumerate(articles[:60]):
+        copy = dict(article, source='articles_data_9.json')
+        if i % 3 == 0:
+            copy['excerpt'] += ' مع تفاصيل إضافية'
+        elif i % 3 == 1:
+            copy['date'] = None
+        copies.append(copy)
+    inputs = articles + copies[::-1] + [dict(articles[5], excerpt='')]
+
+    # The original merge: replacements move to the end of the list
+    seen, expected = {}, []
+    for article in inputs:
+        key = combine.article_key(article)
+        existing = seen.get(key)
+        if existing is None:
+            seen[key] = article
+            expected.append(article)
+        elif combine.replacement_reason(article, existing):
+            seen[key] = article
+            expected = [kept for kept in expected if kept is not existing] + [article]
+
+    engine = combine.DedupEngine()
+    decisions = [engine.add(article) for article in inputs]
+    unique = engine.unique_articles()
+    assert sorted(map(id, unique)) == sorted(map(id, expected))
+    assert [combine.article_key(article) for article in unique] == \
+        [combine.article_key(article) for article in articles]  # replacements keep their position
+    assert decisions.count('new') == 120
+    assert engine.decisions['replaced_missing_date'] + engine.decisions['replaced_longer_excerpt'] == \
+        sum(1 for article in unique if article.get('source') == 'articles_data_9.json')
+
+
+def test_streamed_json_array_matches_json_load(workdir):
+    articles = make_articles(300)
+    path = write_json(workdir / 'articles.json', articles)
+    assert list(combine.iter_json_array(path, chunk_size=97)) == articles
+    assert list(combine.iter_json_array(write_json(workdir / 'empty.json', []))) == []
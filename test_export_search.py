@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the streaming search export: every format read back equals the records"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from article_store import ARTICLE_FIELDS, ArticleStore
+from export_search import encode_chunks, format_for_path, parquet_available, record_chunks, store_chunks, write_chunks
+from test_article_store import make_articles
+
+
+@pytest.fixture(scope='module')
+def store():
+    articles = make_articles(450)
+    articles[5]['title'] = 'عنوان, مع "فاصلة"\nوسطر جديد'
+    return ArticleStore.from_records(articles)
+
+
+def read_csv(data):
+    assert data.startswith('\ufeff'.encode('utf-8'))  # BOM for Excel
+    reader = csv.reader(io.StringIO(data.decode('utf-8-sig'), newline=''))
+    header = next(reader)
+    return [dict(zip(header, values)) for values in reader]
+
+
+def as_csv_values(record):
+    return {field: '' if value is None else str(value) for field, value in record.items()}
+
+
+def test_chunks_from_the_store_match_the_records(store):
+    rows = list(store.search_rows('غزة', 'all', 'video'))
+    records = store.articles(rows)
+    from_store = list(store_chunks(store, rows, chunk_rows=16))
+    assert from_store == list(record_chunks(records, ARTICLE_FIELDS, chunk_rows=16))
+    sizes = [len(chunk['id']) for chunk in from_store]
+    assert sum(sizes) == len(rows) and set(sizes[:-1]) == {16}
+    assert list(store_chunks(store, [])) == []
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl', 'parquet'])
+def test_exports_round_trip(store, tmp_path, fmt):
+    if fmt == 'parquet' and not parquet_available():
+        pytest.skip('pyarrow is not installed')
+    rows = list(store.search_rows('', 'all', 'all', '2024-02-01', '2024-09-30'))
+    records = store.articles(rows)
+    output = tmp_path / f'export.{fmt}'
+    write_chunks(encode_chunks(store_chunks(store, rows, chunk_rows=64), fmt), str(output))
+    assert not (tmp_path / f'export.{fmt}.part').exists()
+
+    if fmt == 'csv':
+        assert read_csv(output.read_bytes()) == [as_csv_values(record) for record in records]
+    elif fmt == 'jsonl':
+        with open(output, encoding='utf-8') as f:
+            assert [json.loads(line) for line in f] == records
+    else:
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(output)
+        assert parquet.metadata.num_row_groups == -(-len(rows) // 64)
+        assert parquet.read().to_pylist() == records
+
+
+def test_selected_fields_and_empty_exports(store):
+    fields = ('id', 'title', 'date')
+    data = b''.join(encode_chunks(store_chunks(store, [5, 9], fields), 'csv', fields))
+    assert read_csv(data) == [as_csv_values({field: store.article(row)[field] for field in fields}) for row in (5, 9)]
+    assert read_csv(b''.join(encode_chunks([], 'csv'))) == []
+    assert b''.join(encode_chunks([], 'jsonl')) == b''
+    with pytest.raises(ValueError):
+        list(encode_chunks([], 'xlsx'))
+
+
+def test_format_for_path():
+    assert format_for_path('gaza.JSONL') == 'jsonl'
+    assert format_for_path('out/gaza.parquet') == 'parquet'
+    assert format_for_path('gaza.csv') == format_for_path('gaza.txt') == 'csv'
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the content-addressed image store"""
+
+from image_store import ImageStore
+
+
+def fetcher_for(contents):
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        return contents[url]
+    return fetch, calls
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = ImageStore(tmp_path)
+    fetch, calls = fetcher_for({'http://a/1.jpg': b'same', 'http://b/2.jpg': b'same'})
+    first, outcome = store.fetch('http://a/1.jpg', fetcher=fetch)
+    assert outcome == 'downloaded'
+    second, outcome = store.fetch('http://b/2.jpg', fetcher=fetch)
+    assert outcome == 'deduplicated' and second == first
+    assert store.fetch('http://a/1.jpg', fetcher=fetch) == (first, 'cached')
+    assert len(calls) == 2 and len(store) == 1
+
+
+def test_missing_blob_is_downloaded_again(tmp_path):
+    store = ImageStore(tmp_path)
+    fetch, calls = fetcher_for({'http://a/1.jpg': b'image'})
+    path, _ = store.fetch('http://a/1.jpg', fetcher=fetch)
+    path.unlink()
+    assert store.lookup('http://a/1.jpg') == path  # the index alone answers lookups
+    assert store.fetch('http://a/1.jpg', fetcher=fetch) == (path, 'cached') and len(calls) == 1
+
+    # A reader that fails to open the blob makes the store forget it
+    assert store.forget_missing('http://a/1.jpg')
+    assert store.lookup('http://a/1.jpg') is None
+    again, outcome = store.fetch('http://a/1.jpg', fetcher=fetch)
+    assert outcome == 'downloaded' and again == path and path.read_bytes() == b'image'
+    assert len(calls) == 2
+
+
+def test_appends_from_other_stores_are_not_skipped(tmp_path):
+    # Two stores on one directory stand in for two gunicorn workers
+    first, second = ImageStore(tmp_path), ImageStore(tmp_path)
+    first.put('http://a/1.jpg', b'one')
+    second.put('http://a/2.jpg', b'two')
+    first.put('http://a/3.jpg', b'three')
+    second.put('http://a/4.jpg', b'four')
+    urls = {f'http://a/{n}.jpg' for n in range(1, 5)}
+
+    first._refresh_index()
+    second._refresh_index()
+    assert set(first._url_to_blob) == set(second._url_to_blob) == urls
+    assert set(ImageStore(tmp_path)._url_to_blob) == urls
+    assert first._index_offset == second._index_offset == (tmp_path / 'index.jsonl').stat().st_size
+
+
+def test_lookup_does_not_touch_the_disk(tmp_path, monkeypatch):
+    store = ImageStore(tmp_path)
+    path, _ = store.put('http://a/1.jpg', b'image')
+    stats = []
+    monkeypatch.setattr('pathlib.Path.stat', lambda self, **kwargs: stats.append(self))
+    assert store.lookup('http://a/1.jpg') == path and store.lookup('http://a/2.jpg') is None
+    assert stats == []
+
+
+def test_readable_blobs_are_not_forgotten(tmp_path):
+    store = ImageStore(tmp_path)
+    path, _ = store.put('http://a/1.jpg', b'image')
+    assert not store.forget_missing('http://a/1.jpg') and not store.forget_missing('http://a/2.jpg')
+    assert store.lookup('http://a/1.jpg') == path
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the streaming MHTML converter"""
+
+import email
+from email import encoders, policy
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pytest
+
+from mhtml_to_html_converter import extract_html_from_mhtml
+
+LOCATION = 'https://www.aljazeera.net/where/mideast/palestine/'
+
+PAGE = ''.join(
+    f'<article class="gc"><h3 class="gc__title"><a href="/news/{i}"><span>غزة: عنوان طويل رقم {i} '
+    f'مع نص = و "اقتباس" ' + 'ـ' * (i % 90) + '</span></a></h3>\n'
+    f'<div class="gc__excerpt"><p>\tمقتطف {i}  </p></div></article>\n'
+    for i in range(300)
+)
+
+
+def write_mhtml(path, html, encoding, linesep):
+    archive = MIMEMultipart('related', type='text/html')
+    archive['Subject'] = 'Palestine'
+    other = MIMEText('<html>other page</html>', 'html', 'utf-8')
+    other['Content-Location'] = 'https://www.aljazeera.net/other'
+    archive.attach(other)
+    page = MIMEText(html, 'html', 'utf-8')
+    del page['Content-Transfer-Encoding']
+    page.set_payload(html.encode('utf-8'))
+    if encoding == 'base64':
+        encoders.encode_base64(page)
+    else:
+        encoders.encode_quopri(page)  # soft line breaks and =XX escapes
+    page['Content-Location'] = LOCATION
+    archive.attach(page)
+    image = MIMEBase('image', 'png')
+    image.set_payload(bytes(range(256)) * 4)
+    encoders.encode_base64(image)
+    archive.attach(image)
+    path.write_bytes(archive.as_bytes(policy=policy.compat32.clone(linesep=linesep)))
+    return path
+
+
+@pytest.mark.parametrize('encoding', ['quoted-printable', 'base64'])
+@pytest.mark.parametrize('linesep', ['\n', '\r\n'])
+def test_html_part_matches_the_email_parser(tmp_path, encoding, linesep):
+    mhtml = write_mhtml(tmp_path / 'page.mhtml', PAGE, encoding, linesep)
+    output = tmp_path / 'page.html'
+    assert extract_html_from_mhtml(str(mhtml), str(output))
+
+    message = email.message_from_bytes(mhtml.read_bytes())
+    part = next(part for part in message.walk() if part['Content-Location'] == LOCATION)
+    expected = part.get_payload(decode=True).decode('utf-8').replace('\r\n', '\n')
+    assert output.read_text(encoding='utf-8') == expected
+    assert expected.rstrip('\n') == PAGE.rstrip('\n')
+
+
+def test_missing_html_part(tmp_path):
+    mhtml = write_mhtml(tmp_path / 'page.mhtml', PAGE, 'base64', '\n')
+    output = tmp_path / 'page.html'
+    assert not extract_html_from_mhtml(str(mhtml), str(output), r'https://example\.com/')
+    assert not output.exists()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for MinHash/LSH near-duplicate clustering"""
+
+import random
+
+from near_duplicates import NearDuplicateIndex, assign_clusters, cluster_summary
+
+WORDS = ('غزة', 'القدس', 'قصف', 'مستشفى', 'الاحتلال', 'شهداء', 'مساعدات', 'معبر', 'رفح', 'خان', 'يونس',
+         'الضفة', 'جنين', 'نابلس', 'اقتحام', 'مخيم', 'حصار', 'وقف', 'إطلاق', 'النار', 'مفاوضات', 'الأسرى')
+
+
+def make_articles(count, seed=7):
+    rng = random.Random(seed)
+    articles = []
+    for article_id in range(1, count + 1):
+        if articles and rng.random() < 0.3:  # re-published story: a few words changed
+            words = rng.choice(articles)['title'].split()
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+        else:
+            words = [rng.choice(WORDS) for _ in range(12)]
+        articles.append({'id': article_id, 'title': ' '.join(words), 'excerpt': '' if article_id % 9 else None})
+    articles[5]['title'] = ''  # no words, no signature
+    return articles
+
+
+def saved(index, cluster_ids):
+    arrays = index.arrays()
+    return NearDuplicateIndex.from_arrays(arrays['signatures'], arrays['has_signature'], arrays['band_keys'],
+                                          arrays['band_rows'], cluster_ids)
+
+
+def test_near_copies_share_a_cluster():
+    index = NearDuplicateIndex()
+    first = index.add(1, 'قصف مستشفى في خان يونس جنوب قطاع غزة صباح اليوم')
+    assert index.add(2, 'قصف مستشفى في خان يونس جنوب قطاع غزة مساء اليوم') == first
+    assert index.add(3, 'مفاوضات وقف إطلاق النار في القاهرة') == 3
+    assert cluster_summary(index.cluster_ids)['clusters_with_duplicates'] == 1
+
+
+def test_saved_index_extends_like_a_full_build():
+    articles = make_articles(400)
+    full = [dict(article) for article in articles]
+    full_index = assign_clusters(full)
+    assert cluster_summary(a['cluster_id'] for a in full)['near_duplicate_articles'] > 0
+
+    head, tail = [dict(a) for a in articles[:300]], [dict(a) for a in articles[300:]]
+    head_index = assign_clusters(head)
+    reopened = saved(head_index, [a['cluster_id'] for a in head])
+    assign_clusters(tail, reopened)
+
+    assert [a['cluster_id'] for a in head + tail] == [a['cluster_id'] for a in full]
+    assert reopened.arrays() == full_index.arrays()
+
+
+def test_replaced_text_is_re_signed():
+    articles = make_articles(200)
+    index = assign_clusters([dict(a) for a in articles])
+    reopened = saved(index, list(index.cluster_ids))
+
+    changed = {10: 'مفاوضات الأسرى في القاهرة', 20: '', 30: articles[31]['title']}
+    expected = NearDuplicateIndex()
+    for position, article in enumerate(articles):
+        expected.add(article['id'], changed.get(position, article['title']), cluster_id=index.cluster_ids[position])
+    for position, text in changed.items():
+        reopened.replace(position, text)
+        index.replace(position, text)
+    assert reopened.arrays() == expected.arrays() == index.arrays()
+    assert reopened.signature_at(30) == expected.signature_at(30)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the research analyzer: its queries against plain loops over the records"""
+
+import re
+
+import pytest
+
+pytest.importorskip('pandas')  # research tools only; not a web app requirement
+
+from research_tools import PalestineNewsAnalyzer  # noqa: E402
+from test_article_store import make_articles, write_dataset
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    articles = make_articles(300)
+    articles[4]['title'] = 'GAZA Update'
+    path = write_dataset(tmp_path_factory.mktemp('research') / 'articles.json', articles)
+    return articles, PalestineNewsAnalyzer(str(path))
+
+
+def test_queries_match_the_records(dataset):
+    articles, analyzer = dataset
+    assert analyzer.search_by_keywords(['رقم 1', 'القدس 2']) == [
+        a for a in articles if any(k in a['title'] or k in (a['excerpt'] or '') for k in ('رقم 1', 'القدس 2'))]
+    assert analyzer.search_by_keywords(['gaza']) == [articles[4]]
+    assert analyzer.search_by_keywords(['gaza'], case_sensitive=True) == []
+    assert analyzer.get_articles_by_type('video') == [a for a in articles if a['type'] == 'video']
+    assert analyzer.get_articles_with_images() == [a for a in articles if a['image_url']]
+    assert analyzer.search_by_url_pattern(r'/news/1\d$') == [a for a in articles if re.search(r'/news/1\d$', a['link'])]
+
+
+def test_date_queries_match_the_records(dataset):
+    articles, analyzer = dataset
+    in_range = [a for a in articles if a['date'] and '2024-03-01' <= a['date'] <= '2024-06-30']
+    assert analyzer.get_articles_by_date_range('2024-03-01', '2024-06-30') == in_range
+    videos = [a for a in articles if a['type'] == 'video']
+    dated = sorted((a for a in videos if a['date']), key=lambda a: a['date'], reverse=True)
+    assert analyzer.get_video_articles() == dated + [a for a in videos if not a['date']]
+    assert analyzer.get_statistics()['total_articles'] == len(articles)
+
+
+def test_keyword_masks_match_one_search_per_set(dataset):
+    articles, analyzer = dataset
+    keyword_sets = {'gaza': ['غزة عنوان 2', 'GAZA'], 'quds': ['القدس 4'], 'none': ['لا يوجد']}
+    for case_sensitive in (False, True):
+        masks = analyzer.keyword_masks(keyword_sets, case_sensitive)
+        assert list(masks.columns) == list(keyword_sets)
+        for name, keywords in keyword_sets.items():
+            assert analyzer.select(masks[name]) == analyzer.search_by_keywords(keywords, case_sensitive)
+            assert analyzer.select(masks[name]) == [
+                a for a in articles if any(
+                    (k in a['title'] or k in (a['excerpt'] or '')) if case_sensitive else
+                    (k.lower() in a['title'].lower() or k.lower() in (a['excerpt'] or '').lower())
+                    for k in keywords)]
+    assert analyzer.keyword_mask('القدس 4') is analyzer.keyword_mask('القدس 4')  # cached
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the search result cache"""
+
+from article_store import ArticleStore
+from search_cache import SearchResultCache
+from test_article_store import make_articles
+
+
+def make_store(count=300, version='v1'):
+    store = ArticleStore.from_records(make_articles(count))
+    store.version = version
+    return store
+
+
+SEARCHES = [
+    ('غزة عنوان 3',), ('القدس 1', 'excerpt'), ('رقم', 'title', 'video', '2024-03-01', '2024-09-30'),
+    ('', 'all', 'liveblog'), ('لا يوجد',)
+]
+
+
+def test_lookup_matches_the_search():
+    store = make_store()
+    cache = SearchResultCache()
+    for search in SEARCHES:
+        rows = list(store.search_rows(*search))
+        for _ in range(2):
+            result = cache.lookup(store, *search)
+            assert list(result.rows) == rows and result.total() == len(rows)
+            kept, sizes = store.collapse_rows(rows)
+            view_rows, view_sizes = result.view(store, collapse=True)
+            assert list(view_rows) == kept and view_sizes == sizes and result.total(collapse=True) == len(kept)
+            assert result.view(store) == (result.rows, None)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (5, 5, 5)
+    assert stats['rows'] == sum(len(list(store.search_rows(*search))) for search in SEARCHES)
+    assert stats['hit_ratio'] == 0.5
+
+
+def test_equivalent_searches_share_an_entry():
+    store = make_store()
+    cache = SearchResultCache()
+    first = cache.lookup(store, 'GAZA', 'all')
+    assert cache.lookup(store, 'gaza', 'all') is first
+    assert cache.lookup(store, '', 'title', 'video') is cache.lookup(store, '', 'excerpt', 'video', None, '')
+    assert cache.lookup(store, 'gaza', 'title') is not first
+    assert cache.stats()['misses'] == 3
+
+
+def test_a_new_dataset_version_empties_the_cache():
+    cache = SearchResultCache()
+    old, new = make_store(100, 'v1'), make_store(150, 'v2')
+    assert cache.lookup(old, '').total() == 100
+    assert cache.lookup(new, '').total() == 150
+    assert cache.stats()['invalidations'] == 1 and cache.stats()['entries'] == 1
+
+
+def test_a_search_overtaken_by_a_reload_is_not_cached(monkeypatch):
+    cache = SearchResultCache()
+    old, new = make_store(100, 'v1'), make_store(150, 'v2')
+    search_rows = old.search_rows
+
+    def reload_during_search(*args):
+        cache.lookup(new, '')  # another request sees the reloaded dataset meanwhile
+        return search_rows(*args)
+
+    monkeypatch.setattr(old, 'search_rows', reload_during_search)
+    assert cache.lookup(old, 'غزة').total() == len(list(search_rows('غزة')))
+    stats = cache.stats()
+    assert (stats['version'], stats['entries']) == ('v2', 1)
+    assert cache.lookup(new, 'غزة').total() == len(list(new.search_rows('غزة')))
+
+
+def test_eviction_by_entries_and_rows():
+    store = make_store(400)
+    cache = SearchResultCache(max_entries=2)
+    a, b = cache.lookup(store, 'عنوان 1'), cache.lookup(store, 'عنوان 2')
+    cache.lookup(store, 'عنوان 1')  # a is now the most recently used
+    cache.lookup(store, 'عنوان 3')
+    assert cache.lookup(store, 'عنوان 1') is a and cache.lookup(store, 'عنوان 2') is not b
+    assert cache.stats()['evictions'] == 2
+
+    cache = SearchResultCache(max_rows=240)  # results over 60 rows keep only their totals
+    huge = cache.lookup(store, '')
+    assert huge.rows is None and huge.total() == 400
+    assert huge.total(collapse=True) == len(store.collapse_rows(range(400))[0])
+    for query in ('عنوان 1', 'عنوان 2', 'عنوان 3', 'عنوان 4', 'عنوان 5'):  # about 57 rows each
+        assert len(cache.lookup(store, query).rows) <= 60
+    stats = cache.stats()
+    assert stats['rows'] <= 240 and stats['evictions'] >= 1
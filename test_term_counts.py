@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the title term tables: window merges against a rescan of the titles"""
+
+import random
+from collections import Counter
+
+from article_store import ArticleStore, load_snapshot, save_snapshot
+from term_counts import tokenize
+from test_article_store import make_articles
+
+WORDS = ['غزة', 'القدس', 'رفح', 'خان', 'يونس', 'قصف', 'مستشفى', 'هدنة', 'الضفة', 'جنين', 'مفاوضات', 'أسرى']
+
+
+def make_titled_articles(count, start_id=1, seed=7, new_words=()):
+    rng = random.Random(seed)
+    words = WORDS + list(new_words)
+    articles = make_articles(count, start_id)
+    for article in articles:
+        article['title'] = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 6))) + f" {article['id']} news"
+        if not article['id'] % 13:
+            article['title'] = 'Breaking 2024'  # no Arabic terms
+    return articles
+
+
+def rescan(articles, keep=lambda article: True):
+    counts = Counter()
+    for article in articles:
+        if keep(article):
+            counts.update(tokenize(article['title']))
+    return counts
+
+
+def dated_between(date_from, date_to):
+    def keep(article):
+        date = article['date']
+        return bool(date) and (not date_from or date >= date_from) and (not date_to or date <= date_to)
+    return keep
+
+
+def named(terms, counts):
+    return {terms.vocabulary[term_id]: count for term_id, count in counts.items()}
+
+
+WINDOWS = [
+    (None, None), ('2024-03-01', '2024-05-31'), ('2024-03-05', '2024-07-20'), ('2024-02-10', '2024-02-20'),
+    ('2024-06', '2024-08'), (None, '2024-04-15'), ('2024-10-02', None), ('2025-01-01', '2025-12-31')
+]
+
+
+def test_window_counts_match_a_rescan():
+    articles = make_titled_articles(600)
+    terms = ArticleStore.from_records(articles).terms
+    for date_from, date_to in WINDOWS:
+        # The whole archive also counts the undated articles
+        keep = dated_between(date_from, date_to) if date_from or date_to else (lambda article: True)
+        assert named(terms, terms.window_counts(date_from, date_to)) == rescan(articles, keep), (date_from, date_to)
+
+
+def test_top_terms_and_row_counts_match_a_rescan():
+    articles = make_titled_articles(400)
+    store = ArticleStore.from_records(articles)
+    terms = store.terms
+    first_seen = {}
+    for article in articles:
+        for term in tokenize(article['title']):
+            first_seen.setdefault(term, len(first_seen))
+    counts = rescan(articles)
+    expected = sorted(counts.items(), key=lambda item: (-item[1], first_seen[item[0]]))
+    assert terms.top_terms(5) == expected[:5]
+    assert terms.top_terms(50, exclude=['غزة', 'رفح']) == [item for item in expected if item[0] not in ('غزة', 'رفح')]
+
+    rows = list(store.search_rows('', 'all', 'video'))
+    assert named(terms, terms.rows_counts(rows)) == rescan(articles, lambda article: article['type'] == 'video')
+    assert terms.article_terms(3) == Counter(tokenize(articles[3]['title']))
+
+
+def test_trending_scores_the_window_against_the_baseline():
+    articles = make_titled_articles(600, new_words=['اجتياح'])
+    for article in articles:
+        if article['date'] and article['date'] >= '2024-11-01':
+            article['title'] += ' اجتياح اجتياح'
+    terms = ArticleStore.from_records(articles).terms
+    trends = terms.trending('2024-11-01', '2024-11-30', '2024-01-01', '2024-10-31', limit=3)
+    assert trends[0]['term'] == 'اجتياح'
+
+    in_window = dated_between('2024-11-01', '2024-11-30')
+    window = rescan(articles, in_window)
+    baseline = rescan(articles, dated_between('2024-01-01', '2024-10-31'))
+    days = sorted({article['date'] for article in articles if in_window(article)})
+    for trend in trends:
+        term = trend['term']
+        ratio = window[term] * (sum(baseline.values()) + 1) / sum(window.values()) / (baseline[term] + 1)
+        assert (trend['count'], trend['baseline_count'], trend['ratio']) == (window[term], baseline[term], round(ratio, 2))
+        assert trend['daily'] == [sum(tokenize(article['title']).count(term)
+                                      for article in articles if article['date'] == day) for day in days]
+
+
+def assert_same_terms(terms, expected):
+    assert terms.vocabulary.to_list() == expected.vocabulary.to_list()
+    for table_name in ('article', 'day', 'month', 'total'):
+        assert getattr(terms, table_name).arrays() == getattr(expected, table_name).arrays(), table_name
+    assert terms.months == expected.months
+
+
+def test_extended_tables_match_a_full_build(tmp_path):
+    base = make_titled_articles(300)
+    for extra in (
+        make_titled_articles(80, start_id=301, seed=8, new_words=['لبنان']),  # new terms and dates
+        [dict(article, date='2023-12-31') for article in make_titled_articles(20, start_id=301, seed=9)],  # backfill
+        [],
+    ):
+        store = ArticleStore.from_records(base)
+        store.terms
+        extended = store.extended(extra)
+        assert_same_terms(extended.terms, ArticleStore.from_records(base + extra).terms)
+
+    snapshot = load_snapshot(save_snapshot(ArticleStore.from_records(base), tmp_path / 'articles.snapshot'))
+    assert snapshot._terms is not None  # saved with the snapshot
+    extra = make_titled_articles(50, start_id=301, seed=10, new_words=['لبنان'])
+    assert_same_terms(snapshot.extended(extra).terms, ArticleStore.from_records(base + extra).terms)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for word cloud frequencies and the rendered image cache"""
+
+from collections import Counter
+
+import wordcloud_service
+from article_store import ArticleStore
+from term_counts import tokenize
+from test_article_store import make_articles
+from wordcloud_service import WordcloudCache, word_frequencies
+
+
+def expected_frequencies(articles, field, content_type='all', date_from=None, date_to=None, top_n=20):
+    counts = Counter()
+    for article in articles:
+        if content_type != 'all' and article['type'] != content_type:
+            continue
+        if (date_from or date_to) and not (article['date'] and (date_from or '') <= article['date'] <= (date_to or '~')):
+            continue
+        counts.update(tokenize(article[field] or ''))
+    return dict(counts.most_common(top_n))
+
+
+def test_frequencies_match_a_rescan():
+    articles = make_articles(300)
+    store = ArticleStore.from_records(articles)
+    for field, content_type, date_from, date_to in [('title', 'all', None, None), ('title', 'all', '2024-03-01', '2024-07-15'),
+                                                     ('title', 'video', None, '2024-06-30'), ('excerpt', 'post', None, None)]:
+        frequencies = word_frequencies(store, field, content_type, date_from, date_to, top_n=1000)
+        expected = expected_frequencies(articles, field, content_type, date_from, date_to, top_n=1000)
+        assert dict(frequencies) == expected, (field, content_type, date_from, date_to)
+
+
+def rendered(cache, *args, **kwargs):
+    """get(), then wait for the render it queued (renders run one at a time, in order)"""
+    result = cache.get(*args, **kwargs)
+    cache._executor.submit(lambda: None).result()
+    return result
+
+
+def failing_cache(tmp_path, monkeypatch, **options):
+    cache = WordcloudCache(tmp_path, **options)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('no font')
+    monkeypatch.setattr(wordcloud_service, 'render_wordcloud', fail)
+    return cache
+
+
+def test_render_errors_expire(tmp_path, monkeypatch):
+    store = ArticleStore.from_records(make_articles(50))
+    store.version = 'v1'
+    now = [1000.0]
+    monkeypatch.setattr(wordcloud_service.time, 'monotonic', lambda: now[0])
+    cache = failing_cache(tmp_path, monkeypatch, error_ttl=60)
+    assert rendered(cache, store) == ('pending', None)
+    assert cache.get(store) == ('error', 'no font')
+
+    now[0] += 59
+    assert cache.get(store) == ('error', 'no font')
+    now[0] += 2
+    assert rendered(cache, store) == ('pending', None)  # retried after the TTL
+    assert cache.get(store) == ('error', 'no font')
+
+
+def test_render_errors_are_bounded_and_cleared_on_reload(tmp_path, monkeypatch):
+    store = ArticleStore.from_records(make_articles(50))
+    store.version = 'v1'
+    cache = failing_cache(tmp_path, monkeypatch, max_errors=3)
+    for top_n in range(10):
+        rendered(cache, store, top_n=top_n + 1)
+    assert cache.stats()['failed'] == 3
+
+    store.version = 'v2'
+    assert rendered(cache, store) == ('pending', None)
+    assert cache.stats()['failed'] == 1  # only the new version's failure
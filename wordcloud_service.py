@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Headless word cloud rendering
+Word clouds are drawn from term frequencies (the precomputed title term tables
+of the article store) instead of one joined blob of every title: only the top
+words are reshaped for Arabic display, the image is rendered without a GUI
+backend and cached on disk keyed by (field, date window, content type,
+dataset version), and rendering runs in a background thread.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from term_counts import tokenize
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+    from wordcloud import WordCloud
+except ImportError:  # optional: word clouds are unavailable without them
+    WordCloud = None
+
+WORDCLOUD_FIELDS = ('title', 'excerpt')
+DEFAULT_FONT_PATH = os.environ.get('WORDCLOUD_FONT', 'arial.ttf')  # needs Arabic glyphs
+DEFAULT_MAX_WORDS = 100
+MAX_CACHED_IMAGES = 200
+ERROR_TTL_SECONDS = 300  # a failed render is retried after this long
+MAX_CACHED_ERRORS = 256
+
+
+def wordcloud_available() -> bool:
+    return WordCloud is not None
+
+
+def word_frequencies(store, field: str = 'title', content_type: str = 'all', date_from: Optional[str] = None,
+                     date_to: Optional[str] = None, top_n: int = DEFAULT_MAX_WORDS) -> List[Tuple[str, int]]:
+    """Most frequent words of a field for the articles in a date window and content type.
+
+    Title words come from the precomputed term tables (day/month rows for a
+    plain date window, article rows when a content type is given); excerpts
+    have no tables and are tokenized for the selected articles.
+    """
+    if field not in WORDCLOUD_FIELDS:
+        raise ValueError(f"field must be one of {', '.join(WORDCLOUD_FIELDS)}")
+    terms = store.terms
+    if field == 'title' and content_type == 'all':
+        return terms.top_terms(top_n, date_from, date_to)
+
+    # Same date window as the term tables: undated articles only count without a window
+    if date_from or date_to:
+        first, end = terms.date_code_range(date_from, date_to)
+    else:
+        first, end = 0, len(store.dates.categories)
+    type_code = store.types.code_of(content_type) if content_type != 'all' else None
+    if content_type != 'all' and type_code is None:
+        return []
+    date_codes, type_codes = store.dates.codes, store.types.codes
+    rows = [row for row in range(len(store))
+            if first <= date_codes[row] < end and (type_code is None or type_codes[row] == type_code)]
+
+    if field == 'title':
+        return terms.top_terms(top_n, counts=terms.rows_counts(rows))
+    counts = Counter()
+    for row in rows:
+        counts.update(tokenize(store.excerpt[row]))
+    return counts.most_common(top_n)
+
+
+def render_wordcloud(frequencies: List[Tuple[str, int]], output_file, font_path: str = DEFAULT_FONT_PATH,
+                     width: int = 800, height: int = 400):
+    """Render (word, count) pairs to a PNG file; only these words are reshaped"""
+    if WordCloud is None:
+        raise RuntimeError("wordcloud, arabic_reshaper and python-bidi are required for word clouds")
+    if not frequencies:
+        raise ValueError("no words to draw")
+    shaped = {}
+    for word, count in frequencies:
+        display = get_display(arabic_reshaper.reshape(word))
+        shaped[display] = shaped.get(display, 0) + count
+    cloud = WordCloud(
+        font_path=font_path,
+        width=width, height=height,
+        background_color='white',
+        max_words=len(shaped)
+    ).generate_from_frequencies(shaped)
+
+    tmp_path = f"{output_file}.part"
+    cloud.to_image().save(tmp_path, format='PNG')
+    os.replace(tmp_path, output_file)
+
+
+class WordcloudCache:
+    """Rendered word clouds on disk, rendered one at a time in a background thread.
+
+    get() returns the image if it is cached and otherwise queues its rendering,
+    so requests never wait for a render. Images of older dataset versions are
+    never served again and are the first to go when the cache is full. Failed
+    renders are remembered for error_ttl seconds (at most max_errors of them,
+    forgotten when the dataset version changes) and then retried.
+    """
+
+    def __init__(self, cache_dir: Path, font_path: str = DEFAULT_FONT_PATH, max_images: int = MAX_CACHED_IMAGES,
+                 error_ttl: float = ERROR_TTL_SECONDS, max_errors: int = MAX_CACHED_ERRORS):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.font_path = font_path
+        self.max_images = max_images
+        self.error_ttl = error_ttl
+        self.max_errors = max_errors
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = OrderedDict()  # cache key -> (error message, time of the failure), oldest first
+        self._version = None  # dataset version the errors belong to
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wordcloud')
+
+    @staticmethod
+    def cache_key(store, field, content_type, date_from, date_to, top_n) -> str:
+        params = [store.version, field, content_type or 'all', date_from or '', date_to or '', top_n]
+        return hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()
+
+    def get(self, store, field: str = 'title', content_type: str = 'all', date_from: Optional[str] = None,
+            date_to: Optional[str] = None, top_n: int = DEFAULT_MAX_WORDS) -> Tuple[str, Optional[object]]:
+        """('ready', image path), ('pending', None) or ('error', message); queues missing images"""
+        if field not in WORDCLOUD_FIELDS:
+            raise ValueError(f"field must be one of {', '.join(WORDCLOUD_FIELDS)}")
+        key = self.cache_key(store, field, content_type, date_from, date_to, top_n)
+        path = self.cache_dir / f"{key}.png"
+        if path.exists():
+            return 'ready', path
+        with self._lock:
+            if store.version != self._version:
+                self._errors.clear()
+                self._version = store.version
+            error = self._errors.get(key)
+            if error is not None:
+                message, failed_at = error
+                if time.monotonic() - failed_at < self.error_ttl:
+                    return 'error', message
+                del self._errors[key]
+            if key not in self._pending:
+                self._pending.add(key)
+                self._executor.submit(self._render, key, path, store, field, content_type, date_from, date_to, top_n)
+        return 'pending', None
+
+    def _render(self, key, path, store, field, content_type, date_from, date_to, top_n):
+        try:
+            frequencies = word_frequencies(store, field, content_type, date_from, date_to, top_n)
+            render_wordcloud(frequencies, path, self.font_path)
+            self._trim()
+        except Exception as e:
+            print(f"Word cloud rendering failed ({field}, {content_type}, {date_from}..{date_to}): {e}")
+            with self._lock:
+                if store.version == self._version:
+                    self._errors[key] = (str(e), time.monotonic())
+                    while len(self._errors) > self.max_errors:
+                        self._errors.popitem(last=False)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _trim(self):
+        """Remove the least recently rendered images beyond max_images"""
+        images = sorted(self.cache_dir.glob('*.png'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in images[self.max_images:]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'available': wordcloud_available(),
+                'cached_images': len(list(self.cache_dir.glob('*.png'))),
+                'pending': len(self._pending),
+                'failed': len(self._errors)
+            }